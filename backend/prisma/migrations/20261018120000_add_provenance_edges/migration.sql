@@ -0,0 +1,26 @@
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "provenance_edges" (
+    "id" UUID NOT NULL DEFAULT gen_random_uuid(),
+    "model_run_id" UUID NOT NULL,
+    "org_id" UUID NOT NULL,
+    "child_key" TEXT NOT NULL,
+    "child_type" TEXT NOT NULL,
+    "parent_key" TEXT NOT NULL,
+    "parent_type" TEXT NOT NULL,
+    "created_at" TIMESTAMPTZ(6) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "provenance_edges_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex (ancestor traversal: child -> parents)
+CREATE UNIQUE INDEX IF NOT EXISTS "provenance_edges_model_run_id_child_key_parent_key_key" ON "provenance_edges"("model_run_id", "child_key", "parent_key");
+
+-- CreateIndex (descendant traversal: parent -> children)
+CREATE INDEX IF NOT EXISTS "provenance_edges_model_run_id_parent_key_idx" ON "provenance_edges"("model_run_id", "parent_key");
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "provenance_edges_org_id_idx" ON "provenance_edges"("org_id");
+
+-- AddForeignKey
+ALTER TABLE "provenance_edges" DROP CONSTRAINT IF EXISTS "provenance_edges_model_run_id_fkey";
+ALTER TABLE "provenance_edges" ADD CONSTRAINT "provenance_edges_model_run_id_fkey" FOREIGN KEY ("model_run_id") REFERENCES "model_runs"("id") ON DELETE CASCADE ON UPDATE CASCADE;
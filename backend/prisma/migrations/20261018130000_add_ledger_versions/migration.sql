@@ -0,0 +1,68 @@
+-- CreateTable: per-org ledger version, bumped on every change to raw_transactions.
+-- Workers validate cached ledger snapshots with a primary-key lookup instead of
+-- aggregating the org's rows (in-place edits such as recategorizations do not
+-- move imported_at).
+CREATE TABLE IF NOT EXISTS "ledger_versions" (
+    "org_id" UUID NOT NULL,
+    "version" BIGINT NOT NULL DEFAULT 0,
+    "updated_at" TIMESTAMPTZ(6) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "ledger_versions_pkey" PRIMARY KEY ("org_id")
+);
+
+-- One bump per statement and org (transition tables need one trigger per event)
+CREATE OR REPLACE FUNCTION bump_ledger_versions_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO "ledger_versions" ("org_id", "version", "updated_at")
+    SELECT DISTINCT "org_id", 1, NOW() FROM new_rows
+    ON CONFLICT ("org_id") DO UPDATE
+        SET "version" = "ledger_versions"."version" + 1, "updated_at" = NOW();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION bump_ledger_versions_updated()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO "ledger_versions" ("org_id", "version", "updated_at")
+    SELECT "org_id", 1, NOW() FROM new_rows
+    UNION
+    SELECT "org_id", 1, NOW() FROM old_rows
+    ON CONFLICT ("org_id") DO UPDATE
+        SET "version" = "ledger_versions"."version" + 1, "updated_at" = NOW();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION bump_ledger_versions_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO "ledger_versions" ("org_id", "version", "updated_at")
+    SELECT DISTINCT "org_id", 1, NOW() FROM old_rows
+    ON CONFLICT ("org_id") DO UPDATE
+        SET "version" = "ledger_versions"."version" + 1, "updated_at" = NOW();
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS raw_transactions_ledger_version_insert ON "raw_transactions";
+CREATE TRIGGER raw_transactions_ledger_version_insert
+    AFTER INSERT ON "raw_transactions"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_ledger_versions_inserted();
+
+DROP TRIGGER IF EXISTS raw_transactions_ledger_version_update ON "raw_transactions";
+CREATE TRIGGER raw_transactions_ledger_version_update
+    AFTER UPDATE ON "raw_transactions"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_ledger_versions_updated();
+
+DROP TRIGGER IF EXISTS raw_transactions_ledger_version_delete ON "raw_transactions";
+CREATE TRIGGER raw_transactions_ledger_version_delete
+    AFTER DELETE ON "raw_transactions"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_ledger_versions_deleted();
@@ -507,7 +507,8 @@ def compute_scenario(req: ScenarioRequest):
 # FINANCIAL CONSOLIDATION ENDPOINT
 # =============================================================================
 
-from jobs.three_statement_engine import ThreeStatementEngine, ConsolidationEngine, compute_three_statements
+from jobs.three_statement_engine import ThreeStatementEngine, ConsolidationEngine
+from jobs.entity_statements import compute_entity_statements
 
 class ConsolidationRequest(BaseModel):
     entities: List[Dict[str, Any]]
@@ -527,15 +528,8 @@ def compute_consolidation(req: ConsolidationRequest):
     2. Consolidate with FX translation, IC eliminations, NCI
     """
     try:
-        from datetime import datetime
-        from dateutil.parser import parse as date_parse
-
-        entity_results = []
-        start_dt = date_parse(req.startMonth + "-01")
-
+        entity_inputs = []
         for entity_config in req.entities:
-            entity_id = entity_config.get('entityId', 'UNKNOWN')
-            currency = entity_config.get('currency', 'USD')
             fin_data = entity_config.get('financialData', {})
 
             # Use entity's financial data or generate defaults
@@ -551,24 +545,25 @@ def compute_consolidation(req: ConsolidationRequest):
                 'taxRate': (entity_config.get('taxRate') or 0.25),
             })
 
+            entity_inputs.append({
+                'startMonth': req.startMonth + "-01",
+                'horizonMonths': req.horizonMonths,
+                'initialValues': initial_values,
+                'growthAssumptions': growth_assumptions,
+                'headcountCosts': entity_config.get('headcountCosts'), # Dynamic linkage
+            })
 
-            # Compute 3-statement model for this entity
-            statements = compute_three_statements(
-                start_month=req.startMonth + "-01",
-                horizon_months=req.horizonMonths,
-                initial_values=initial_values,
-                growth_assumptions=growth_assumptions,
-                headcount_costs=entity_config.get('headcountCosts'), # Dynamic linkage
-            )
+        # Compute 3-statement model per entity (cached by inputs, misses in parallel)
+        entity_results = compute_entity_statements(entity_inputs)
+
+        for statements, entity_config in zip(entity_results, req.entities):
+            entity_id = entity_config.get('entityId', 'UNKNOWN')
 
             # Add entity metadata
-            statements['metadata'] = statements.get('metadata', {})
             statements['metadata']['entityId'] = entity_id
-            statements['metadata']['currency'] = currency
+            statements['metadata']['currency'] = entity_config.get('currency', 'USD')
             statements['metadata']['entityName'] = entity_config.get('name', entity_id)
 
-            entity_results.append(statements)
-
         # Run consolidation if multiple entities
         if len(entity_results) > 1:
             consolidation_engine = ConsolidationEngine(
@@ -903,6 +898,39 @@ def compute_parameter_mode(req: ParameterModeRequest):
         raise HTTPException(status_code=500, detail=e)
 
 
+from jobs.provenance_lineage import get_lineage, DEFAULT_MAX_DEPTH, DEFAULT_NODE_LIMIT
+
+class ProvenanceLineageRequest(BaseModel):
+    modelRunId: str
+    nodeKey: str
+    direction: str = "ancestors"
+    maxDepth: int = Field(DEFAULT_MAX_DEPTH, ge=1, le=20)
+    limit: int = Field(DEFAULT_NODE_LIMIT, ge=1, le=10000)
+
+
+@app.post("/compute/provenance/lineage", dependencies=[Depends(verify_worker_secret)])
+def compute_provenance_lineage(req: ProvenanceLineageRequest):
+    """
+    Ancestors ("where did this number come from") or descendants of one provenance
+    node, as a bounded traversal of the lineage index.
+    """
+    if req.direction not in ("ancestors", "descendants"):
+        raise HTTPException(status_code=400, detail="direction must be 'ancestors' or 'descendants'")
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        result = get_lineage(cursor, req.modelRunId, req.nodeKey, req.direction, req.maxDepth, req.limit)
+        cursor.close()
+        return {"status": "success", "result": result}
+    except Exception as e:
+        logger.error(f"Provenance lineage failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
+
+
 # Background polling
 polling_active = False
 polling_thread = None
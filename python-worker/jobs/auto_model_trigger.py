@@ -155,6 +155,10 @@ def handle_auto_model_trigger(job_id: str, org_id: str, object_id: str, logs: di
             'triggeredAt': datetime.now(timezone.utc).isoformat(),
         }
         
+        # Connector syncs append a few days of ledger data; only the touched months need re-reading
+        if trigger_type == 'post_sync':
+            model_run_params['incremental'] = True
+
         if starting_customers and int(starting_customers) > 0:
             model_run_params['startingCustomers'] = int(starting_customers)
         if cash_on_hand and float(cash_on_hand) > 0:
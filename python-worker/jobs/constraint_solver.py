@@ -43,13 +43,14 @@ class AccountingConstraintSolver:
     Pass 2: Enforce constraints & report violations
     """
 
+    # Every identity is linear: sum(coefficient * line item) must be ~0 (within tolerance)
     CONSTRAINTS = [
         {
             'id': 'BS_EQUATION',
             'name': 'Balance Sheet Equation',
             'description': 'Total Assets = Total Liabilities + Total Equity',
             'severity': 'critical',
-            'check': lambda d: abs(d.get('total_assets', 0) - (d.get('total_liabilities', 0) + d.get('total_equity', 0))),
+            'terms': {'total_assets': 1.0, 'total_liabilities': -1.0, 'total_equity': -1.0},
             'tolerance': 1.0,
             'plug_variable': 'retained_earnings'
         },
@@ -58,7 +59,7 @@ class AccountingConstraintSolver:
             'name': 'Cash Flow to Balance Sheet',
             'description': 'Cash Flow ending cash must equal Balance Sheet cash',
             'severity': 'critical',
-            'check': lambda d: abs(d.get('cf_ending_cash', 0) - d.get('bs_cash', 0)),
+            'terms': {'cf_ending_cash': 1.0, 'bs_cash': -1.0},
             'tolerance': 1.0,
             'plug_variable': 'bs_cash'
         },
@@ -67,7 +68,7 @@ class AccountingConstraintSolver:
             'name': 'Gross Profit Identity',
             'description': 'Revenue - COGS = Gross Profit',
             'severity': 'warning',
-            'check': lambda d: abs(d.get('revenue', 0) - d.get('cogs', 0) - d.get('gross_profit', 0)),
+            'terms': {'revenue': 1.0, 'cogs': -1.0, 'gross_profit': -1.0},
             'tolerance': 0.01,
             'plug_variable': 'gross_profit'
         },
@@ -76,15 +77,44 @@ class AccountingConstraintSolver:
             'name': 'Net Cash Flow Identity',
             'description': 'Net Cash = Operating CF + Investing CF + Financing CF',
             'severity': 'critical',
-            'check': lambda d: abs(
-                d.get('net_cash_flow', 0) - 
-                (d.get('operating_cf', 0) + d.get('investing_cf', 0) + d.get('financing_cf', 0))
-            ),
+            'terms': {'net_cash_flow': 1.0, 'operating_cf': -1.0, 'investing_cf': -1.0, 'financing_cf': -1.0},
             'tolerance': 1.0,
             'plug_variable': None
         }
     ]
 
+    @staticmethod
+    def _period_report(violation_amounts: List[float], failed: List[bool]) -> Dict[str, Any]:
+        violations = []
+        adjustments = []
+        for constraint, violation_amount, is_violated in zip(AccountingConstraintSolver.CONSTRAINTS, violation_amounts, failed):
+            if not is_violated:
+                continue
+            violations.append({
+                'constraint_id': constraint['id'],
+                'name': constraint['name'],
+                'violation_amount': round(violation_amount, 2),
+                'severity': constraint['severity'],
+                'description': constraint['description']
+            })
+
+            # Auto-adjust using plug variable
+            if constraint.get('plug_variable'):
+                adjustments.append({
+                    'variable': constraint['plug_variable'],
+                    'adjustment': round(violation_amount, 2),
+                    'constraint': constraint['id'],
+                    'auto_fixed': True
+                })
+
+        return {
+            'valid': not violations,
+            'violations': violations,
+            'adjustments': adjustments,
+            'constraints_checked': len(AccountingConstraintSolver.CONSTRAINTS),
+            'constraints_passed': len(AccountingConstraintSolver.CONSTRAINTS) - len(violations)
+        }
+
     @staticmethod
     def validate(financial_data: Dict[str, float]) -> Dict[str, Any]:
         """
@@ -99,69 +129,47 @@ class AccountingConstraintSolver:
                 adjustments: [{ variable, adjustment_amount }]
             }
         """
-        violations = []
-        adjustments = []
-        all_valid = True
-
-        for constraint in AccountingConstraintSolver.CONSTRAINTS:
-            try:
-                violation_amount = constraint['check'](financial_data)
-                passed = violation_amount <= constraint['tolerance']
-
-                if not passed:
-                    all_valid = False
-                    violation = {
-                        'constraint_id': constraint['id'],
-                        'name': constraint['name'],
-                        'violation_amount': round(violation_amount, 2),
-                        'severity': constraint['severity'],
-                        'description': constraint['description']
-                    }
-                    violations.append(violation)
-
-                    # Auto-adjust using plug variable
-                    if constraint.get('plug_variable'):
-                        adjustments.append({
-                            'variable': constraint['plug_variable'],
-                            'adjustment': round(violation_amount, 2),
-                            'constraint': constraint['id'],
-                            'auto_fixed': True
-                        })
-            except Exception as e:
-                logger.warning(f"Constraint check {constraint['id']} failed: {e}")
-
-        return {
-            'valid': all_valid,
-            'violations': violations,
-            'adjustments': adjustments,
-            'constraints_checked': len(AccountingConstraintSolver.CONSTRAINTS),
-            'constraints_passed': len(AccountingConstraintSolver.CONSTRAINTS) - len(violations)
-        }
+        matrix = accounting_constraint_matrix()
+        amounts = np.abs(matrix.residuals(matrix.stack([financial_data])))[0]
+        return AccountingConstraintSolver._period_report(amounts.tolist(), (amounts > matrix.tolerances).tolist())
 
     @staticmethod
     def enforce_balance_sheet(
-        bs_data: Dict[str, float],
+        bs_data: Dict[str, Any],
         plug: str = 'retained_earnings'
-    ) -> Dict[str, float]:
+    ) -> Dict[str, Any]:
         """
         Force-balance a balance sheet using the plug variable.
         
-        Modifies and returns bs_data so that A = L + E.
+        Returns a copy of bs_data with A = L + E. Values may be scalars (one period)
+        or arrays over periods / paths, in which case every out-of-balance element is
+        plugged in one pass and 'balance_plug_applied' holds the plug per element.
         """
         adjusted = deepcopy(bs_data)
-        
-        total_assets = float(adjusted.get('total_assets', 0))
-        total_liabilities = float(adjusted.get('total_liabilities', 0))
-        total_equity = float(adjusted.get('total_equity', 0))
-        
+
+        total_assets = np.asarray(adjusted.get('total_assets', 0), dtype=np.float64)
+        total_liabilities = np.asarray(adjusted.get('total_liabilities', 0), dtype=np.float64)
+        total_equity = np.asarray(adjusted.get('total_equity', 0), dtype=np.float64)
+
         diff = total_assets - (total_liabilities + total_equity)
-        
-        if abs(diff) > 0.01:
-            adjusted[plug] = round(float(adjusted.get(plug, 0)) + diff, 2)
-            adjusted['total_equity'] = round(total_equity + diff, 2)
-            adjusted['balance_plug_applied'] = round(diff, 2)
-            logger.info(f"Balance sheet plug applied: {diff:.2f} to {plug}")
-        
+        needs_plug = np.abs(diff) > 0.01
+
+        if diff.ndim == 0:
+            if needs_plug:
+                diff = float(diff)
+                adjusted[plug] = round(float(adjusted.get(plug, 0)) + diff, 2)
+                adjusted['total_equity'] = round(float(total_equity) + diff, 2)
+                adjusted['balance_plug_applied'] = round(diff, 2)
+                logger.info(f"Balance sheet plug applied: {diff:.2f} to {plug}")
+            return adjusted
+
+        if needs_plug.any():
+            plug_values = np.asarray(adjusted.get(plug, 0), dtype=np.float64)
+            adjusted[plug] = np.where(needs_plug, np.round(plug_values + diff, 2), plug_values)
+            adjusted['total_equity'] = np.where(needs_plug, np.round(total_equity + diff, 2), total_equity)
+            adjusted['balance_plug_applied'] = np.where(needs_plug, np.round(diff, 2), 0.0)
+            logger.info(f"Balance sheet plug applied to {int(needs_plug.sum())} of {needs_plug.size} periods ({plug})")
+
         return adjusted
 
     @staticmethod
@@ -171,29 +179,133 @@ class AccountingConstraintSolver:
         """
         Validate constraints across all periods.
         Returns consolidated validation report.
+
+        All periods are checked with one sparse matrix product over the stacked
+        line items.
         """
-        period_results = {}
-        all_valid = True
-        total_violations = 0
+        periods = sorted(monthly_data)
+        matrix = accounting_constraint_matrix()
+        amounts = np.abs(matrix.residuals(matrix.stack([monthly_data[p] for p in periods])))
+        failed = amounts > matrix.tolerances
 
-        for period, data in sorted(monthly_data.items()):
-            result = AccountingConstraintSolver.validate(data)
-            period_results[period] = result
-            if not result['valid']:
-                all_valid = False
-                total_violations += len(result['violations'])
+        period_results = {}
+        for period, period_amounts, period_failed in zip(periods, amounts.tolist(), failed.tolist()):
+            period_results[period] = AccountingConstraintSolver._period_report(period_amounts, period_failed)
 
         return {
-            'all_valid': all_valid,
-            'total_violations': total_violations,
+            'all_valid': not failed.any(),
+            'total_violations': int(failed.sum()),
             'periods_checked': len(monthly_data),
-            'periods_with_violations': sum(
-                1 for r in period_results.values() if not r['valid']
-            ),
+            'periods_with_violations': int(failed.any(axis=-1).sum()),
             'period_details': period_results
         }
 
 
+class ConstraintMatrix:
+    """
+    Linear accounting identities compiled into a sparse coefficient matrix.
+
+    Rows are constraints, columns the line items they reference. For line item
+    values shaped (..., variables) - one row per period, or (paths, periods, variables)
+    for simulations - residuals are a single sparse product and violations a
+    tolerance comparison.
+    """
+
+    def __init__(self, constraints: List[Dict[str, Any]]):
+        from scipy import sparse
+
+        self.constraint_ids = [c['id'] for c in constraints]
+        self.variables = sorted({v for c in constraints for v in c['terms']})
+        self.variable_index = {v: i for i, v in enumerate(self.variables)}
+        self.tolerances = np.array([float(c['tolerance']) for c in constraints])
+
+        rows, cols, coefficients = [], [], []
+        for row, constraint in enumerate(constraints):
+            for variable, coefficient in constraint['terms'].items():
+                rows.append(row)
+                cols.append(self.variable_index[variable])
+                coefficients.append(float(coefficient))
+        self.matrix = sparse.csr_matrix((coefficients, (rows, cols)), shape=(len(constraints), len(self.variables)))
+
+    def stack(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """(records, variables) array from flat per-period dicts (missing or non-numeric = 0)"""
+        values = np.zeros((len(records), len(self.variables)))
+        for r, record in enumerate(records):
+            for variable, c in self.variable_index.items():
+                value = record.get(variable, 0)
+                try:
+                    values[r, c] = float(value or 0)
+                except (TypeError, ValueError):
+                    logger.warning(f"Constraint input {variable} is not numeric: {value!r}")
+        return values
+
+    def stack_columns(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """(..., variables) array from per-variable arrays (e.g. one per line item over paths x periods)"""
+        shape = np.broadcast_shapes(*[np.shape(v) for v in columns.values()]) if columns else ()
+        values = np.zeros(shape + (len(self.variables),))
+        for variable, column in columns.items():
+            if variable in self.variable_index:
+                values[..., self.variable_index[variable]] = column
+        return values
+
+    def residuals(self, values: np.ndarray) -> np.ndarray:
+        """Signed residual of each constraint, shaped (..., constraints)"""
+        values = np.asarray(values, dtype=np.float64)
+        flat = values.reshape(-1, len(self.variables))
+        return np.asarray(self.matrix.dot(flat.T).T).reshape(values.shape[:-1] + (len(self.constraint_ids),))
+
+    def violations(self, values: np.ndarray) -> List[Tuple[str, Tuple[int, ...], float]]:
+        """(constraint_id, index of the violating period/path, residual) for every violation"""
+        residuals = self.residuals(values)
+        failed = np.abs(residuals) > self.tolerances
+        return [
+            (self.constraint_ids[idx[-1]], tuple(int(i) for i in idx[:-1]), float(residuals[tuple(idx)]))
+            for idx in np.argwhere(failed)
+        ]
+
+
+_accounting_matrix: Optional[ConstraintMatrix] = None
+
+
+def accounting_constraint_matrix() -> ConstraintMatrix:
+    """AccountingConstraintSolver.CONSTRAINTS compiled once per process"""
+    global _accounting_matrix
+    if _accounting_matrix is None:
+        _accounting_matrix = ConstraintMatrix(AccountingConstraintSolver.CONSTRAINTS)
+    return _accounting_matrix
+
+
+# StatementArrays line items (balance_sheet / cash_flow / income_statement) behind each constraint variable
+STATEMENT_ARRAY_VARIABLES = {
+    'total_assets': ('balance_sheet', 'totalAssets'),
+    'total_liabilities': ('balance_sheet', 'totalLiabilities'),
+    'total_equity': ('balance_sheet', 'totalEquity'),
+    'bs_cash': ('balance_sheet', 'cash'),
+    'cf_ending_cash': ('cash_flow', 'endingCash'),
+    'net_cash_flow': ('cash_flow', 'netCashFlow'),
+    'operating_cf': ('cash_flow', 'operatingCashFlow'),
+    'investing_cf': ('cash_flow', 'investingCashFlow'),
+    'financing_cf': ('cash_flow', 'financingCashFlow'),
+    'revenue': ('income_statement', 'revenue'),
+    'cogs': ('income_statement', 'cogs'),
+    'gross_profit': ('income_statement', 'grossProfit'),
+}
+
+
+def statement_array_violations(statements) -> List[Tuple[str, Tuple[int, ...], float]]:
+    """
+    Check every accounting identity on a (possibly batched) StatementArrays projection.
+
+    Returns (constraint_id, (path, month) or (month,), residual) for each violation.
+    """
+    matrix = accounting_constraint_matrix()
+    columns = {
+        variable: getattr(statements, statement)[item]
+        for variable, (statement, item) in STATEMENT_ARRAY_VARIABLES.items()
+    }
+    return matrix.violations(matrix.stack_columns(columns))
+
+
 # =============================================================================
 # 2. SPARSE DATA OPTIMIZATION
 # =============================================================================
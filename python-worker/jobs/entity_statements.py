@@ -0,0 +1,174 @@
+"""
+Per-Entity Statement Computation
+Three-statement models for the entities of a consolidation group, memoized by a
+hash of each entity's inputs and computed in parallel across a process pool.
+
+Re-consolidating after one subsidiary changed only recomputes that subsidiary;
+every other entity is served from the process-local cache. Pool workers return
+StatementArrays (compact to pickle); the nested dictionaries are built here.
+"""
+import os
+import json
+import hashlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from utils.logger import setup_logger
+from jobs.three_statement_engine import StatementArrays, compute_three_statement_arrays
+
+logger = setup_logger()
+
+ENTITY_STATEMENT_WORKERS = int(os.getenv('ENTITY_STATEMENT_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Cached statements are nested dicts of Python floats: roughly 80 bytes per line-item
+# value, i.e. ~265 KB for a 60-month entity and ~520 KB for 120 months
+ENTITY_STATEMENT_CACHE_BYTES = int(os.getenv('ENTITY_STATEMENT_CACHE_MB', '128')) * 1024 * 1024
+ENTITY_STATEMENT_VALUE_BYTES = 80
+# Below this many cache misses the pool round-trip costs more than it saves
+ENTITY_STATEMENT_PARALLEL_MIN = int(os.getenv('ENTITY_STATEMENT_PARALLEL_MIN', '16'))
+
+
+def entity_input_hash(entity_inputs: Dict[str, Any]) -> str:
+    """SHA256 of the canonical JSON of one entity's statement inputs"""
+    input_string = json.dumps(entity_inputs, sort_keys=True, default=str)
+    return hashlib.sha256(input_string.encode('utf-8')).hexdigest()
+
+
+def _compute_entity(entity_inputs: Dict[str, Any]) -> StatementArrays:
+    return compute_three_statement_arrays(
+        start_month=entity_inputs['startMonth'],
+        horizon_months=entity_inputs['horizonMonths'],
+        initial_values=entity_inputs['initialValues'],
+        growth_assumptions=entity_inputs['growthAssumptions'],
+        headcount_costs=entity_inputs.get('headcountCosts'),
+    )
+
+
+def _approx_nbytes(arrays: StatementArrays) -> int:
+    """Approximate memory of the statements dict built from these arrays"""
+    values = sum(
+        line.size
+        for group in (arrays.income_statement, arrays.cash_flow, arrays.direct_method, arrays.balance_sheet)
+        for line in group.values()
+    )
+    return values * ENTITY_STATEMENT_VALUE_BYTES + 4096
+
+
+def _statements_dict(arrays: StatementArrays) -> Dict[str, Any]:
+    """Same output as compute_three_statements"""
+    statements = arrays.to_dict()
+    statements['validation'] = arrays.validate()
+    return statements
+
+
+class EntityStatementCache:
+    """LRU of computed entity statements by input hash, bounded by approximate bytes"""
+
+    def __init__(self, max_bytes: int = ENTITY_STATEMENT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._statements: 'OrderedDict[str, Tuple[Dict[str, Any], int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                return None
+            self._statements.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, statements: Dict[str, Any], nbytes: int) -> None:
+        with self._lock:
+            previous = self._statements.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if nbytes > self.max_bytes:
+                return  # Larger than the whole budget: serve it uncached
+            self._statements[key] = (statements, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._statements:
+                _, (_, evicted_bytes) = self._statements.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._bytes = 0
+
+
+_entity_cache = EntityStatementCache()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if ENTITY_STATEMENT_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Not fork: this process runs job threads, and a forked child can inherit a lock
+            # another thread held at fork time and deadlock on it
+            _pool = ProcessPoolExecutor(max_workers=ENTITY_STATEMENT_WORKERS,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def compute_entity_statements(entity_inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Three-statement model for each entity of a group.
+
+    Args:
+        entity_inputs: One dict per entity with startMonth, horizonMonths, initialValues,
+                       growthAssumptions and (optionally) headcountCosts
+
+    Returns:
+        compute_three_statements output per entity, in input order. Each result has its
+        own 'metadata' dict, so callers can tag entities without touching the cache, and
+        metadata.generatedAt is the time of this call even for cached entities.
+    """
+    keys = [entity_input_hash(inputs) for inputs in entity_inputs]
+    results: Dict[str, Dict[str, Any]] = {}
+    misses: Dict[str, Dict[str, Any]] = {}
+    for key, inputs in zip(keys, entity_inputs):
+        cached = _entity_cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            misses.setdefault(key, inputs)
+
+    if misses:
+        miss_keys = list(misses)
+        computed = None
+        pool = _get_pool() if len(miss_keys) >= ENTITY_STATEMENT_PARALLEL_MIN else None
+        if pool is not None:
+            try:
+                computed = list(pool.map(_compute_entity, [misses[k] for k in miss_keys]))
+            except Exception as e:
+                logger.warning(f"Entity statement pool unavailable ({e}), computing entities serially")
+                _reset_pool()
+        if computed is None:
+            computed = [_compute_entity(misses[k]) for k in miss_keys]
+
+        for key, arrays in zip(miss_keys, computed):
+            statements = _statements_dict(arrays)
+            _entity_cache.put(key, statements, _approx_nbytes(arrays))
+            results[key] = statements
+
+    logger.info(f"Entity statements: {len(entity_inputs)} entities, {len(misses)} computed")
+    generated_at = datetime.now().isoformat()
+    return [
+        {**results[key], 'metadata': {**results[key].get('metadata', {}), 'generatedAt': generated_at}}
+        for key in keys
+    ]
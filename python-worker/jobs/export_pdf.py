@@ -3,8 +3,11 @@ Stores file in database instead of S3
 """
 import json
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from dateutil.relativedelta import relativedelta
 from utils.db import get_db_connection
+from utils.ledger_snapshot import peek_ledger_snapshot
 from utils.logger import setup_logger
 from utils.timer import CPUTimer
 from utils.s3 import upload_bytes_to_s3
@@ -13,6 +16,92 @@ from jobs.runner import check_cancel_requested, mark_cancelled, update_progress
 logger = setup_logger()
 
 
+def _sql_aggregates(cursor, org_id: str):
+    """
+    (monthly rows, top expense category rows, transaction count) from indexed aggregates:
+    monthly rows are (YYYY-MM, revenue, expenses, count) for the last 12 months, newest
+    first; category rows are (category, total expense, count) over the last 3 months.
+    """
+    cursor.execute("""
+        SELECT 
+            DATE_TRUNC('month', date) as month,
+            SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
+            SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
+            COUNT(*) as transaction_count
+        FROM raw_transactions
+        WHERE org_id = %s
+        AND is_duplicate = false
+        AND date >= NOW() - INTERVAL '12 months'
+        GROUP BY DATE_TRUNC('month', date)
+        ORDER BY month DESC
+        LIMIT 12
+    """, (org_id,))
+    monthly_data = [
+        (row[0].strftime('%Y-%m') if row[0] else '', float(row[1] or 0), float(row[2] or 0), int(row[3] or 0))
+        for row in cursor.fetchall()
+    ]
+    
+    cursor.execute("""
+        SELECT 
+            category,
+            SUM(ABS(amount)) as total_expense,
+            COUNT(*) as transaction_count
+        FROM raw_transactions
+        WHERE org_id = %s
+        AND is_duplicate = false
+        AND amount < 0
+        AND date >= NOW() - INTERVAL '3 months'
+        AND category IS NOT NULL
+        GROUP BY category
+        ORDER BY total_expense DESC
+        LIMIT 10
+    """, (org_id,))
+    expense_categories = [(row[0], float(row[1] or 0), int(row[2] or 0)) for row in cursor.fetchall()]
+    
+    cursor.execute("""
+        SELECT COUNT(*) FROM raw_transactions
+        WHERE org_id = %s
+        AND is_duplicate = false
+    """, (org_id,))
+    count_result = cursor.fetchone()
+    return monthly_data, expense_categories, int(count_result[0] or 0) if count_result else 0
+
+
+def _snapshot_aggregates(snapshot):
+    """The same aggregates as _sql_aggregates, from a cached ledger snapshot"""
+    now = datetime.now(timezone.utc)
+    
+    # Monthly breakdown over the last 12 months (dates sit at midnight, so the
+    # day of NOW() - 12 months itself falls before the window)
+    start, _ = snapshot.slice(since=(now - relativedelta(months=12)).date() + timedelta(days=1))
+    amounts = snapshot.amounts[start:]
+    months, month_index = np.unique(snapshot.dates[start:].astype('datetime64[M]'), return_inverse=True)
+    revenue = np.bincount(month_index, weights=np.where(amounts > 0, amounts, 0.0), minlength=months.size)
+    expenses = np.bincount(month_index, weights=np.where(amounts < 0, -amounts, 0.0), minlength=months.size)
+    counts = np.bincount(month_index, minlength=months.size)
+    monthly_data = [
+        (str(months[k]), float(revenue[k]), float(expenses[k]), int(counts[k]))
+        for k in range(months.size - 1, max(-1, months.size - 13), -1)
+    ]
+    
+    # Top expense categories (last 3 months)
+    expense_categories = []
+    start, _ = snapshot.slice(since=(now - relativedelta(months=3)).date() + timedelta(days=1))
+    amounts = snapshot.amounts[start:]
+    codes = snapshot.category_codes[start:]
+    mask = amounts < 0
+    if mask.any() and snapshot.categories.size:
+        totals = np.bincount(codes[mask], weights=-amounts[mask], minlength=snapshot.categories.size)
+        tx_counts = np.bincount(codes[mask], minlength=snapshot.categories.size)
+        ranked = [
+            code for code in np.argsort(-totals, kind='stable')
+            if tx_counts[code] > 0 and snapshot.categories[code] is not None
+        ][:10]
+        expense_categories = [(snapshot.categories[code], float(totals[code]), int(tx_counts[code])) for code in ranked]
+    
+    return monthly_data, expense_categories, len(snapshot)
+
+
 def fetch_additional_financial_data(cursor, conn, org_id: str, model_run_id: str = None) -> dict:
     """
     Fetch additional financial data from transactions and model runs for comprehensive reporting.
@@ -49,84 +138,48 @@ def fetch_additional_financial_data(cursor, conn, org_id: str, model_run_id: str
             logger.debug("raw_transactions table does not exist, skipping additional data fetch")
             return additional_data
         
-        # Get recent transactions for monthly breakdown
-        cursor.execute("""
-            SELECT 
-                DATE_TRUNC('month', date) as month,
-                SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as revenue,
-                SUM(CASE WHEN amount < 0 THEN ABS(amount) ELSE 0 END) as expenses,
-                COUNT(*) as transaction_count
-            FROM raw_transactions
-            WHERE org_id = %s
-            AND is_duplicate = false
-            AND date >= NOW() - INTERVAL '12 months'
-            GROUP BY DATE_TRUNC('month', date)
-            ORDER BY month DESC
-            LIMIT 12
-        """, (org_id,))
+        # Aggregate from the org's ledger snapshot when another job already cached a current
+        # one; otherwise three indexed aggregates are far cheaper than loading the ledger
+        snapshot = peek_ledger_snapshot(cursor, org_id)
+        if snapshot is not None:
+            monthly_data, expense_categories, transaction_count = _snapshot_aggregates(snapshot)
+        else:
+            monthly_data, expense_categories, transaction_count = _sql_aggregates(cursor, org_id)
         
-        monthly_data = cursor.fetchall()
         if monthly_data:
             additional_data['monthly_breakdown'] = [
                 {
-                    'month': row[0].strftime('%Y-%m') if row[0] else '',
-                    'revenue': float(row[1] or 0),
-                    'expenses': float(row[2] or 0),
-                    'transaction_count': int(row[3] or 0)
+                    'month': row[0],
+                    'revenue': row[1],
+                    'expenses': row[2],
+                    'transaction_count': row[3]
                 }
                 for row in monthly_data
             ]
             
             # Calculate growth from monthly data
             if len(monthly_data) >= 2:
-                latest_rev = float(monthly_data[0][1] or 0)
-                prev_rev = float(monthly_data[1][1] or 0)
-                latest_exp = float(monthly_data[0][2] or 0)
-                prev_exp = float(monthly_data[1][2] or 0)
+                latest_rev = monthly_data[0][1]
+                prev_rev = monthly_data[1][1]
+                latest_exp = monthly_data[0][2]
+                prev_exp = monthly_data[1][2]
                 
                 if prev_rev > 0:
                     additional_data['calculated_revenue_growth'] = ((latest_rev - prev_rev) / prev_rev) * 100
                 if prev_exp > 0:
                     additional_data['calculated_expense_growth'] = ((latest_exp - prev_exp) / prev_exp) * 100
         
-        # Get top expense categories
-        cursor.execute("""
-            SELECT 
-                category,
-                SUM(ABS(amount)) as total_expense,
-                COUNT(*) as transaction_count
-            FROM raw_transactions
-            WHERE org_id = %s
-            AND is_duplicate = false
-            AND amount < 0
-            AND date >= NOW() - INTERVAL '3 months'
-            AND category IS NOT NULL
-            GROUP BY category
-            ORDER BY total_expense DESC
-            LIMIT 10
-        """, (org_id,))
-        
-        expense_categories = cursor.fetchall()
         if expense_categories:
             additional_data['top_expense_categories'] = [
                 {
                     'category': row[0] or 'Uncategorized',
-                    'total': float(row[1] or 0),
-                    'count': int(row[2] or 0)
+                    'total': row[1],
+                    'count': row[2]
                 }
                 for row in expense_categories
             ]
         
-        # Get total transaction count
-        cursor.execute("""
-            SELECT COUNT(*) FROM raw_transactions
-            WHERE org_id = %s
-            AND is_duplicate = false
-        """, (org_id,))
-        
-        count_result = cursor.fetchone()
-        if count_result:
-            additional_data['transaction_count'] = int(count_result[0] or 0)
+        additional_data['transaction_count'] = transaction_count
             
     except Exception as e:
         logger.warning(f"Error fetching additional financial data: {str(e)}")
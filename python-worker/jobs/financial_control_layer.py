@@ -22,6 +22,8 @@ from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from copy import deepcopy
 
+from jobs.constraint_solver import accounting_constraint_matrix
+
 logger = logging.getLogger(__name__)
 
 
@@ -1032,27 +1034,46 @@ class ReconciliationEngine:
         all_passed = True
 
         months = sorted(balance_sheet.keys())
-        cumulative_retained = 0.0
 
+        # Stack the identity inputs of every month, then evaluate all identities at once
+        records = []
         for month_key in months:
             bs = balance_sheet.get(month_key, {})
             cf = cash_flow.get(month_key, {})
-            pl = income_statement.get(month_key, {})
-
-            month_checks = []
-
-            # CHECK 1: Balance Sheet Equation
             # Handle both nested and flat BS structure
             if isinstance(bs.get('assets'), dict):
-                total_assets = float(bs.get('assets', {}).get('totalAssets', 0))
-                total_liabilities = float(bs.get('liabilities', {}).get('totalLiabilities', 0))
-                total_equity = float(bs.get('equity', {}).get('totalEquity', 0))
+                records.append({
+                    'total_assets': bs.get('assets', {}).get('totalAssets', 0),
+                    'total_liabilities': bs.get('liabilities', {}).get('totalLiabilities', 0),
+                    'total_equity': bs.get('equity', {}).get('totalEquity', 0),
+                    'bs_cash': bs.get('assets', {}).get('cash', 0),
+                    'cf_ending_cash': cf.get('endingCash', 0),
+                })
             else:
-                total_assets = float(bs.get('totalAssets', 0))
-                total_liabilities = float(bs.get('totalLiabilities', 0))
-                total_equity = float(bs.get('totalEquity', 0))
+                records.append({
+                    'total_assets': bs.get('totalAssets', 0),
+                    'total_liabilities': bs.get('totalLiabilities', 0),
+                    'total_equity': bs.get('totalEquity', 0),
+                    'bs_cash': bs.get('cash', 0),
+                    'cf_ending_cash': cf.get('endingCash', 0),
+                })
 
-            balance_diff = abs(total_assets - (total_liabilities + total_equity))
+        matrix = accounting_constraint_matrix()
+        values = matrix.stack(records)
+        differences = np.abs(matrix.residuals(values))
+        column = matrix.variable_index
+        balance_row = matrix.constraint_ids.index('BS_EQUATION')
+        cash_row = matrix.constraint_ids.index('CF_TO_BS_CASH')
+
+        for i, month_key in enumerate(months):
+            bs = balance_sheet.get(month_key, {})
+            month_checks = []
+
+            # CHECK 1: Balance Sheet Equation
+            total_assets = float(values[i, column['total_assets']])
+            total_liabilities = float(values[i, column['total_liabilities']])
+            total_equity = float(values[i, column['total_equity']])
+            balance_diff = float(differences[i, balance_row])
             bs_balanced = balance_diff < 1.0  # $1 tolerance
 
             month_checks.append({
@@ -1065,13 +1086,9 @@ class ReconciliationEngine:
             })
 
             # CHECK 2: Cash Flow → Balance Sheet Cash
-            cf_ending_cash = float(cf.get('endingCash', 0))
-            if isinstance(bs.get('assets'), dict):
-                bs_cash = float(bs.get('assets', {}).get('cash', 0))
-            else:
-                bs_cash = float(bs.get('cash', 0))
-
-            cash_diff = abs(cf_ending_cash - bs_cash)
+            cf_ending_cash = float(values[i, column['cf_ending_cash']])
+            bs_cash = float(values[i, column['bs_cash']])
+            cash_diff = float(differences[i, cash_row])
             cash_match = cash_diff < 1.0
 
             month_checks.append({
@@ -1083,16 +1100,7 @@ class ReconciliationEngine:
                 'severity': 'critical' if not cash_match else 'ok'
             })
 
-            # CHECK 3: Net Income → Retained Earnings
-            net_income = float(pl.get('netIncome', 0))
-            cumulative_retained += net_income
-            
-            if isinstance(bs.get('equity'), dict):
-                bs_retained = float(bs.get('equity', {}).get('retainedEarnings', 0))
-            else:
-                bs_retained = float(bs.get('retainedEarnings', 0))
-
-            # CHECK 4: Debt Schedule → Balance Sheet (if provided)
+            # CHECK 3: Debt Schedule → Balance Sheet (if provided)
             if debt_schedule and month_key in debt_schedule:
                 ds = debt_schedule[month_key]
                 ds_debt = float(ds.get('total_principal_balance', 0))
@@ -20,7 +20,6 @@ import pandas as pd
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-from copy import deepcopy
 
 logger = logging.getLogger(__name__)
 
@@ -467,75 +466,116 @@ class SensitivityRanker:
     Automatically ranks which input assumptions have the most impact 
     on key output metrics (revenue, cash, runway, etc.)
     
-    Uses perturbation-based sensitivity analysis.
+    Uses perturbation-based sensitivity analysis. All +/- perturbations are
+    laid out along a single perturbation axis and evaluated in one batched
+    call, so the compute function sees every scenario at once.
     """
 
     @staticmethod
-    def rank_sensitivities(
+    def build_perturbation_batch(
         base_assumptions: Dict[str, float],
-        compute_fn,
-        target_metric: str = 'revenue',
         perturbation: float = 0.10
-    ) -> Dict[str, Any]:
+    ) -> Tuple[List[str], Dict[str, np.ndarray]]:
         """
-        Rank all assumptions by impact on target metric.
-        
-        base_assumptions: { 'revenue_growth': 0.1, 'churn_rate': 0.05, ... }
-        compute_fn: callable(assumptions) -> { target_metric: float }
-        perturbation: fraction to perturb each assumption (0.10 = ±10%)
+        Lay out the base case and every ±perturbation along one axis.
+
+        Row 0 is the base case, rows 1..P perturb each parameter up and
+        rows P+1..2P perturb each parameter down. Zero-valued parameters
+        use a small absolute change (±0.01) since they can't be scaled.
+
+        Returns (parameter_names, { name: array of shape (2P + 1,) }).
         """
-        base_result = compute_fn(base_assumptions)
-        base_value = float(base_result.get(target_metric, 0))
+        names = list(base_assumptions.keys())
+        n = len(names)
+        base = np.array([float(base_assumptions[k]) for k in names], dtype=np.float64)
 
-        sensitivities = []
-        for param_name, param_value in base_assumptions.items():
-            if param_value == 0:
-                # Can't perturb zero; use small absolute change
-                high_assumptions = deepcopy(base_assumptions)
-                low_assumptions = deepcopy(base_assumptions)
-                high_assumptions[param_name] = 0.01
-                low_assumptions[param_name] = -0.01
-            else:
-                high_assumptions = deepcopy(base_assumptions)
-                low_assumptions = deepcopy(base_assumptions)
-                high_assumptions[param_name] = param_value * (1 + perturbation)
-                low_assumptions[param_name] = param_value * (1 - perturbation)
+        high = np.where(base == 0, 0.01, base * (1 + perturbation))
+        low = np.where(base == 0, -0.01, base * (1 - perturbation))
+
+        matrix = np.tile(base, (2 * n + 1, 1))
+        idx = np.arange(n)
+        matrix[1 + idx, idx] = high
+        matrix[1 + n + idx, idx] = low
+
+        return names, {name: matrix[:, j] for j, name in enumerate(names)}
 
-            try:
-                high_result = compute_fn(high_assumptions)
-                low_result = compute_fn(low_assumptions)
+    @staticmethod
+    def rank_sensitivities_batch(
+        base_assumptions: Dict[str, float],
+        batch_compute_fn,
+        target_metric: str = 'revenue',
+        perturbation: float = 0.10
+    ) -> Dict[str, Any]:
+        """
+        Rank all assumptions by impact using one batched evaluation.
 
-                high_value = float(high_result.get(target_metric, 0))
-                low_value = float(low_result.get(target_metric, 0))
+        batch_compute_fn: callable({ name: array(2P + 1) }) -> { metric: array(2P + 1) }
+        Non-finite outputs for a scenario are reported as errors for that parameter.
 
-                # Impact
-                impact = high_value - low_value
-                pct_impact = impact / max(abs(base_value), 1) * 100
+        Returns the ranking for target_metric plus elasticities for every
+        parameter against every metric returned by batch_compute_fn.
+        """
+        names, batch = SensitivityRanker.build_perturbation_batch(base_assumptions, perturbation)
+        n = len(names)
+        outputs = batch_compute_fn(batch) or {}
+        outputs = {
+            metric: np.asarray(values, dtype=np.float64).reshape(-1)
+            for metric, values in outputs.items()
+        }
 
-                # Elasticity
-                if param_value != 0:
-                    elasticity = (impact / base_value) / (2 * perturbation) if base_value != 0 else 0
-                else:
-                    elasticity = 0
+        base_params = np.array([float(base_assumptions[k]) for k in names], dtype=np.float64)
+
+        def _impacts(values: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            base_value = float(values[0]) if np.isfinite(values[0]) else 0.0
+            high = values[1:n + 1]
+            low = values[n + 1:2 * n + 1]
+            impact = high - low
+            with np.errstate(divide='ignore', invalid='ignore'):
+                elasticity = (impact / base_value) / (2 * perturbation) if base_value != 0 else np.zeros(n)
+            elasticity = np.where(base_params != 0, elasticity, 0.0)
+            return base_value, high, low, impact, elasticity
+
+        # Elasticity of every metric with respect to every parameter
+        elasticities = {}
+        for metric, values in outputs.items():
+            if values.shape[0] != 2 * n + 1:
+                logger.warning(f"Sensitivity output '{metric}' has {values.shape[0]} rows, expected {2 * n + 1}")
+                continue
+            _, _, _, _, elasticity = _impacts(values)
+            elasticities[metric] = {
+                name: round(float(e), 4) if np.isfinite(e) else 0.0
+                for name, e in zip(names, elasticity)
+            }
 
-                sensitivities.append({
-                    'parameter': param_name,
-                    'base_value': round(param_value, 4),
-                    'high_scenario': round(high_value, 2),
-                    'low_scenario': round(low_value, 2),
-                    'impact': round(impact, 2),
-                    'impact_pct': round(pct_impact, 2),
-                    'elasticity': round(elasticity, 4),
-                    'direction': 'positive' if impact > 0 else 'negative' if impact < 0 else 'neutral'
-                })
-            except Exception as e:
-                logger.warning(f"Sensitivity analysis failed for {param_name}: {e}")
+        target_values = outputs.get(target_metric)
+        if target_values is None or target_values.shape[0] != 2 * n + 1:
+            target_values = np.zeros(2 * n + 1)
+        base_value, high, low, impact, elasticity = _impacts(target_values)
+
+        sensitivities = []
+        for j, param_name in enumerate(names):
+            param_value = float(base_params[j])
+            if not (np.isfinite(high[j]) and np.isfinite(low[j])):
+                logger.warning(f"Sensitivity analysis failed for {param_name}: non-finite scenario output")
                 sensitivities.append({
                     'parameter': param_name,
                     'base_value': round(param_value, 4),
                     'impact': 0,
-                    'error': str(e)
+                    'error': 'non-finite scenario output'
                 })
+                continue
+
+            pct_impact = impact[j] / max(abs(base_value), 1) * 100
+            sensitivities.append({
+                'parameter': param_name,
+                'base_value': round(param_value, 4),
+                'high_scenario': round(float(high[j]), 2),
+                'low_scenario': round(float(low[j]), 2),
+                'impact': round(float(impact[j]), 2),
+                'impact_pct': round(float(pct_impact), 2),
+                'elasticity': round(float(elasticity[j]), 4),
+                'direction': 'positive' if impact[j] > 0 else 'negative' if impact[j] < 0 else 'neutral'
+            })
 
         # Sort by absolute impact
         sensitivities.sort(key=lambda x: abs(x.get('impact', 0)), reverse=True)
@@ -549,10 +589,59 @@ class SensitivityRanker:
             'base_value': round(base_value, 2),
             'perturbation_pct': round(perturbation * 100, 1),
             'parameters': sensitivities,
+            'elasticities': elasticities,
             'top_3_drivers': [s['parameter'] for s in sensitivities[:3]],
             'total_parameters_analyzed': len(sensitivities)
         }
 
+    @staticmethod
+    def rank_sensitivities(
+        base_assumptions: Dict[str, float],
+        compute_fn,
+        target_metric: str = 'revenue',
+        perturbation: float = 0.10
+    ) -> Dict[str, Any]:
+        """
+        Rank all assumptions by impact on target metric.
+        
+        base_assumptions: { 'revenue_growth': 0.1, 'churn_rate': 0.05, ... }
+        compute_fn: callable(assumptions) -> { target_metric: float }
+        perturbation: fraction to perturb each assumption (0.10 = ±10%)
+
+        Scalar compute functions are adapted to the batched ranker; use
+        rank_sensitivities_batch directly when the model can evaluate a
+        whole perturbation axis at once.
+        """
+        def batch_compute_fn(batch: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+            names = list(batch.keys())
+            size = len(next(iter(batch.values()))) if batch else 0
+            rows = []
+            for r in range(size):
+                try:
+                    rows.append(compute_fn({k: float(batch[k][r]) for k in names}) or {})
+                except Exception as e:
+                    logger.warning(f"Sensitivity scenario {r} failed: {e}")
+                    rows.append(None)
+
+            metrics = set()
+            for row in rows:
+                if row:
+                    metrics.update(row.keys())
+            metrics.add(target_metric)
+
+            return {
+                metric: np.array([
+                    float(row.get(metric, 0)) if row is not None else np.nan
+                    for row in rows
+                ])
+                for metric in metrics
+            }
+
+        return SensitivityRanker.rank_sensitivities_batch(
+            base_assumptions, batch_compute_fn,
+            target_metric=target_metric, perturbation=perturbation
+        )
+
 
 # =============================================================================
 # 5. MODEL CONFIDENCE & UNCERTAINTY QUANTIFICATION
@@ -18,6 +18,8 @@ from typing import Dict, List, Any, Optional, Set, Tuple
 import sympy
 from datetime import datetime
 
+from utils.period_rollup import PeriodCalendar
+
 logger = logging.getLogger(__name__)
 
 class HyperblockEngine:
@@ -336,27 +338,14 @@ class HyperblockEngine:
                 
                 if dep_data is None:
                     # Missing dependency, provide zeros in correct shape
-                    dep_shape = []
-                    for td in target_dims:
-                        if td in dep_dims:
-                            dep_shape.append(len(self.dimensions[td]['members']) if td in self.dimensions else 1)
-                        else:
-                            dep_shape.append(1)
-                    dep_shape.append(len(self.months))
-                    dep_data = np.zeros(tuple(dep_shape))
+                    dep_data = np.zeros(self._aligned_shape(dep_dims, target_dims))
                 
                 if list(dep_dims) == list(target_dims):
                     args.append(dep_data)
                     continue
                 
                 # Align dep_dims to target_dims for broadcasting
-                new_shape = []
-                for td in target_dims:
-                    if td in dep_dims:
-                        new_shape.append(len(self.dimensions[td]['members']) if td in self.dimensions else 1)
-                    else:
-                        new_shape.append(1)
-                new_shape.append(len(self.months))
+                new_shape = list(self._aligned_shape(dep_dims, target_dims))
                 
                 try:
                     args.append(dep_data.reshape(tuple(new_shape)))
@@ -390,7 +379,64 @@ class HyperblockEngine:
             else:
                 self.data[node_id] = np.zeros((1,) * len(self.metric_dimensions.get(node_id, [])) + (len(self.months),))
 
-    def calculate_time_intelligence(self, node_id: str, type: str = "YTD"):
+    def _aligned_shape(self, dep_dims: List[str], target_dims: List[str]) -> Tuple[int, ...]:
+        """Shape of a dependency aligned to a target's dimensions (1 on dimensions it lacks)"""
+        shape = []
+        for td in target_dims:
+            if td in dep_dims:
+                shape.append(len(self.dimensions[td]['members']) if td in self.dimensions else 1)
+            else:
+                shape.append(1)
+        shape.append(len(self.months))
+        return tuple(shape)
+
+    def evaluate_samples(self, sample_inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Evaluates the whole graph over a leading sample axis without touching self.data.
+
+        sample_inputs maps nodes to (samples, *node shape) arrays (any axis but the
+        sample axis may be 1 and broadcast); every other node starts from its current
+        data, shared by all samples. Each formula runs once over the whole block, in
+        topological order, so a Monte Carlo run needs no simulation dimension.
+        Returns node_id -> (samples or 1, *node shape) values of every node.
+        """
+        values = {node_id: arr[np.newaxis] for node_id, arr in self.data.items()}
+        values.update(sample_inputs)
+        for node_id in nx.topological_sort(self.graph):
+            if node_id in self.formulas:
+                values[node_id] = self._evaluate_sample_node(node_id, values)
+        return values
+
+    def _evaluate_sample_node(self, node_id: str, values: Dict[str, np.ndarray]) -> np.ndarray:
+        """Evaluates a node's formula over the sample axis of its dependencies' values."""
+        expr, deps, f, actual_deps = self.formulas[node_id]
+        target_dims = self.metric_dimensions.get(node_id, [])
+        target_shape = self.data[node_id].shape
+
+        try:
+            args = []
+            for dep in actual_deps:
+                dep_data = values.get(dep)
+                dep_dims = self.metric_dimensions.get(dep, [])
+                aligned_shape = self._aligned_shape(dep_dims, target_dims)
+                if dep_data is None:
+                    args.append(np.zeros((1,) + aligned_shape))
+                elif list(dep_dims) == list(target_dims):
+                    args.append(dep_data)
+                else:
+                    args.append(dep_data.reshape((dep_data.shape[0],) + aligned_shape))
+
+            result_array = np.asarray(f(*args), dtype=np.float64)
+            if result_array.ndim <= len(target_shape):
+                # Constant over samples (e.g. a formula without dependencies)
+                result_array = np.broadcast_to(result_array, target_shape)[np.newaxis]
+            return np.broadcast_to(result_array, (result_array.shape[0],) + target_shape)
+
+        except Exception as e:
+            logger.error(f"Vectorized sample evaluation failed for {node_id}: {e}")
+            return np.zeros((1,) + target_shape)
+
+    def calculate_time_intelligence(self, node_id: str, type: str = "YTD", fiscal_year_start_month: int = 1):
         """
         Calculates Year-To-Date (YTD) or Quarter-To-Date (QTD) values.
         Returns a new array of the same shape as node_id data.
@@ -398,31 +444,13 @@ class HyperblockEngine:
         data = self.data.get(node_id)
         if data is None: return None
         
-        target_shape = data.shape
-        result = np.zeros(target_shape)
-        
         # Assumption: Last dimension is months
-        num_months = target_shape[-1]
-        
-        for m in range(num_months):
-            month_str = self.months[m]
-            year = month_str[:4]
-            # Find months in the same year up to m
-            if type == "YTD":
-                ytd_indices = [i for i, ms in enumerate(self.months[:m+1]) if ms.startswith(year)]
-            elif type == "QTD":
-                # Find quarter
-                month_int = int(month_str[5:7])
-                quarter = (month_int - 1) // 3
-                ytd_indices = [i for i, ms in enumerate(self.months[:m+1]) if ms.startswith(year) and (int(ms[5:7])-1)//3 == quarter]
-            else:
-                ytd_indices = [m]
-                
-            # Slice and sum across the months dimension
-            # np.take(data, ytd_indices, axis=-1).sum(axis=-1)
-            result[..., m] = np.take(data, ytd_indices, axis=-1).sum(axis=-1)
-            
-        return result
+        calendar = PeriodCalendar(self.months, fiscal_year_start_month)
+        if type == "YTD":
+            return calendar.to_date(data, 'year')
+        if type == "QTD":
+            return calendar.to_date(data, 'quarter')
+        return np.array(data, dtype=np.float64)
 
     def secure_writeback(self, node_id: str, values: List[Dict[str, Any]], user_role: str, user_id: str):
         """
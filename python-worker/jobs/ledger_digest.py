@@ -0,0 +1,281 @@
+"""
+Ledger Digest
+Per-month aggregates of raw_transactions used as the model-run baseline.
+
+A model run stores the digest (plus the import watermark and per-month content
+checksums it was built at) in its result. Incremental runs load the previous
+digest, re-read only the months whose row count, content checksum or latest
+imported_at moved since then, and reuse every other month as-is.
+The ledger is streamed in columnar chunks (utils.ledger_reader) and month
+aggregates are accumulated sequentially in (date, id) order, so a refreshed
+digest is identical to one built from scratch.
+"""
+import json
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import setup_logger
+from utils.ledger_reader import LEDGER_ROW_CHECKSUM, iter_ledger_chunks
+from utils.result_store import load_model_run_result
+
+logger = setup_logger()
+
+DIGEST_VERSION = 2
+
+# Month digest layout. Kept as a flat list so it round-trips through JSON and
+# result storage without int/float coercion (0 stays 0, 12.5 stays 12.5).
+COUNT, REVENUE, EXPENSES, COGS, OPEX, RD, SM, GA, HAS_REVENUE, HAS_EXPENSES = range(10)
+
+_BUCKET_CODES = {'cogs': COGS, 'rd': RD, 'sm': SM, 'ga': GA}
+
+
+def month_key_for(tx_date) -> str:
+    return f"{tx_date.year}-{str(tx_date.month).zfill(2)}"
+
+
+def classify_expense(category: Optional[str]) -> str:
+    """SaaS expense bucket for a transaction category: cogs, rd, sm or ga"""
+    cat = (category or '').lower()
+    if any(k in cat for k in ['cogs', 'hosting', 'aws', 'stripe', 'infrastructure', 'cost of']):
+        return 'cogs'
+    if any(k in cat for k in ['engineering', 'product', 'r&d', 'dev']):
+        return 'rd'
+    if any(k in cat for k in ['marketing', 'sales', 'ads', 'google', 'linkedin', 'sm']):
+        return 'sm'
+    return 'ga'
+
+
+def _accumulate(total, values: np.ndarray):
+    """Left-to-right running sum (same rounding as `total += v` per row); untouched totals keep their type"""
+    if values.size == 0:
+        return total
+    return float(np.cumsum(np.concatenate(([total], values)))[-1])
+
+
+def digest_chunks(chunks: Iterable[Dict[str, np.ndarray]]) -> Dict[str, List]:
+    """
+    Aggregate columnar ledger chunks (date, amount, category) into month digests.
+
+    Chunks must be ordered by date. Sums are accumulated sequentially in row
+    order, so the digest does not depend on how the ledger was batched.
+    """
+    digests: Dict[str, List] = {}
+    for chunk in chunks:
+        amounts = chunk['amount']
+        if amounts.size == 0:
+            continue
+        months = chunk['date'].astype('datetime64[M]')
+
+        categories = np.array([c or '' for c in chunk['category']], dtype=object)
+        unique_categories, inverse = np.unique(categories, return_inverse=True)
+        bucket_codes = np.array([_BUCKET_CODES[classify_expense(c)] for c in unique_categories], dtype=np.int8)
+        buckets = bucket_codes[inverse]
+
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        ends = np.r_[starts[1:], amounts.size]
+        for s, e in zip(starts, ends):
+            m_key = str(months[s])
+            entry = digests.get(m_key)
+            if entry is None:
+                entry = digests[m_key] = [0, 0, 0, 0, 0, 0, 0, 0, False, False]
+
+            seg_amounts = amounts[s:e]
+            entry[COUNT] += int(e - s)
+
+            is_revenue = seg_amounts > 0
+            if is_revenue.any():
+                entry[REVENUE] = _accumulate(entry[REVENUE], seg_amounts[is_revenue])
+                entry[HAS_REVENUE] = True
+
+            is_expense = ~is_revenue
+            if is_expense.any():
+                entry[HAS_EXPENSES] = True
+                # Zero-amount rows never change a total (and leave untouched totals as int 0)
+                values = np.abs(seg_amounts[is_expense])
+                seg_buckets = buckets[s:e][is_expense]
+                nonzero = values != 0
+                values, seg_buckets = values[nonzero], seg_buckets[nonzero]
+
+                entry[EXPENSES] = _accumulate(entry[EXPENSES], values)
+                entry[COGS] = _accumulate(entry[COGS], values[seg_buckets == COGS])
+                entry[OPEX] = _accumulate(entry[OPEX], values[seg_buckets != COGS])
+                for code in (RD, SM, GA):
+                    entry[code] = _accumulate(entry[code], values[seg_buckets == code])
+    return digests
+
+
+def digest_ledger(cursor, org_id: str, import_batch_id: Optional[str] = None, months: Optional[List[str]] = None, since=None, until=None) -> Dict[str, List]:
+    """Stream the (filtered) ledger and return its month digests"""
+    return digest_chunks(iter_ledger_chunks(
+        cursor, org_id, columns=('date', 'amount', 'category'),
+        import_batch_id=import_batch_id, months=months, since=since, until=until,
+    ))
+
+
+def digest_snapshot(snapshot, since=None, until=None) -> Dict[str, List]:
+    """Month digests from a cached LedgerSnapshot (same result as streaming the ledger)"""
+    return digest_chunks([snapshot.chunk(since, until)])
+
+
+def ledger_actuals_from_digests(digests: Dict[str, List]) -> Dict[str, Dict[str, float]]:
+    """Monthly actuals (revenue, expenses, cogs, opex, netIncome, rd, sm, ga) keyed by month"""
+    actuals = {}
+    for m_key in sorted(digests):
+        d = digests[m_key]
+        actuals[m_key] = {
+            'revenue': d[REVENUE],
+            'expenses': d[EXPENSES],
+            'cogs': d[COGS],
+            'opex': d[OPEX],
+            'netIncome': d[REVENUE] - d[EXPENSES],
+            'rd': d[RD],
+            'sm': d[SM],
+            'ga': d[GA],
+        }
+    return actuals
+
+
+def baseline_from_digests(digests: Dict[str, List]) -> Tuple[Dict[str, float], Dict[str, float], int]:
+    """Baseline monthly revenue / expenses (only months with such rows) and the transaction count"""
+    revenue, expenses, count = {}, {}, 0
+    for m_key in sorted(digests):
+        d = digests[m_key]
+        count += d[COUNT]
+        if d[HAS_REVENUE]:
+            revenue[m_key] = d[REVENUE]
+        if d[HAS_EXPENSES]:
+            expenses[m_key] = d[EXPENSES]
+    return revenue, expenses, count
+
+
+def fetch_month_stats(cursor, org_id: str) -> Dict[str, Tuple[int, Optional[datetime], int]]:
+    """
+    Row count, latest imported_at and content checksum per month (cheap: aggregated
+    in the database). The checksum catches rows edited in place, such as
+    recategorizations, that move neither the count nor imported_at.
+    """
+    cursor.execute(f"""
+        SELECT to_char(date, 'YYYY-MM') AS month, COUNT(*), MAX(imported_at), SUM({LEDGER_ROW_CHECKSUM})
+        FROM raw_transactions
+        WHERE org_id = %s
+          AND is_duplicate = false
+        GROUP BY 1
+    """, (org_id,))
+    return {row[0]: (int(row[1]), row[2], int(row[3] or 0)) for row in cursor.fetchall()}
+
+
+def count_revenue_customers(cursor, org_id: str, import_batch_id: Optional[str] = None) -> int:
+    """Distinct descriptions on revenue rows (NULL counts as one customer)"""
+    batch_clause = "AND import_batch_id = %s" if import_batch_id else ""
+    params = (org_id, import_batch_id) if import_batch_id else (org_id,)
+    cursor.execute(f"""
+        SELECT COUNT(DISTINCT description), BOOL_OR(description IS NULL)
+        FROM raw_transactions
+        WHERE org_id = %s
+          AND is_duplicate = false
+          AND amount > 0
+          {batch_clause}
+    """, params)
+    row = cursor.fetchone()
+    return int(row[0] or 0) + (1 if row[1] else 0)
+
+
+def build_digest(month_digests: Dict[str, List], month_stats: Dict[str, Tuple[int, Optional[datetime], int]]) -> Dict[str, Any]:
+    """Serializable digest stored in the run result (stats must be read before the rows)"""
+    latest = [s[1] for s in month_stats.values() if s[1] is not None]
+    return {
+        'version': DIGEST_VERSION,
+        'watermark': max(latest).isoformat() if latest else None,
+        'checksums': {m_key: month_stats[m_key][2] for m_key in sorted(month_stats)},
+        'months': {m_key: month_digests[m_key] for m_key in sorted(month_digests)},
+    }
+
+
+def diff_digests(incremental: Dict[str, List], full: Dict[str, List]) -> Dict[str, Any]:
+    """
+    Compare an incrementally refreshed digest with a full recompute on what the run
+    computes from them (month digests, monthly actuals, baseline series), serialized
+    as stored in the result. Returns {'identical', 'differences': {output: [months]}}.
+    """
+    def outputs(digests):
+        revenue, expenses, _ = baseline_from_digests(digests)
+        return {
+            'digest': digests,
+            'actuals': ledger_actuals_from_digests(digests),
+            'baselineRevenue': revenue,
+            'baselineExpenses': expenses,
+        }
+
+    incremental_outputs, full_outputs = outputs(incremental), outputs(full)
+    differences = {}
+    for name, full_values in full_outputs.items():
+        incremental_values = incremental_outputs[name]
+        months = sorted(
+            m_key for m_key in set(full_values) | set(incremental_values)
+            if json.dumps(full_values.get(m_key), sort_keys=True) != json.dumps(incremental_values.get(m_key), sort_keys=True)
+        )
+        if months:
+            differences[name] = months
+    return {'identical': not differences, 'differences': differences}
+
+
+def load_previous_digest(cursor, model_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Ledger digest of the most recent completed full-ledger run of this model"""
+    if not model_id:
+        return None
+    try:
+        cursor.execute("SAVEPOINT load_ledger_digest")
+        cursor.execute("""
+            SELECT id FROM model_runs
+            WHERE model_id = %s
+              AND status = 'done'
+              AND params_json->>'importBatchId' IS NULL
+            ORDER BY created_at DESC
+            LIMIT 3
+        """, (model_id,))
+        run_ids = [str(r[0]) for r in cursor.fetchall()]
+        cursor.execute("RELEASE SAVEPOINT load_ledger_digest")
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT load_ledger_digest")
+        logger.warning(f"Could not look up previous model runs: {e}")
+        return None
+
+    for run_id in run_ids:
+        try:
+            digest = load_model_run_result(run_id, cursor, sections=['ledgerDigest']).get('ledgerDigest')
+        except Exception as e:
+            logger.warning(f"Could not load ledger digest from run {run_id}: {e}")
+            continue
+        if isinstance(digest, dict) and digest.get('version') == DIGEST_VERSION:
+            return digest
+    return None
+
+
+def refresh_digest(cursor, org_id: str, previous: Dict[str, Any]) -> Tuple[Dict[str, List], Dict[str, Tuple[int, Optional[datetime], int]], List[str]]:
+    """
+    Bring a previous digest up to date, re-reading only touched months.
+
+    A month is touched if it is new, its row count changed (deletes, duplicate
+    flags), its content checksum changed (rows edited in place) or it has rows
+    imported after the previous watermark.
+
+    Returns (month_digests, month_stats, touched_months).
+    """
+    month_stats = fetch_month_stats(cursor, org_id)
+    prev_months = previous.get('months', {})
+    prev_checksums = previous.get('checksums', {})
+    watermark = datetime.fromisoformat(previous['watermark']) if previous.get('watermark') else None
+
+    touched = sorted(
+        m_key for m_key, (count, latest, checksum) in month_stats.items()
+        if m_key not in prev_months
+        or prev_months[m_key][COUNT] != count
+        or prev_checksums.get(m_key) != checksum
+        or (latest is not None and (watermark is None or latest > watermark))
+    )
+
+    month_digests = {m_key: prev_months[m_key] for m_key in month_stats if m_key not in touched}
+    month_digests.update(digest_ledger(cursor, org_id, months=touched))
+    return {m_key: month_digests[m_key] for m_key in sorted(month_digests)}, month_stats, touched
@@ -1,17 +1,26 @@
 """Model Run Job Handler - Deterministic scenario computation with summary_json generator"""
 import json
 import math
+import os
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import numpy as np
 from utils.db import get_db_connection
-from utils.s3 import upload_bytes_to_s3
 from utils.logger import setup_logger
 from utils.timer import CPUTimer
 from jobs.runner import check_cancel_requested, mark_cancelled, update_progress, queue_job
 from jobs.provenance_writer import write_provenance_batch, create_cell_key
 from utils.model_cache import generate_input_hash, get_cached_model_run, cache_model_run
+from utils.result_store import write_result_sections, load_model_run_result
+from utils.ledger_snapshot import get_ledger_snapshot
+from utils.period_rollup import PeriodCalendar
 from jobs.engine import DriverBasedEngine
-from jobs.three_statement_engine import compute_three_statements
+from jobs.three_statement_engine import ThreeStatementEngine, compute_three_statements, _parse_start_month
+from jobs.ledger_digest import (
+    digest_ledger, digest_snapshot, ledger_actuals_from_digests, baseline_from_digests, month_key_for,
+    fetch_month_stats, count_revenue_customers, build_digest, diff_digests,
+    load_previous_digest, refresh_digest,
+)
 
 logger = setup_logger()
 
@@ -101,6 +110,139 @@ def add_months(base_date: datetime, months: int) -> datetime:
     return base_date.replace(year=year, month=month)
 
 
+def project_forecast_batch(drivers: Dict[str, np.ndarray], forecast_context: Dict[str, List]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized replay of the monthly driver projection in compute_model_deterministic.
+
+    drivers holds one array per driver (revenueGrowth, expenseGrowth, cogsPercentage,
+    baselineRevenue, baselineExpenses) with a leading scenario axis. Months whose
+    revenue/cogs/opex are pinned by actuals, driver values or manual inputs keep those
+    values; NaN entries in forecast_context are projected from the drivers.
+
+    Returns revenue/cogs/opex arrays shaped (scenarios, months).
+    """
+    i = np.arange(len(forecast_context['months']), dtype=np.float64)
+
+    revenue_growth = np.asarray(drivers['revenueGrowth'], dtype=np.float64)[:, None]
+    expense_growth = np.asarray(drivers['expenseGrowth'], dtype=np.float64)[:, None]
+    cogs_percentage = np.asarray(drivers['cogsPercentage'], dtype=np.float64)[:, None]
+    starting_revenue = np.asarray(drivers['baselineRevenue'], dtype=np.float64)[:, None]
+    starting_total_expenses = np.asarray(drivers['baselineExpenses'], dtype=np.float64)[:, None]
+
+    # Split starting expenses into COGS and OpEx (clamped exactly as the scalar path)
+    starting_cogs = starting_revenue * cogs_percentage
+    starting_opex = starting_total_expenses - starting_cogs
+    clamp = starting_opex < 0
+    starting_cogs = np.where(clamp, starting_total_expenses, starting_cogs)
+    starting_opex = np.where(clamp, 0.0, starting_opex)
+
+    fixed_revenue = np.asarray(forecast_context['revenue'], dtype=np.float64)[None, :]
+    fixed_cogs = np.asarray(forecast_context['cogs'], dtype=np.float64)[None, :]
+    fixed_opex = np.asarray(forecast_context['opex'], dtype=np.float64)[None, :]
+    extra_opex = np.asarray(forecast_context['extraOpex'], dtype=np.float64)[None, :]
+
+    projected_revenue = starting_revenue * np.maximum(0.01, (1 + revenue_growth) ** i)
+    revenue = np.where(np.isnan(fixed_revenue), projected_revenue, fixed_revenue)
+    revenue = np.maximum(0.0, revenue)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled_cogs = np.where(starting_revenue > 0, starting_cogs * (revenue / starting_revenue), starting_cogs)
+    cogs = np.where(np.isnan(fixed_cogs), scaled_cogs, fixed_cogs)
+
+    projected_opex = np.maximum(0.0, starting_opex * np.maximum(0.01, (1 + expense_growth) ** i)) + extra_opex
+    opex = np.where(np.isnan(fixed_opex), projected_opex, fixed_opex)
+
+    return {'revenue': revenue, 'cogs': cogs, 'opex': opex}
+
+
+def evaluate_sensitivity_batch(
+    batch: Dict[str, np.ndarray],
+    forecast_context: Dict[str, List],
+    scenario_base: Dict[str, Any],
+) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every sensitivity scenario through the real driver projection and 3-statement model.
+
+    batch is the perturbation axis built by SensitivityRanker (one array per driver).
+    The monthly projection and the 3-statement model both run once for all
+    scenarios, with the scenario as the leading (path) axis.
+
+    Returns { metric: array(scenarios) }.
+    """
+    projection = project_forecast_batch(batch, forecast_context)
+    base_initial = scenario_base['initialValues']
+    horizon = int(scenario_base['horizonMonths'])
+    num_scenarios = projection['revenue'].shape[0]
+    if num_scenarios == 0:
+        return {}
+
+    cash = np.asarray(batch['initialCash'], dtype=np.float64)
+    baseline_revenue = np.asarray(batch['baselineRevenue'], dtype=np.float64)
+    path_initial_values = {
+        'cash': cash,
+        'revenue': np.where(baseline_revenue != 0, baseline_revenue, float(base_initial.get('revenue', 0))),
+        'equity': cash + float(base_initial.get('ppe', 0)) - float(base_initial.get('debt', 0)),
+    }
+    path_drivers = {
+        'revenueGrowth': batch['revenueGrowth'],
+        'cogsPercentage': batch['cogsPercentage'],
+        'opexPercentage': batch['expenseGrowth'],
+    }
+    for key in ('taxRate', 'depreciationRate', 'arDays', 'apDays', 'capexPercentage'):
+        if key in batch:
+            path_drivers[key] = batch[key]
+
+    start_month = _parse_start_month(scenario_base['startMonth'])
+    engine_months = [
+        f"{start_month.year + (start_month.month - 1 + i) // 12:04d}-{(start_month.month - 1 + i) % 12 + 1:02d}"
+        for i in range(horizon)
+    ]
+    month_index = {m: i for i, m in enumerate(engine_months)}
+
+    # Projected months pin revenue / cogs / opex in every scenario (NaN = not pinned)
+    columns = [(j, month_index[m]) for j, m in enumerate(forecast_context['months']) if m in month_index]
+    src = np.array([j for j, _ in columns], dtype=np.int64)
+    dst = np.array([i for _, i in columns], dtype=np.int64)
+    path_overrides = {}
+    for line_item in ('revenue', 'cogs', 'opex'):
+        pinned = np.full((num_scenarios, horizon), np.nan)
+        pinned[:, dst] = projection[line_item][:, src]
+        path_overrides[line_item] = pinned
+
+    statements = ThreeStatementEngine().compute_statement_batch(
+        start_month=start_month,
+        horizon_months=horizon,
+        initial_values=dict(base_initial),
+        growth_assumptions=scenario_base['growthAssumptions'],
+        path_drivers=path_drivers,
+        path_initial_values=path_initial_values,
+        path_overrides=path_overrides,
+        headcount_costs=scenario_base.get('headcountCosts'),
+    )
+
+    pl = statements.income_statement
+    if not len(statements):
+        zeros = np.zeros(num_scenarios)
+        return {'revenue': zeros, 'netIncome': zeros, 'ebitda': zeros, 'endingCash': zeros,
+                'burnRate': zeros, 'runway': np.full(num_scenarios, 999.0)}
+
+    # First calendar year totals (as in the annual income statement)
+    calendar = PeriodCalendar(statements.month_keys)
+    ending_cash = statements.balance_sheet['cash'][:, -1]
+    burn = np.maximum(0.0, pl['cogs'][:, -1] + pl['operatingExpenses'][:, -1] - pl['revenue'][:, -1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runway = np.where(burn > 0, ending_cash / burn, 999.0)
+
+    return {
+        'revenue': np.round(calendar.flow(pl['revenue'], 'year')[:, 0], 2),
+        'netIncome': np.round(calendar.flow(pl['netIncome'], 'year')[:, 0], 2),
+        'ebitda': np.round(calendar.flow(pl['ebitda'], 'year')[:, 0], 2),
+        'endingCash': ending_cash,
+        'burnRate': burn,
+        'runway': runway,
+    }
+
+
 def calculate_accuracy_metrics(
     historical_revenue: Dict[str, float],
     revenue_growth: float,
@@ -300,6 +442,7 @@ def generate_summary_json(result: Dict[str, Any], model_json: Dict, params_json:
             'accretionDilution': result.get('accretionDilution'),
             'valuationSummary': result.get('valuationSummary'),
             'sensitivities': result.get('sensitivities'),
+            'sensitivityElasticities': result.get('sensitivityElasticities'),
             'marketImplications': result.get('marketImplications', []),
             'varianceBridge': result.get('varianceBridge', [
                 {'label': 'Baseline', 'value': 100},
@@ -399,7 +542,14 @@ def handle_model_run(job_id: str, org_id: str, object_id: str, logs: dict):
             if cached_result and cached_result.get('summaryJson') and use_cache:
                 logger.info(f"Using cached model run: {cached_result['modelRunId']}")
                 summary_json = cached_result['summaryJson']
-                result = summary_json.get('fullResult', summary_json)
+                if 'fullResult' in summary_json:
+                    result = summary_json['fullResult']
+                else:
+                    try:
+                        result = load_model_run_result(cached_result['modelRunId'], cursor) or summary_json
+                    except Exception as e:
+                        logger.warning(f"Could not load cached result sections: {e}")
+                        result = summary_json
                 update_progress(job_id, 90, {'status': 'using_cache'})
             else:
                 update_progress(job_id, 20, {'status': 'computing'})
@@ -429,16 +579,11 @@ def handle_model_run(job_id: str, org_id: str, object_id: str, logs: dict):
             
             # Upload result to S3 (optional - if S3 is not configured, store in DB)
             result_key = None
-            import os
             s3_bucket = os.getenv('S3_BUCKET_NAME')
             if s3_bucket:
                 try:
-                    result_key = f"model-runs/{org_id}/{model_run_id}/result.json"
-                    upload_bytes_to_s3(
-                        result_key,
-                        json.dumps(result).encode('utf-8'),
-                        'application/json'
-                    )
+                    # Sectioned columnar artifact: readers fetch only the sections they need
+                    result_key = write_result_sections(org_id, model_run_id, result)
                     logger.info(f"Result uploaded to S3: {result_key}")
                 except Exception as e:
                     logger.warning(f"S3 upload failed: {str(e)}, storing result in database instead")
@@ -1042,43 +1187,52 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         
         # STEP 1: Get actual transaction data as baseline (Industry Standard: Use historical data)
         import_batch_id = params_json.get('importBatchId')
-        
+        # Incremental mode: reuse the previous run's per-month ledger digest and only
+        # re-read months touched since its import watermark. verifyIncremental also
+        # rebuilds the digest from an uncached full ledger read and diffs the outputs.
+        incremental = bool(params_json.get('incremental')) and not import_batch_id
+        verify_incremental = incremental and bool(params_json.get('verifyIncremental'))
+
+        month_stats = None
+        month_digests = None
+        ledger_snapshot = None
+        if incremental:
+            previous_digest = load_previous_digest(cursor, model_id or model_json.get('id'))
+            if previous_digest:
+                month_digests, month_stats, touched_months = refresh_digest(cursor, org_id, previous_digest)
+                logger.info(f"Incremental ledger refresh for org {org_id}: re-read {len(touched_months)} of {len(month_digests)} months {touched_months}")
+            else:
+                logger.info("No previous ledger digest for this model, reading the full ledger")
+
+        # The ledger is streamed through a server-side cursor and aggregated chunk by chunk
         if import_batch_id:
             logger.info(f"Filtering transactions by specific batch: {import_batch_id}")
-            cursor.execute("""
-                SELECT 
-                    date,
-                    amount,
-                    category,
-                    description
-                FROM raw_transactions
-                WHERE org_id = %s
-                  AND import_batch_id = %s
-                  AND is_duplicate = false
-                ORDER BY date ASC
-            """, (org_id, import_batch_id))
-        else:
+            month_digests = digest_ledger(cursor, org_id, import_batch_id=import_batch_id)
+        elif month_digests is None or verify_incremental:
             logger.info(f"Fetching all transaction data for org {org_id}")
-            cursor.execute("""
-                SELECT 
-                    date,
-                    amount,
-                    category,
-                    description
-                FROM raw_transactions
-                WHERE org_id = %s
-                  AND is_duplicate = false
-                ORDER BY date ASC
-            """, (org_id,))
-        
-        transactions = cursor.fetchall()
-        logger.info(f"Found {len(transactions)} transactions for org {org_id}")
+            # Month stats are read before the rows so the stored watermark never gets ahead of the data
+            full_stats = fetch_month_stats(cursor, org_id)
+            if month_digests is not None:
+                # Verification streams the ledger itself: a cached snapshot could share the staleness it checks for
+                full_digests = digest_ledger(cursor, org_id)
+                verification = diff_digests(month_digests, full_digests)
+                result['incrementalVerification'] = {**verification, 'touchedMonths': touched_months}
+                if not verification['identical']:
+                    logger.warning(f"Incremental ledger refresh differs from full recompute: {verification['differences']}; using full recompute")
+            else:
+                # Process-local snapshot: follow-up jobs for this org reuse the same columnar ledger
+                ledger_snapshot = get_ledger_snapshot(cursor, org_id)
+                full_digests = digest_snapshot(ledger_snapshot)
+            month_digests, month_stats = full_digests, full_stats
+
+        logger.info(f"Found {sum(d[0] for d in month_digests.values())} transactions for org {org_id}")
+        if month_stats is not None:
+            result['ledgerDigest'] = build_digest(month_digests, month_stats)
         
         # Calculate baseline metrics from actual transactions
         baseline_monthly_revenue = {}
         baseline_monthly_expenses = {}
         total_revenue = 0
-        total_expenses = 0
         # Get initial cash from assumptions, with proper fallback
         # Priority: params_json.cashOnHand (from CSV import) > assumptions.cash.initialCash > assumptions.initialCash > default
         initial_cash = 500000  # Default fallback
@@ -1105,23 +1259,6 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         customer_count = int(final_assumptions.get('customerCount', 100))
         logger.info(f"Initial customer count: {customer_count}")
         
-        for tx in transactions:
-            tx_date = tx[0]
-            tx_amount = float(tx[1]) if tx[1] else 0
-            tx_category = tx[2] or 'Uncategorized'
-            
-            # Group by month
-            month_key = f"{tx_date.year}-{str(tx_date.month).zfill(2)}"
-            
-            if tx_amount > 0:
-                # Revenue
-                baseline_monthly_revenue[month_key] = baseline_monthly_revenue.get(month_key, 0) + tx_amount
-                total_revenue += tx_amount
-            else:
-                # Expenses
-                baseline_monthly_expenses[month_key] = baseline_monthly_expenses.get(month_key, 0) + abs(tx_amount)
-                total_expenses += abs(tx_amount)
-        
         # Get start month from model metadata (CRITICAL: Use model's start month, not current month)
         metadata = model_json.get('metadata', {}) if isinstance(model_json, dict) else {}
         start_month_str = metadata.get('startMonth') or metadata.get('start_month')
@@ -1229,73 +1366,49 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         cutoff_date_dt = current_month.replace(day=1) - timedelta(days=1095)
         cutoff_date_start = cutoff_date_dt.date()
         
-        baseline_transactions = [tx for tx in transactions if cutoff_date_start <= tx[0] < start_month_date]
+        start_month_key = month_key_for(start_month_date)
+        cutoff_month_key = month_key_for(cutoff_date_start)
         
         # 2. Map ALL transactions to a full monthly actuals dict for overrides/actuals display
-        ledger_actuals = {}
-        for tx in transactions:
-            tx_date = tx[0]
-            tx_amount = float(tx[1]) if tx[1] else 0
-            m_key = f"{tx_date.year}-{str(tx_date.month).zfill(2)}"
-            if m_key not in ledger_actuals:
-                ledger_actuals[m_key] = {'revenue': 0, 'expenses': 0, 'cogs': 0, 'opex': 0, 'netIncome': 0, 'rd': 0, 'sm': 0, 'ga': 0}
-            
-            if tx_amount > 0:
-                ledger_actuals[m_key]['revenue'] += tx_amount
-            else:
-                ledger_actuals[m_key]['expenses'] += abs(tx_amount)
-                # Enhanced SaaS Categorization logic
-                cat = (tx[2] or '').lower()
-                if any(k in cat for k in ['cogs', 'hosting', 'aws', 'stripe', 'infrastructure', 'cost of']):
-                    ledger_actuals[m_key]['cogs'] += abs(tx_amount)
-                elif any(k in cat for k in ['engineering', 'product', 'r&d', 'dev']):
-                    ledger_actuals[m_key]['rd'] += abs(tx_amount)
-                    ledger_actuals[m_key]['opex'] += abs(tx_amount)
-                elif any(k in cat for k in ['marketing', 'sales', 'ads', 'google', 'linkedin', 'sm']):
-                    ledger_actuals[m_key]['sm'] += abs(tx_amount)
-                    ledger_actuals[m_key]['opex'] += abs(tx_amount)
-                else:
-                    ledger_actuals[m_key]['ga'] += abs(tx_amount)
-                    ledger_actuals[m_key]['opex'] += abs(tx_amount)
-            ledger_actuals[m_key]['netIncome'] = ledger_actuals[m_key]['revenue'] - ledger_actuals[m_key]['expenses']
+        ledger_actuals = ledger_actuals_from_digests(month_digests)
         
         # Log available actuals for debugging
         if start_month_str in ledger_actuals:
             logger.info(f"Baseline month {start_month_str} actuals found: Rev={ledger_actuals[start_month_str]['revenue']:.2f}, Exp={ledger_actuals[start_month_str]['expenses']:.2f}")
 
-        recent_transactions = baseline_transactions
-        if len(recent_transactions) == 0 and len(transactions) > 0:
+        # Whole months inside the window come straight from the digests; the cutoff month is
+        # only partially inside, so it is re-aggregated from its own rows.
+        baseline_digests = {m: d for m, d in month_digests.items() if cutoff_month_key < m < start_month_key}
+        if cutoff_month_key in month_digests and cutoff_month_key < start_month_key:
+            cutoff_month_end = min((cutoff_date_start.replace(day=1) + timedelta(days=32)).replace(day=1), start_month_date)
+            if ledger_snapshot is not None:
+                boundary_digests = digest_snapshot(ledger_snapshot, since=cutoff_date_start, until=cutoff_month_end)
+            else:
+                boundary_digests = digest_ledger(
+                    cursor, org_id, import_batch_id=import_batch_id,
+                    since=cutoff_date_start, until=cutoff_month_end,
+                )
+            baseline_digests.update(boundary_digests)
+
+        recent_digests = baseline_digests
+        if not recent_digests and month_digests:
             logger.warning(f"No transactions strictly before {start_month_str}. Using all available prior to start.")
-            recent_transactions = [tx for tx in transactions if tx[0] < start_month_date]
+            recent_digests = {m: d for m, d in month_digests.items() if m < start_month_key}
         
-        if len(recent_transactions) > 0:
-            logger.info(f"Using {len(recent_transactions)} baseline transactions before {start_month_str}")
+        # ALWAYS populate baseline metrics from the filtered recent months
+        baseline_monthly_revenue, baseline_monthly_expenses, recent_tx_count = baseline_from_digests(recent_digests)
+        total_revenue = sum(baseline_monthly_revenue.values())
+
+        if recent_tx_count > 0:
+            logger.info(f"Using {recent_tx_count} baseline transactions before {start_month_str}")
         else:
             logger.warning(f"No baseline transactions found for org {org_id} before {start_month_str}")
         
-        # ALWAYS populate baseline metrics from the filtered recent_transactions
-        baseline_monthly_revenue = {}
-        baseline_monthly_expenses = {}
-        total_revenue = 0
-        total_expenses = 0
-        
-        for tx in recent_transactions:
-            tx_date = tx[0]
-            tx_amount = float(tx[1]) if tx[1] else 0
-            month_key = f"{tx_date.year}-{str(tx_date.month).zfill(2)}"
-            
-            if tx_amount > 0:
-                baseline_monthly_revenue[month_key] = baseline_monthly_revenue.get(month_key, 0) + tx_amount
-                total_revenue += tx_amount
-            else:
-                baseline_monthly_expenses[month_key] = baseline_monthly_expenses.get(month_key, 0) + abs(tx_amount)
-                total_expenses += abs(tx_amount)
-        
         latest_baseline_month = max(baseline_monthly_revenue.keys()) if baseline_monthly_revenue else "None"
-        logger.info(f"Baseline: {len(recent_transactions)} txs, Revenue=${total_revenue:,.2f}, Latest month: {latest_baseline_month}")
+        logger.info(f"Baseline: {recent_tx_count} txs, Revenue=${total_revenue:,.2f}, Latest month: {latest_baseline_month}")
         update_progress(job_id, 35, {
             'status': 'baseline_calculated', 
-            'tx_count': len(recent_transactions),
+            'tx_count': recent_tx_count,
             'latest_baseline': latest_baseline_month
         })
         
@@ -1491,6 +1604,11 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         # Extract manual overrides from model definition
         manual_inputs = model_json.get('manualInputs', {}) if isinstance(model_json, dict) else {}
         
+        # Per-month components that do not depend on the growth drivers (actuals, driver
+        # values, manual overrides, payroll). NaN marks months projected from the drivers.
+        # Sensitivity ranking replays the projection from this context.
+        forecast_context = {'months': [], 'revenue': [], 'cogs': [], 'opex': [], 'extraOpex': []}
+        
         for i in range(forecast_months):
             month_date = add_months(current_month, i)
             month_key = f"{month_date.year}-{str(month_date.month).zfill(2)}"
@@ -1499,6 +1617,8 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
             projected_revenue = None
             projected_cogs = None
             projected_opex = None
+            revenue_is_projected = False
+            extra_opex = 0.0
             
             if driver_results:
                 # Find drivers by name/type
@@ -1531,12 +1651,14 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
                 # DETERMINISM FIX: ALL run types now use clean, deterministic growth
                     growth_multiplier = max(0.01, (1 + revenue_growth) ** i)
                     projected_revenue = starting_revenue * growth_multiplier
+                    revenue_is_projected = True
             
             # --- APPLY MANUAL OVERRIDES (Institutional Priority) ---
             if month_key in manual_inputs:
                 overrides = manual_inputs[month_key]
                 if 'revenue' in overrides:
                     projected_revenue = float(overrides['revenue'])
+                    revenue_is_projected = False
                 if 'cogs' in overrides:
                     projected_cogs = float(overrides['cogs'])
                 if 'opex' in overrides:
@@ -1544,6 +1666,10 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
                 logger.info(f"Month {month_key}: Applied manual overrides {overrides}")
 
             projected_revenue = max(0.0, float(projected_revenue or 0))
+            forecast_context['months'].append(month_key)
+            forecast_context['revenue'].append(float('nan') if revenue_is_projected else projected_revenue)
+            forecast_context['cogs'].append(float('nan') if projected_cogs is None else float(projected_cogs))
+            forecast_context['opex'].append(float('nan') if projected_opex is None else float(projected_opex))
             
             if projected_cogs is None:
                 if starting_revenue > 0:
@@ -1559,6 +1685,7 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
                 # Add Headcount-driven costs from the relational plans
                 relational_payroll = headcount_costs.get(month_key, 0)
                 projected_opex += relational_payroll
+                extra_opex += relational_payroll
                 
                 # Check for legacy Hiring Plan assumptions in the model_json (Ad-hoc overrides)
                 month_index = i + 1
@@ -1568,10 +1695,13 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
                         if isinstance(hire, dict) and hire.get('month') == month_index:
                             salary = float(hire.get('salary') or 0)
                             projected_opex += (salary / 12.0) if salary > 5000 else salary
+                            extra_opex += (salary / 12.0) if salary > 5000 else salary
                 
                 if relational_payroll > 0:
                     logger.debug(f"Month {month_key}: Added ${relational_payroll:,.2f} workforce cost")
             
+            forecast_context['extraOpex'].append(float(extra_opex))
+            
             projected_total_expenses = projected_cogs + projected_opex
             projected_net_income = projected_revenue - projected_total_expenses
             projected_burn_rate = projected_total_expenses - projected_revenue
@@ -1625,12 +1755,9 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         try:
             # Only calculate if we have revenue and customer assumptions
             cust_count = int(final_assumptions.get('customerCount') or 0)
-            if cust_count == 0 and transactions:
+            if cust_count == 0 and month_digests:
                 # Try to count unique descriptions from revenue transactions
-                unique_custs = set()
-                for tx in transactions:
-                    if float(tx[1]) > 0: unique_custs.add(tx[3])
-                cust_count = len(unique_custs)
+                cust_count = count_revenue_customers(cursor, org_id, import_batch_id)
             
             if cust_count > 0 and annual_revenue > 0:
                 # 1. CAC Calculation (Marketing / New Customers)
@@ -1847,7 +1974,7 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         )
         logger.info(
             f"Data sources: Start month={start_month_str}, "
-            f"Transactions used={len(recent_transactions)}, "
+            f"Transactions used={recent_tx_count}, "
             f"Initial cash=${initial_cash:,.2f}, "
             f"Customer count={customer_count}, "
             f"Baseline revenue=${avg_monthly_revenue:,.2f}/month"
@@ -1855,30 +1982,32 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
         
         # STEP 6: Generate 3-Statement Financial Model
         logger.info("Generating 3-Statement Financial Model...")
+        ts_initial_values = {
+            'cash': initial_cash,
+            'revenue': starting_revenue or avg_monthly_revenue,
+            'accountsReceivable': 0,
+            'accountsPayable': 0,
+            'inventory': 0,
+            'ppe': float(final_assumptions.get('ppe', 100000)),
+            'debt': float(final_assumptions.get('debt', 0)),
+            'equity': initial_cash + float(final_assumptions.get('ppe', 100000)) - float(final_assumptions.get('debt', 0)),
+            'retainedEarnings': 0
+        }
+        ts_growth_assumptions = {
+            'revenueGrowth': revenue_growth,
+            'cogsPercentage': cogs_percentage,
+            'opexPercentage': expense_growth,
+            'taxRate': float(final_assumptions.get('taxRate', 0.25)),
+            'depreciationRate': float(final_assumptions.get('depreciationRate', 0.02)),
+            'arDays': float(final_assumptions.get('arDays', 30)),
+            'apDays': float(final_assumptions.get('apDays', 45)),
+            'capexPercentage': float(final_assumptions.get('capexPercentage', 0.05))
+        }
         three_statement_model = compute_three_statements(
             start_month=start_month_str,
             horizon_months=forecast_months,
-            initial_values={
-                'cash': initial_cash,
-                'revenue': starting_revenue or avg_monthly_revenue,
-                'accountsReceivable': 0,
-                'accountsPayable': 0,
-                'inventory': 0,
-                'ppe': float(final_assumptions.get('ppe', 100000)),
-                'debt': float(final_assumptions.get('debt', 0)),
-                'equity': initial_cash + float(final_assumptions.get('ppe', 100000)) - float(final_assumptions.get('debt', 0)),
-                'retainedEarnings': 0
-            },
-            growth_assumptions={
-                'revenueGrowth': revenue_growth,
-                'cogsPercentage': cogs_percentage,
-                'opexPercentage': expense_growth,
-                'taxRate': float(final_assumptions.get('taxRate', 0.25)),
-                'depreciationRate': float(final_assumptions.get('depreciationRate', 0.02)),
-                'arDays': float(final_assumptions.get('arDays', 30)),
-                'apDays': float(final_assumptions.get('apDays', 45)),
-                'capexPercentage': float(final_assumptions.get('capexPercentage', 0.05))
-            },
+            initial_values=dict(ts_initial_values),
+            growth_assumptions=ts_growth_assumptions,
             monthly_overrides=monthly_data,
             headcount_costs=headcount_costs # <--- Pass integrated payroll costs
         )
@@ -2328,72 +2457,39 @@ def compute_model_deterministic(model_json: Dict, params_json: Dict, run_type: s
                 logger.error(f"Accretion/Dilution Calculation failed: {e}")
 
         # --- SENSITIVITY AUTO-RANKING (Predictive Evolution) ---
+        # Every ±perturbation is replayed through the real driver projection and
+        # 3-statement model in one batched pass (see evaluate_sensitivity_batch).
         try:
             from jobs.forecasting_engine_v2 import SensitivityRanker
-            
-            def sensitivity_proxy(test_assumptions):
-                # Advanced proxy accounting for efficiency (Burn) and Growth
-                # Match keys flexibly (exact or nested)
-                def get_param(name):
-                    # Check for exact key
-                    if name in test_assumptions: return test_assumptions[name]
-                    # Check for nested key (e.g., "revenue.revenueGrowth")
-                    for k, v in test_assumptions.items():
-                        if k.endswith('.' + name): return v
-                    return final_assumptions.get(name, 0)
-
-                rev_impact = 1.0
-                growth_val = get_param('revenueGrowth') or get_param('growth') or 0
-                base_growth = final_assumptions.get('revenueGrowth') or final_assumptions.get('growth', 0)
-                rev_impact += (growth_val - base_growth)
-                
-                curr_arr = get_param('arr') or get_param('mrr') or 0
-                base_arr = final_assumptions.get('arr') or final_assumptions.get('mrr', 1)
-                if curr_arr > 0: rev_impact *= (curr_arr / max(1, base_arr))
-                
-                cost_impact = 1.0
-                exp_growth = get_param('expenseGrowth') or 0
-                base_exp_growth = final_assumptions.get('expenseGrowth', 0)
-                cost_impact += (exp_growth - base_exp_growth)
-                
-                curr_burn = get_param('burnRate') or 0
-                base_burn = final_assumptions.get('burnRate', 1)
-                if curr_burn > 0: cost_impact *= (curr_burn / max(1, base_burn))
 
-                # Cash impact proxy (Stock variables)
-                cash_bonus = 0
-                if 'initialCash' in test_assumptions: cash_bonus = test_assumptions['initialCash'] - final_assumptions.get('initialCash', 0)
-                
-                target_revenue = annual_revenue * rev_impact
-                target_expenses = annual_expenses * cost_impact
-                
-                # Equity value proxy (Runrate Earnings * Multiplier + Cash)
-                valuation_impact = (target_revenue * 0.2) * 10 + cash_bonus
-                return {'revenue': target_revenue, 'netIncome': target_revenue - target_expenses, 'valuation': valuation_impact}
-            
-            ranker = SensitivityRanker()
-            
-            # Smart deduplication: prioritize specific keys over nested ones if names overlap
-            raw_params = {k: v for k, v in final_assumptions.items() if isinstance(v, (int, float))}
-            analysis_params = {}
-            seen_base_keys = set()
-            
-            # Sort keys to process "clean" names (without dots) first for better labeling
-            sorted_keys = sorted(raw_params.keys(), key=lambda x: ('.' in x, len(x)))
-            for k in sorted_keys:
-                base_k = k.split('.')[-1]
-                if base_k not in seen_base_keys:
-                    analysis_params[k] = float(raw_params[k])
-                    seen_base_keys.add(base_k)
+            sensitivity_base = {
+                'revenueGrowth': float(revenue_growth),
+                'expenseGrowth': float(expense_growth),
+                'cogsPercentage': float(cogs_percentage),
+                'baselineRevenue': float(starting_revenue),
+                'baselineExpenses': float(starting_total_expenses),
+                'initialCash': float(initial_cash),
+                'taxRate': float(ts_growth_assumptions['taxRate']),
+                'depreciationRate': float(ts_growth_assumptions['depreciationRate']),
+                'arDays': float(ts_growth_assumptions['arDays']),
+                'apDays': float(ts_growth_assumptions['apDays']),
+                'capexPercentage': float(ts_growth_assumptions['capexPercentage']),
+            }
+            scenario_base = {
+                'startMonth': start_month_str,
+                'horizonMonths': forecast_months,
+                'initialValues': ts_initial_values,
+                'growthAssumptions': ts_growth_assumptions,
+                'headcountCosts': headcount_costs,
+            }
 
-            if 'revenueGrowth' not in seen_base_keys: analysis_params['revenueGrowth'] = float(revenue_growth)
-            if 'expenseGrowth' not in seen_base_keys: analysis_params['expenseGrowth'] = float(expense_growth)
-            if 'churnRate' not in seen_base_keys: analysis_params['churnRate'] = float(churn_rate)
-            
-            top_params = {k: analysis_params[k] for k in list(analysis_params.keys())[:10]}
-            
-            sensitivity_results = ranker.rank_sensitivities(top_params, sensitivity_proxy)
+            sensitivity_results = SensitivityRanker.rank_sensitivities_batch(
+                sensitivity_base,
+                lambda batch: evaluate_sensitivity_batch(batch, forecast_context, scenario_base),
+                target_metric='revenue'
+            )
             result['sensitivities'] = sensitivity_results.get('parameters', [])
+            result['sensitivityElasticities'] = sensitivity_results.get('elasticities', {})
         except Exception as e:
             logger.warning(f"Sensitivity ranking skipped: {e}")
 
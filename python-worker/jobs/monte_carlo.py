@@ -1,16 +1,32 @@
 """Monte Carlo Simulation Job Handler - Enhanced with confidence intervals, tornado sensitivity, distributions"""
 import json
+import multiprocessing
 import os
+import pickle
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from dateutil.parser import parse as parse_date
 import numpy as np
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Union
 from scipy import stats
 from utils.db import get_db_connection
 from utils.s3 import upload_bytes_to_s3, download_from_s3
 from utils.logger import setup_logger
 from utils.timer import CPUTimer, get_cpu_time
 from jobs.runner import check_cancel_requested, mark_cancelled, update_progress, extend_visibility, queue_job
-from jobs.three_statement_engine import compute_three_statements
+from jobs.three_statement_engine import ThreeStatementEngine
+from jobs.constraint_solver import statement_array_violations
+from jobs.simulation_accumulators import SimulationAccumulator, SurvivalCounter
+from jobs.simulation_convergence import ConvergenceMonitor
+from jobs.simulation_cache import (
+    CachedSimulation, load_cached_simulation, store_cached_simulation
+)
+from jobs.sensitivity_analysis import compute_tornado_sensitivity, correlation_p_values
+from jobs.driver_sampling import compile_distribution, sampling_options
+from jobs.simulation_plan import SimulationPlan
 
 logger = setup_logger()
 
@@ -18,6 +34,14 @@ logger = setup_logger()
 WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
 MONTECARLO_CHUNK_RAM_BYTES = int(os.getenv('MONTECARLO_CHUNK_RAM_BYTES', '1500000000'))  # 1.5GB
 MONTECARLO_TEMP_DIR = os.getenv('MONTECARLO_TEMP_DIR', '/tmp/monte')
+MONTECARLO_STATEMENT_BATCH = int(os.getenv('MONTECARLO_STATEMENT_BATCH', '2000'))  # Paths per 3-statement batch
+MONTECARLO_CHUNK_PATHS = int(os.getenv('MONTECARLO_CHUNK_PATHS', '10000'))  # Paths per pool chunk
+MONTECARLO_WORKERS = int(os.getenv('MONTECARLO_WORKERS', str(os.cpu_count() or 1)))
+# Where chunked runs keep the raw paths: 'memory', 'memmap' (files under MONTECARLO_TEMP_DIR),
+# or 'auto' (memmap once the path matrices exceed MONTECARLO_CHUNK_RAM_BYTES)
+MONTECARLO_STORAGE = os.getenv('MONTECARLO_STORAGE', 'auto')
+MONTECARLO_BLOCK_ROWS = int(os.getenv('MONTECARLO_BLOCK_ROWS', '65536'))  # Paths per out-of-core block
+MONTECARLO_CONVERGENCE_BATCH_PATHS = int(os.getenv('MONTECARLO_CONVERGENCE_BATCH_PATHS', '2000'))  # Paths per adaptive-run batch
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
 
 # Ensure temp directory exists
@@ -63,71 +87,24 @@ def sample_distribution(dist_type: str, params: Dict, size: Tuple[int, ...], rng
     Sample from a distribution with robust error handling.
     
     Args:
-        dist_type: Distribution type (normal, lognormal, triangular, uniform, beta, gamma)
+        dist_type: Distribution type (normal, lognormal, triangular, uniform, beta, gamma, t, pareto)
         params: Distribution parameters
         size: Output shape
         rng: NumPy random generator
     
     Returns:
-        Array of samples
+        Array of samples (the constant 'value' when the parameters are invalid)
     """
-    try:
-        if dist_type == 'normal':
-            mu = float(params.get('mu', 0))
-            sigma = max(float(params.get('sigma', 1)), 1e-10)  # Avoid zero sigma
-            return rng.normal(mu, sigma, size=size)
-        
-        elif dist_type == 'lognormal':
-            mu = float(params.get('mu', 0))
-            sigma = max(float(params.get('sigma', 1)), 1e-10)
-            return np.exp(rng.normal(mu, sigma, size=size))
-        
-        elif dist_type == 'triangular':
-            left = float(params.get('min', 0))
-            mode = float(params.get('mode', 0.5))
-            right = float(params.get('max', 1))
-            if not (left <= mode <= right):
-                raise ValueError(f"Invalid triangular params: min={left}, mode={mode}, max={right}")
-            return rng.triangular(left, mode, right, size=size)
-        
-        elif dist_type == 'uniform':
-            low = float(params.get('min', 0))
-            high = float(params.get('max', 1))
-            if high <= low:
-                raise ValueError(f"Invalid uniform params: min={low}, max={high}")
-            return rng.uniform(low, high, size=size)
-        
-        elif dist_type == 'beta':
-            alpha = max(float(params.get('alpha', 2)), 1e-10)
-            beta = max(float(params.get('beta', 2)), 1e-10)
-            min_val = float(params.get('min', 0))
-            max_val = float(params.get('max', 1))
-            # Sample from standard beta [0, 1], then scale
-            samples = rng.beta(alpha, beta, size=size)
-            return samples * (max_val - min_val) + min_val
-        
-        elif dist_type == 'gamma':
-            shape = max(float(params.get('shape', 2)), 1e-10)
-            scale = max(float(params.get('scale', 1)), 1e-10)
-            return rng.gamma(shape, scale, size=size)
-        
-        else:
-            # Default: constant value
-            value = float(params.get('value', 0))
-            return np.full(size, value)
-    
-    except Exception as e:
-        logger.warning(f"Error sampling {dist_type} distribution: {str(e)}, falling back to constant")
-        value = float(params.get('value', 0))
-        return np.full(size, value)
+    return compile_distribution({**params, 'dist': dist_type}).draw(rng, np.empty(size))
 
 
-def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[float] = [0.80, 0.90, 0.95]) -> Dict:
+def compute_confidence_intervals(results: Union[np.ndarray, SimulationAccumulator], confidence_levels: List[float] = [0.80, 0.90, 0.95]) -> Dict:
     """
     Compute confidence intervals for simulation results (optimized with error handling).
     
     Args:
-        results: Array of shape (num_simulations, months)
+        results: Array of shape (num_simulations, months), or the run's SimulationAccumulator
+                 (bounds then come from its quantile sketch)
         confidence_levels: List of confidence levels (e.g., [0.80, 0.90, 0.95])
     
     Returns:
@@ -135,24 +112,27 @@ def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[fl
     """
     try:
         # Validate input
-        if results.size == 0:
-            logger.warning("Empty results array for confidence intervals")
-            return {}
-        
-        if len(results.shape) != 2:
-            logger.error(f"Results must be 2D array, got shape {results.shape}")
-            return {}
-        
-        num_sims, num_months = results.shape
-        
-        # Ensure float64 for numerical stability
-        if results.dtype != np.float64:
-            results = results.astype(np.float64)
-        
-        # Check for NaN/Inf
-        if np.any(np.isnan(results)) or np.any(np.isinf(results)):
-            logger.warning("NaN or Inf values detected in results for CI, replacing with zeros")
-            results = np.nan_to_num(results, nan=0.0, posinf=0.0, neginf=0.0)
+        if isinstance(results, SimulationAccumulator):
+            if results.num_paths == 0:
+                logger.warning("Empty results array for confidence intervals")
+                return {}
+        else:
+            if results.size == 0:
+                logger.warning("Empty results array for confidence intervals")
+                return {}
+            
+            if len(results.shape) != 2:
+                logger.error(f"Results must be 2D array, got shape {results.shape}")
+                return {}
+            
+            # Ensure float64 for numerical stability
+            if results.dtype != np.float64:
+                results = results.astype(np.float64)
+            
+            # Check for NaN/Inf
+            if np.any(np.isnan(results)) or np.any(np.isinf(results)):
+                logger.warning("NaN or Inf values detected in results for CI, replacing with zeros")
+                results = np.nan_to_num(results, nan=0.0, posinf=0.0, neginf=0.0)
         
         intervals = {}
         
@@ -167,13 +147,16 @@ def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[fl
                 upper_percentile = (1 - alpha / 2) * 100
                 
                 # Compute percentiles across simulations (axis=0) - vectorized
-                try:
-                    lower = np.percentile(results, lower_percentile, axis=0, method='linear')
-                    upper = np.percentile(results, upper_percentile, axis=0, method='linear')
-                except Exception as e:
-                    logger.warning(f"Error computing percentiles for CI {conf_level}: {str(e)}, using fallback")
-                    lower = np.percentile(results, lower_percentile, axis=0)
-                    upper = np.percentile(results, upper_percentile, axis=0)
+                if isinstance(results, SimulationAccumulator):
+                    lower, upper = results.cash.percentiles([lower_percentile, upper_percentile])
+                else:
+                    try:
+                        lower = np.percentile(results, lower_percentile, axis=0, method='linear')
+                        upper = np.percentile(results, upper_percentile, axis=0, method='linear')
+                    except Exception as e:
+                        logger.warning(f"Error computing percentiles for CI {conf_level}: {str(e)}, using fallback")
+                        lower = np.percentile(results, lower_percentile, axis=0)
+                        upper = np.percentile(results, upper_percentile, axis=0)
                 
                 # Round for consistency
                 lower = np.round(lower, 2)
@@ -194,67 +177,6 @@ def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[fl
         return {}
 
 
-def compute_tornado_sensitivity(
-    results: np.ndarray,
-    drivers: Dict[str, Dict],
-    driver_samples: Dict[str, np.ndarray],
-    months: int
-) -> Dict:
-    """
-    Compute tornado sensitivity analysis (correlation between drivers and outcomes).
-    
-    Args:
-        results: Array of shape (num_simulations, months)
-        drivers: Driver definitions
-        driver_samples: Dictionary of driver sample arrays
-        months: Number of months
-    
-    Returns:
-        Dictionary with sensitivity metrics per driver
-    """
-    try:
-        num_sims = results.shape[0]
-        sensitivity = {}
-        
-        # For each driver, compute correlation with final month cash
-        final_month_cash = results[:, -1]  # Last month
-        
-        for driver_name, driver_config in drivers.items():
-            if driver_name not in driver_samples:
-                continue
-            
-            driver_values = driver_samples[driver_name][:, -1]  # Last month values
-            
-            # Compute Pearson correlation
-            if len(driver_values) > 1 and np.std(driver_values) > 1e-10:
-                correlation = np.corrcoef(driver_values, final_month_cash)[0, 1]
-                
-                # Compute rank correlation (Spearman) for robustness
-                try:
-                    from scipy.stats import spearmanr
-                    rank_corr, _ = spearmanr(driver_values, final_month_cash)
-                except:
-                    rank_corr = correlation
-                
-                sensitivity[driver_name] = {
-                    'pearson_correlation': float(correlation) if not np.isnan(correlation) else 0.0,
-                    'spearman_correlation': float(rank_corr) if not np.isnan(rank_corr) else 0.0,
-                    'abs_correlation': float(abs(correlation)) if not np.isnan(correlation) else 0.0,
-                }
-        
-        # Sort by absolute correlation (most sensitive first)
-        sorted_sensitivity = dict(sorted(
-            sensitivity.items(),
-            key=lambda x: x[1]['abs_correlation'],
-            reverse=True
-        ))
-        
-        return sorted_sensitivity
-    except Exception as e:
-        logger.error(f"Error computing tornado sensitivity: {str(e)}", exc_info=True)
-        return {}
-
-
 def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
     """Handle Monte Carlo simulation job with vectorized NumPy"""
     logger.info(f"Processing Monte Carlo job {job_id}")
@@ -265,6 +187,7 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
     cursor = None
     cpu_timer = CPUTimer()
     mc_job_id = None
+    path_file = None
     
     try:
         # Check for cancellation before starting
@@ -309,6 +232,10 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             overrides = params.get('overrides', {})
             random_seed = params.get('randomSeed')
             mode = params.get('mode', 'full')
+            sampling_method = params.get('sampling', 'random')
+            antithetic = params.get('antithetic', False)
+            # Adaptive runs treat num_simulations as a maximum and stop once the target metrics are precise enough
+            convergence = ConvergenceMonitor.from_params(params.get('convergence'))
             
             # Normalize drivers to dictionary format
             # Handle both list and dict formats
@@ -360,16 +287,8 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
                 logger.warning(f"Drivers format not recognized: {type(drivers_raw)}, using empty dict")
                 drivers = {}
             
-            # Derive seed from paramsHash + randomSeed (deterministic)
-            # Use hash of params_hash string to ensure reproducibility
-            if random_seed is not None:
-                # Combine params_hash and random_seed for deterministic seed
-                seed_str = f"{params_hash}_{random_seed}"
-                seed = abs(hash(seed_str)) % (2**31 - 1)  # Use positive seed (max 2^31-1)
-            else:
-                seed = abs(hash(str(params_hash))) % (2**31 - 1)  # Use positive seed
-            
-            logger.info(f"Running {num_simulations} simulations with seed {seed}")
+            # Sobol / Latin Hypercube / antithetic sampling reach the same interval widths with fewer paths
+            sampling = sampling_options(sampling_method, antithetic)
             
             # Update status to running
             try:
@@ -412,6 +331,15 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             months = model_data.get('months', 12)  # Default 12 months
             month_keys = model_data.get('monthKeys', [f"2025-{i+1:02d}" for i in range(months)])
             
+            # Baseline, distributions, correlations and driver mapping are resolved once here;
+            # the plan's key (a stable digest of the simulation inputs, unlike the per-process
+            # salted hash()) seeds the run, so the same inputs give the same paths on every
+            # worker, and keys the cache
+            plan = SimulationPlan.compile(cursor, model_run_id, model_data, drivers, overrides, random_seed, sampling)
+            cache_digest = plan.cache_key(num_simulations)
+            logger.info(f"Running {num_simulations} simulations with seed {plan.seed}, {sampling['method']} sampling"
+                        f"{' (antithetic)' if sampling['antithetic'] else ''}")
+            
             # Update progress
             try:
                 cursor.execute("""
@@ -433,20 +361,64 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             num_drivers = max(len(drivers), 1)
             # Account for intermediate arrays (driver arrays + result arrays)
             estimated_memory = num_simulations * months * 8 * (num_drivers + 1) * 2  # 2x for intermediate arrays
-            needs_chunking = estimated_memory > MONTECARLO_CHUNK_RAM_BYTES
+            # Raw paths go to memmap files when asked for, or when they would not fit the RAM budget
+            storage = params.get('storage') or MONTECARLO_STORAGE
+            if storage not in ('memory', 'memmap'):
+                storage = 'memmap' if estimated_memory > MONTECARLO_CHUNK_RAM_BYTES else 'memory'
+            
+            # Large jobs are also chunked so the chunks can run across the process pool,
+            # and adaptive jobs so they can stop between batches
+            needs_chunking = (estimated_memory > MONTECARLO_CHUNK_RAM_BYTES or num_simulations > MONTECARLO_CHUNK_PATHS
+                              or storage == 'memmap' or convergence is not None)
             
-            if needs_chunking:
-                logger.info(f"Chunking required: estimated {estimated_memory / 1e9:.2f}GB memory")
-                results, driver_samples = run_chunked_simulations_enhanced(
-                    num_simulations, months, drivers, overrides, seed, 
-                    job_id, cursor, conn, logs, model_data
+            # A cached run of the same inputs covers the first cached_paths paths; adaptive
+            # runs pick their own path count, so only fixed-size runs use the cache
+            cached = load_cached_simulation(cache_digest) if convergence is None else None
+            store_summary = convergence is None
+            if cached is not None and (cached.months != months or set(cached.final_driver_samples) != set(drivers)):
+                cached = None
+            elif cached is not None and cached.num_paths > num_simulations:
+                # Keep the larger entry; this smaller run is simulated from scratch
+                cached, store_summary = None, False
+            cached_paths = cached.num_paths if cached is not None else 0
+            
+            results = None
+            if cached_paths == num_simulations:
+                logger.info(f"Reusing cached summary of {cached_paths} paths ({cache_digest[:12]})")
+                driver_samples = {}
+            elif needs_chunking or cached_paths:
+                if cached_paths:
+                    logger.info(f"Extending cached run of {cached_paths} paths to {num_simulations} ({cache_digest[:12]})")
+                logger.info(f"Chunking required: estimated {estimated_memory / 1e9:.2f}GB memory, {num_simulations} sims, {storage} storage")
+                results, driver_samples, accumulator = run_chunked_simulations_enhanced(
+                    plan, num_simulations, job_id, storage, convergence, cached_paths
                 )
+                path_file = getattr(results, 'filename', None)
+                # Percentile fans, confidence intervals and survival come from the merged
+                # chunk accumulators rather than another pass over the full matrix
+                summary_source = accumulator
             else:
                 logger.info(f"Running vectorized simulations: {num_simulations} sims × {months} months")
-                results, driver_samples = run_vectorized_simulations_enhanced(
-                    num_simulations, months, drivers, overrides, seed,
-                    job_id, cursor, conn, logs, model_data
-                )
+                results, driver_samples = run_vectorized_simulations_enhanced(plan, num_simulations, job_id)
+                # Summarized through the same accumulator a cache hit reports from, so a
+                # repeated job returns the same percentiles and survival either way
+                accumulator = SimulationAccumulator(months).update(results)
+                summary_source = accumulator
+            
+            # Sensitivity only reads the final month: take that column (in blocks for
+            # memmap-backed paths) and keep it as (paths, 1) arrays
+            if results is not None:
+                final_cash = _final_month(results)[:, None]
+                final_driver_samples = {name: _final_month(samples)[:, None] for name, samples in driver_samples.items()}
+            if cached_paths:
+                # Cached paths first, then this run's continuation of the same streams
+                summary = cached if results is None else cached.extend(accumulator, final_cash, final_driver_samples)
+                summary_source = summary.accumulator
+                final_cash, final_driver_samples = summary.final_cash, summary.final_driver_samples
+            elif store_summary:
+                summary = CachedSimulation(accumulator, final_cash, final_driver_samples)
+            if store_summary and results is not None:
+                store_cached_simulation(cache_digest, summary)
             
             # Calculate percentiles and confidence intervals
             try:
@@ -464,31 +436,12 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
                     pass
                 logger.warning(f"Error updating progress (non-critical): {str(progress_error)}")
             
-            percentiles_data = compute_percentiles(results, month_keys)
+            percentiles_data = compute_percentiles(summary_source, month_keys)
             
             # Calculate survival probability (MVP FEATURE - Probability of survival, not point forecast)
             try:
-                # Get initial cash from model data
-                initial_cash = 0.0
-                if model_data:
-                    baseline = model_data.get('baseline', {})
-                    if isinstance(baseline, dict):
-                        initial_cash = float(baseline.get('cash', baseline.get('cashBalance', baseline.get('initialCash', 0.0))))
-                    # Also try to get from summary_json if available
-                    if initial_cash == 0.0:
-                        try:
-                            cursor.execute("""
-                                SELECT summary_json->>'cashBalance'
-                                FROM model_runs
-                                WHERE id = %s
-                            """, (model_run_id,))
-                            summary_row = cursor.fetchone()
-                            if summary_row and summary_row[0]:
-                                initial_cash = float(summary_row[0])
-                        except:
-                            pass
-                
-                survival_probability = compute_survival_probability(results, month_keys, initial_cash)
+                # Initial cash from the model baseline (or the run summary), resolved with the plan
+                survival_probability = compute_survival_probability(summary_source, month_keys, plan.initial_cash)
                 percentiles_data['survival_probability'] = survival_probability
             except Exception as e:
                 logger.warning(f"Error computing survival probability: {str(e)}")
@@ -496,7 +449,7 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             
             # Calculate confidence intervals
             try:
-                confidence_intervals = compute_confidence_intervals(results, [0.80, 0.90, 0.95])
+                confidence_intervals = compute_confidence_intervals(summary_source, [0.80, 0.90, 0.95])
                 percentiles_data['confidence_intervals'] = confidence_intervals
             except Exception as e:
                 logger.warning(f"Error computing confidence intervals: {str(e)}")
@@ -507,39 +460,29 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             sensitivity_json_str = json.dumps([], separators=(',', ':'))  # Initialize to empty array
             
             try:
-                if driver_samples and len(driver_samples) > 0:
+                if final_driver_samples:
                     tornado_sensitivity = compute_tornado_sensitivity(
-                        results, drivers, driver_samples, months
+                        final_cash, drivers, final_driver_samples, months
                     )
                     percentiles_data['tornado_sensitivity'] = tornado_sensitivity
                     
                     # Also format for sensitivity_json field (array format for frontend)
-                    # Convert dict format to array format for easier frontend consumption
-                    sensitivity_array = []
-                    for driver_name, sensitivity_data in tornado_sensitivity.items():
-                        # Calculate p-value using statistical test
-                        try:
-                            from scipy.stats import pearsonr
-                            if driver_name in driver_samples:
-                                driver_values = driver_samples[driver_name][:, -1]  # Last month
-                                final_cash = results[:, -1]
-                                if len(driver_values) > 2 and np.std(driver_values) > 1e-10:
-                                    _, p_value = pearsonr(driver_values, final_cash)
-                                else:
-                                    p_value = 1.0
-                            else:
-                                p_value = 1.0
-                        except Exception as p_error:
-                            logger.warning(f"Error calculating p-value for {driver_name}: {str(p_error)}")
-                            p_value = 1.0
-                        
-                        sensitivity_array.append({
+                    # Convert dict format to array format for easier frontend consumption;
+                    # p-values of every driver's correlation in one vectorized call
+                    p_values = correlation_p_values(
+                        [data.get('pearson_correlation', 0.0) for data in tornado_sensitivity.values()],
+                        final_cash.shape[0]
+                    )
+                    sensitivity_array = [
+                        {
                             'driver': driver_name,
                             'correlation': sensitivity_data.get('pearson_correlation', 0.0),
                             'spearman_correlation': sensitivity_data.get('spearman_correlation', 0.0),
                             'abs_correlation': sensitivity_data.get('abs_correlation', 0.0),
-                            'p_value': float(p_value) if not np.isnan(p_value) else 1.0,
-                        })
+                            'p_value': float(p_value),
+                        }
+                        for (driver_name, sensitivity_data), p_value in zip(tornado_sensitivity.items(), p_values)
+                    ]
                     
                     # Store as JSON string for sensitivity_json field
                     sensitivity_json_str = json.dumps(sensitivity_array, separators=(',', ':'))
@@ -554,6 +497,11 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
             
             # Add distribution definitions metadata
             percentiles_data['distribution_definitions'] = DISTRIBUTION_DEFINITIONS
+            percentiles_data['sampling'] = {'method': sampling['method'], 'antithetic': sampling['antithetic']}
+            if convergence is not None:
+                # Achieved precision of the target metrics (and whether the tolerance was met before the max)
+                percentiles_data['convergence'] = convergence.report(accumulator, num_simulations)
+            paths_simulated = int(results.shape[0]) if results is not None else 0
             
             # Upload results to S3 (optional - fallback to database if S3 not configured)
             result_key = None
@@ -655,6 +603,8 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
                     'cpuSecondsActual': cpu_seconds,
                     'months': months,
                     'numSimulations': num_simulations,
+                    'pathsSimulated': paths_simulated,
+                    'cachedPaths': cached_paths,
                     'hasSensitivity': len(tornado_sensitivity) > 0,
                     'sensitivityDrivers': len(tornado_sensitivity),
                 }), job_id))
@@ -677,7 +627,7 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
                 except Exception as retry_error:
                     logger.warning(f"Error updating job status (non-critical, monte carlo job already saved): {str(retry_error)}")
             
-            logger.info(f"✅ Monte Carlo job {mc_job_id} completed: {num_simulations} sims, {cpu_seconds:.2f}s CPU")
+            logger.info(f"✅ Monte Carlo job {mc_job_id} completed: {num_simulations} sims ({paths_simulated} simulated, {cached_paths} cached), {cpu_seconds:.2f}s CPU")
             
             # Trigger alert check
             try:
@@ -722,6 +672,8 @@ def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
         raise
     finally:
         # Clean up resources
+        if path_file:
+            discard_path_file(path_file)
         if cursor:
             try:
                 cursor.close()
@@ -779,211 +731,99 @@ def load_model_snapshot(model_run_id: str, cursor) -> dict:
         raise
 
 
+def _simulate_paths(
+    results: np.ndarray,
+    driver_arrays: List[np.ndarray],
+    plan: SimulationPlan,
+    job_id: Optional[str] = None
+) -> int:
+    """
+    Output metric (ending cash) of every path from its sampled driver paths.
+
+    Args:
+        results: Output array (paths × months), filled in place
+        driver_arrays: Sampled driver paths, each (paths × months), in plan.driver_names order
+        plan: The job's SimulationPlan (baseline, assumptions, overrides, output metric)
+        job_id: Job to report progress against (None inside pool workers)
+
+    Returns:
+        Number of accounting identity violations (constraint × path × month)
+    """
+    num_simulations, months = results.shape
+    section, line = plan.output
+
+    start_dt = parse_date(plan.start_month)
+    engine = ThreeStatementEngine()
+    identity_violations = 0
+
+    # Paths are evaluated in batches: each batch is one set of array passes
+    # through the 3-statement model with a leading path axis
+    for batch_start in range(0, num_simulations, MONTECARLO_STATEMENT_BATCH):
+        batch_stop = min(num_simulations, batch_start + MONTECARLO_STATEMENT_BATCH)
+
+        # Per-path assumptions: each driver's sampled monthly path, shaped
+        # (paths, months), so month-level variation reaches revenue, costs and cash
+        path_drivers = {
+            assumption: d_array[batch_start:batch_stop, :]
+            for assumption, d_array in zip(plan.assumptions, driver_arrays)
+        }
+
+        # Run the full 3-statement model for every path in the batch
+        sim_res = engine.compute_statement_batch(
+            start_month=start_dt,
+            horizon_months=months,
+            initial_values=dict(plan.initial_values),
+            growth_assumptions=plan.base_growth,
+            path_drivers=path_drivers,
+            monthly_overrides=plan.overrides
+        )
+
+        # Ending cash for each month
+        results[batch_start:batch_stop, :] = getattr(sim_res, section)[line]
+
+        # Every accounting identity, checked on every path of the batch
+        identity_violations += len(statement_array_violations(sim_res))
+
+        if job_id:
+            prog_val = 10 + int((batch_stop / num_simulations) * 70)
+            update_progress(job_id, prog_val, {'status': 'simulating', 'path': batch_stop})
+
+    return identity_violations
+
+
 def run_vectorized_simulations_enhanced(
+    plan: SimulationPlan,
     num_simulations: int,
-    months: int,
-    drivers: Dict[str, Dict],
-    overrides: Dict,
-    seed: int,
-    job_id: str,
-    cursor,
-    conn,
-    logs: dict,
-    model_data: Optional[Dict] = None
+    job_id: str
 ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
     """
     Run vectorized simulations using NumPy with enhanced distribution support.
     Optimized for performance with proper error handling.
     """
     try:
+        months = plan.months
         # Validate inputs
         if num_simulations <= 0 or months <= 0:
             raise ValueError(f"Invalid dimensions: num_simulations={num_simulations}, months={months}")
         
-        # Initialize random number generator with seed
-        try:
-            rng = np.random.default_rng(seed)
-        except Exception as e:
-            logger.warning(f"Error initializing RNG with seed {seed}, using default: {str(e)}")
-            rng = np.random.default_rng()
-        
         # Prepare results array: we want to track Ending Cash as the primary output
         results = np.zeros((num_simulations, months), dtype=np.float64)
         
         # Prepare driver arrays (num_simulations × months) using enhanced distribution sampling
-        driver_arrays = {}
         try:
-            for driver_name, driver_config in drivers.items():
-                dist_type = driver_config.get('dist', 'normal')
-                driver_arrays[driver_name] = sample_distribution(
-                    dist_type, driver_config, (num_simulations, months), rng
-                )
+            sampler = plan.sampler
+            driver_arrays = sampler.by_driver(sampler.sample(0, num_simulations, months, plan.seed))
         except Exception as e:
             logger.error(f"Error preparing driver arrays: {str(e)}", exc_info=True)
             raise
         
-        # Apply model computation using ThreeStatementEngine for EACH path
+        # Apply model computation using ThreeStatementEngine for every path at once
         # This ensures full 3-statement integrity for every simulation
         try:
-            # Get baseline values and assumptions
-            baseline = model_data.get('baseline', {}) if model_data else {}
-            # If baseline cash is missing, fall back to model_runs.summary_json cashBalance
-            baseline_cash = None
-            try:
-                if isinstance(baseline, dict):
-                    baseline_cash = baseline.get('cash', baseline.get('cashBalance', baseline.get('initialCash')))
-            except Exception:
-                baseline_cash = None
-
-            if baseline_cash is None:
-                try:
-                    cursor.execute("""
-                        SELECT summary_json->>'cashBalance'
-                        FROM model_runs
-                        WHERE id = %s
-                    """, (model_data.get('modelRunId') if isinstance(model_data, dict) else None,))
-                except Exception:
-                    pass
-
-            if baseline_cash is None:
-                try:
-                    cursor.execute("""
-                        SELECT summary_json->>'cashBalance'
-                        FROM model_runs
-                        WHERE id = %s
-                    """, (model_data.get('model_run_id') if isinstance(model_data, dict) else None,))
-                    row = cursor.fetchone()
-                    if row and row[0] is not None:
-                        baseline_cash = float(row[0])
-                except Exception:
-                    baseline_cash = None
-
-            # Anchor baseline revenue & burn from model_runs.summary_json when model_json baseline is missing.
-            baseline_revenue = None
-            baseline_monthly_burn = None
-            try:
-                if isinstance(baseline, dict):
-                    baseline_revenue = baseline.get('revenue')
-            except Exception:
-                baseline_revenue = None
-
-            try:
-                cursor.execute("""
-                    SELECT
-                        summary_json->>'mrr',
-                        summary_json->>'monthlyRevenue',
-                        summary_json->>'revenue',
-                        summary_json->>'monthlyBurn',
-                        summary_json->>'burnRate',
-                        summary_json->>'expenses',
-                        summary_json->>'opex'
-                    FROM model_runs
-                    WHERE id = %s
-                """, (model_data.get('model_run_id') if isinstance(model_data, dict) else None,))
-                srow = cursor.fetchone()
-                if srow:
-                    if baseline_revenue is None:
-                        for v in [srow[0], srow[1], srow[2]]:
-                            if v is not None:
-                                try:
-                                    baseline_revenue = float(v)
-                                    break
-                                except Exception:
-                                    pass
-                    for v in [srow[3], srow[4], srow[5], srow[6]]:
-                        if v is not None:
-                            try:
-                                baseline_monthly_burn = float(v)
-                                break
-                            except Exception:
-                                pass
-            except Exception:
-                pass
-
-            if baseline_revenue is None:
-                baseline_revenue = 100000.0
-            if baseline_monthly_burn is None:
-                baseline_monthly_burn = 50000.0
-
-            # Convert burn into opexPercentage for 3-statement engine: opex ~= revenue * opexPercentage.
-            # Clamp to avoid extreme or invalid values.
-            opex_percentage_from_burn = 0.30
-            try:
-                if baseline_revenue > 0:
-                    opex_percentage_from_burn = float(baseline_monthly_burn / baseline_revenue)
-            except Exception:
-                opex_percentage_from_burn = 0.30
-            if opex_percentage_from_burn < 0:
-                opex_percentage_from_burn = 0.0
-            if opex_percentage_from_burn > 10:
-                opex_percentage_from_burn = 10.0
-
-            initial_values = {
-                'cash': float(baseline_cash if baseline_cash is not None else 1000000),
-                'revenue': float(baseline_revenue),
-                'accountsReceivable': float(baseline.get('accountsReceivable', 50000)),
-                'accountsPayable': float(baseline.get('accountsPayable', 30000)),
-                'inventory': float(baseline.get('inventory', 20000)),
-                'ppe': float(baseline.get('ppe', 500000)),
-                'debt': float(baseline.get('debt', 200000)),
-                'equity': float(baseline.get('equity', 1000000)),
-                'retainedEarnings': float(baseline.get('retainedEarnings', 0))
-            }
+            identity_violations = _simulate_paths(results, list(driver_arrays.values()), plan, job_id)
             
-            base_growth = {
-                'revenueGrowth': 0.05,
-                'cogsPercentage': 0.40,
-                'opexPercentage': opex_percentage_from_burn,
-                'taxRate': 0.25,
-                'depreciationRate': 0.01,
-                'arDays': 45,
-                'apDays': 30,
-                'capexPercentage': 0.05,
-                'dio': 45
-            }
-            
-            # Map drivers to growth assumptions
-            # Driver keys from frontend might be like "revenue_growth" or "opex_percentage"
-            driver_mapping = {
-                'revenue_growth': 'revenueGrowth',
-                'cogs_percentage': 'cogsPercentage',
-                'opex_percentage': 'opexPercentage',
-                'ar_days': 'arDays',
-                'ap_days': 'apDays',
-                'dio': 'dio'
-            }
-            
-            start_month_str = datetime.now().strftime('%Y-%m')
-            
-            for s in range(num_simulations):
-                # Build assumptions for THIS simulation path
-                sim_assumptions = base_growth.copy()
-                for d_name, d_array in driver_arrays.items():
-                    # Map driver name to assumption key
-                    mapped_key = driver_mapping.get(d_name, d_name)
-                    # Use the average value of the driver for this simulation path
-                    # or the value at the specific month if we wanted time-varying (simpler to use mean for now)
-                    sim_assumptions[mapped_key] = float(np.mean(d_array[s, :]))
-                
-                # Run the full 3-statement model
-                sim_res = compute_three_statements(
-                    start_month=start_month_str,
-                    horizon_months=months,
-                    initial_values=initial_values,
-                    growth_assumptions=sim_assumptions,
-                    monthly_overrides=overrides
-                )
-                
-                # Extract ending cash for each month
-                monthly_cf = sim_res['cashFlow']['monthly']
-                for m_idx, (m_key, cf_data) in enumerate(monthly_cf.items()):
-                    if m_idx < months:
-                        results[s, m_idx] = cf_data['endingCash']
-                
-                # Periodically update progress within simulation
-                if s % 500 == 0 and s > 0:
-                    prog_val = 10 + int((s / num_simulations) * 70)
-                    update_progress(job_id, prog_val, {'status': 'simulating', 'path': s})
+            if identity_violations:
+                logger.warning(f"{identity_violations} accounting identity violations (constraint x path x month) across {num_simulations} paths")
             
             # Validate results (check for NaN or Inf)
             if np.any(np.isnan(results)) or np.any(np.isinf(results)):
@@ -1007,76 +847,329 @@ def run_vectorized_simulations_enhanced(
         raise
 
 
+MONTECARLO_WORKER_PLANS = 8  # Plans kept per process (one per concurrently running job)
+_worker_plans: Dict[str, SimulationPlan] = {}  # Plans already unpickled in this (pool) process
+
+
+def _task_plan(task: Dict[str, Any]) -> SimulationPlan:
+    """The run's plan, unpickled once per process and reused for its other chunks"""
+    plan = _worker_plans.get(task['plan_token'])
+    if plan is None:
+        if len(_worker_plans) >= MONTECARLO_WORKER_PLANS:
+            _worker_plans.clear()
+        plan = _worker_plans[task['plan_token']] = pickle.loads(task['plan'])
+    return plan
+
+
+def _fill_simulation_chunk(arrays: np.ndarray, task: Dict[str, Any]) -> Dict[str, Any]:
+    plan = _task_plan(task)
+    start, stop = task['start'], task['stop']
+    # Storage rows start .. stop - 1 hold the run's paths first_path + start .. first_path + stop - 1
+    first_path = plan.first_path
+
+    # Samples go straight into the storage rows, viewed as (paths, months, drivers); Latin
+    # Hypercube strata span all num_simulations paths (an adaptive run that stops early uses a prefix)
+    plan.sampler.sample(first_path + start, first_path + stop, plan.months, plan.seed,
+                        out=arrays[1:, start:stop].transpose(1, 2, 0), total=plan.num_simulations)
+    driver_arrays = [arrays[index, start:stop] for index in range(1, len(plan.driver_names) + 1)]
+
+    identity_violations = _simulate_paths(arrays[0, start:stop], driver_arrays, plan)
+    return {
+        'chunk': task['chunk'],
+        'paths': stop - start,
+        'identity_violations': identity_violations,
+        'accumulator': SimulationAccumulator(plan.months).update(arrays[0, start:stop]),
+    }
+
+
+def _run_simulation_chunk(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sample and simulate one chunk of paths (runs in a pool worker).
+
+    Driver samples and ending cash are written straight into the job's path storage
+    (see _PathStorage); only a small summary (with the chunk's SimulationAccumulator)
+    travels back to the parent.
+    """
+    if task.get('path'):
+        arrays = np.memmap(task['path'], dtype=np.float64, mode='r+', shape=task['shape'])
+        try:
+            return _fill_simulation_chunk(arrays, task)
+        finally:
+            arrays.flush()
+            del arrays
+
+    block = shared_memory.SharedMemory(name=task['block'])
+    try:
+        return _fill_simulation_chunk(np.ndarray(task['shape'], dtype=np.float64, buffer=block.buf), task)
+    finally:
+        block.close()
+
+
+class _PathStorage:
+    """
+    Ending cash and driver samples of a chunked run, laid out as
+    (1 + drivers, paths, months) float64 with ending cash first.
+
+    'memory' keeps them in a shared-memory block that is copied out once every chunk
+    is done; 'memmap' keeps them in a file under MONTECARLO_TEMP_DIR and hands out
+    memmap views, so path counts scale with disk rather than RAM. The file is removed
+    by discard_path_file once the job's post-processing is finished.
+    """
+
+    def __init__(self, shape: Tuple[int, int, int], storage: str, job_id: str):
+        self.shape = shape
+        self.path = None
+        self.block = None
+        if storage == 'memmap':
+            os.makedirs(MONTECARLO_TEMP_DIR, exist_ok=True)
+            self.path = os.path.join(MONTECARLO_TEMP_DIR, f"{job_id}-{uuid.uuid4().hex}.paths")
+            with open(self.path, 'wb') as f:
+                f.truncate(max(1, int(np.prod(shape)) * 8))
+        else:
+            self.block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+
+    def task_ref(self) -> Dict[str, str]:
+        """How a pool worker opens the storage"""
+        return {'path': self.path} if self.path else {'block': self.block.name}
+
+    def collect(self, driver_names: List[str], num_paths: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Ending cash (paths × months) and driver samples of the first num_paths paths (all by
+        default), copied out of shared memory or as memmap views
+        """
+        num_paths = self.shape[1] if num_paths is None else num_paths
+        if self.path:
+            arrays = np.memmap(self.path, dtype=np.float64, mode='r+', shape=self.shape)
+            _sanitize_blocks(arrays[0, :num_paths])
+            return arrays[0, :num_paths], {name: arrays[index, :num_paths] for index, name in enumerate(driver_names, start=1)}
+
+        arrays = np.ndarray(self.shape, dtype=np.float64, buffer=self.block.buf)
+        results = np.array(arrays[0, :num_paths])
+        driver_samples = {name: np.array(arrays[index, :num_paths]) for index, name in enumerate(driver_names, start=1)}
+        del arrays
+        if np.any(np.isnan(results)) or np.any(np.isinf(results)):
+            logger.warning("NaN or Inf values detected in results, replacing with zeros")
+            results = np.nan_to_num(results, nan=0.0, posinf=0.0, neginf=0.0)
+        return results, driver_samples
+
+    def release(self, keep_file: bool = False) -> None:
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+        if self.path and not keep_file:
+            discard_path_file(self.path)
+
+
+def _sanitize_blocks(values: np.ndarray) -> None:
+    """Replace NaN/Inf with zeros in place, one block of paths at a time"""
+    replaced = False
+    for start in range(0, values.shape[0], MONTECARLO_BLOCK_ROWS):
+        block = values[start:start + MONTECARLO_BLOCK_ROWS]
+        bad = ~np.isfinite(block)
+        if bad.any():
+            block[bad] = 0.0
+            replaced = True
+    if replaced:
+        logger.warning("NaN or Inf values detected in results, replacing with zeros")
+
+
+def _final_month(values: np.ndarray) -> np.ndarray:
+    """Last-month column of a (paths × months) array, read one block of paths at a time"""
+    if not isinstance(values, np.memmap):
+        return values[:, -1]
+    return np.concatenate([
+        np.array(values[start:start + MONTECARLO_BLOCK_ROWS, -1])
+        for start in range(0, values.shape[0], MONTECARLO_BLOCK_ROWS)
+    ])
+
+
+def discard_path_file(path: Optional[str]) -> None:
+    """Remove a memmap path file (no-op for in-memory results or a missing file)"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not remove Monte Carlo path file {path}: {str(e)}")
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if MONTECARLO_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Not fork: job threads keep running while the pool starts, and a forked child can
+            # inherit a lock one of them held (logging, DB driver, allocator) and deadlock on it.
+            # Chunk tasks carry the pickled plan and a storage name, so workers need no parent state.
+            _pool = ProcessPoolExecutor(max_workers=MONTECARLO_WORKERS,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
 def run_chunked_simulations_enhanced(
+    plan: SimulationPlan,
     num_simulations: int,
-    months: int,
-    drivers: Dict[str, Dict],
-    overrides: Dict,
-    seed: int,
     job_id: str,
-    cursor,
-    conn,
-    logs: dict,
-    model_data: Optional[Dict] = None
-) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
-    """Run simulations in chunks to manage memory efficiently"""
+    storage: str = 'memory',
+    convergence: Optional[ConvergenceMonitor] = None,
+    first_path: int = 0
+) -> Tuple[np.ndarray, Dict[str, np.ndarray], SimulationAccumulator]:
+    """
+    Run simulations in chunks across a process pool.
+
+    Driver samples depend only on the seed and the path row (see DriverSampler.sample),
+    so results are reproducible and the same for any chunking or number of workers
+    (including the serial fallback). The plan, with this run's chunk schedule, is
+    pickled once and unpickled once per worker process.
+
+    With first_path > 0 only paths first_path .. num_simulations - 1 are run, exactly
+    the tail of a full num_simulations run; this extends a cached run of first_path paths.
+
+    With a ConvergenceMonitor, num_simulations is the maximum: chunks become
+    MONTECARLO_CONVERGENCE_BATCH_PATHS-path batches, fed to the monitor in chunk order,
+    and the run stops after the first batch at which it has converged. The returned
+    matrices then hold only the paths of the batches that were used.
+
+    Returns the ending cash matrix, the driver samples and the merged
+    SimulationAccumulator of all chunks (exact counts, so merge order does not matter).
+    With storage='memmap' the matrices are memmap views of a file under
+    MONTECARLO_TEMP_DIR; the caller removes it with discard_path_file(results.filename)
+    once post-processing is done. On failure or cancellation it is removed here.
+    """
     try:
-        num_drivers = max(len(drivers), 1)
+        months = plan.months
+        driver_names = plan.driver_names
+        num_drivers = max(len(driver_names), 1)
         bytes_per_sim = months * 8 * num_drivers
         safe_memory = int(MONTECARLO_CHUNK_RAM_BYTES * 0.8)
-        chunk_size = min(num_simulations, max(100, int(safe_memory / bytes_per_sim)))
+        new_paths = num_simulations - first_path
+        if new_paths <= 0:
+            raise ValueError(f"Invalid path range: first_path={first_path}, num_simulations={num_simulations}")
+        chunk_size = min(new_paths, MONTECARLO_CHUNK_PATHS, max(100, int(safe_memory / bytes_per_sim)))
+        if convergence is not None:
+            chunk_size = min(chunk_size, max(1, MONTECARLO_CONVERGENCE_BATCH_PATHS))
+        chunks = plan.schedule(num_simulations, chunk_size, first_path).chunks
+        num_chunks = len(chunks)
         
-        logger.info(f"Chunking: {num_simulations} sims in chunks of {chunk_size}")
+        logger.info(f"Chunking: {new_paths} sims in {num_chunks} chunks of {chunk_size}")
         
-        all_results = []
-        all_driver_samples = {name: [] for name in drivers.keys()}
-        num_chunks = (num_simulations + chunk_size - 1) // chunk_size
+        plan_bytes = plan.to_bytes()
+        plan_token = uuid.uuid4().hex
+        shape = (len(driver_names) + 1, new_paths, months)
+        path_storage = _PathStorage(shape, storage, job_id)
+        completed_ok = False
         
-        for chunk_idx in range(num_chunks):
-            # Check for cancellation during chunking
-            if check_cancel_requested(job_id):
-                mark_cancelled(job_id)
-                raise InterruptedError("Job cancelled during chunk processing")
+        try:
+            tasks = [{
+                **path_storage.task_ref(),
+                'chunk': chunk_idx,
+                'shape': shape,
+                'start': start,
+                'stop': stop,
+                'plan': plan_bytes,
+                'plan_token': plan_token,
+            } for chunk_idx, (start, stop) in enumerate(chunks)]
             
-            chunk_start = chunk_idx * chunk_size
-            chunk_end = min(chunk_start + chunk_size, num_simulations)
-            chunk_size_actual = chunk_end - chunk_start
+            completed = set()
+            pending = {}  # finished chunks waiting for every earlier chunk
+            identity_violations = 0
+            accumulator = SimulationAccumulator(months)
+            used_chunks = 0  # chunks [0, used_chunks) are merged into the result
+            stop_chunks = num_chunks  # lowered once an adaptive run converges
             
-            chunk_seed = (seed + chunk_idx) % (2**31 - 1)
+            def record(summary: Dict[str, Any]) -> None:
+                nonlocal identity_violations, used_chunks, stop_chunks
+                completed.add(summary['chunk'])
+                pending[summary['chunk']] = summary
+                # Merge in chunk order, so an adaptive run stops at the same chunk however they were scheduled
+                while used_chunks < stop_chunks and used_chunks in pending:
+                    done = pending.pop(used_chunks)
+                    identity_violations += done['identity_violations']
+                    accumulator.merge(done['accumulator'])
+                    used_chunks += 1
+                    if convergence is not None and convergence.add(done['accumulator']):
+                        stop_chunks = used_chunks
+                        logger.info(f"Converged after {used_chunks} of {num_chunks} batches ({convergence.num_paths} paths)")
+                progress = 10 + int(min(len(completed) / stop_chunks, 1.0) * 70)
+                update_progress(job_id, progress, {
+                    'status': 'processing_chunks',
+                    'chunk': len(completed),
+                    'total_chunks': num_chunks,
+                })
             
-            # Run chunk
-            chunk_results, chunk_drivers = run_vectorized_simulations_enhanced(
-                chunk_size_actual, months, drivers, overrides, chunk_seed,
-                job_id, cursor, conn, logs, model_data
-            )
+            pool = _get_pool() if num_chunks > 1 else None
+            if pool is not None:
+                futures = [pool.submit(_run_simulation_chunk, task) for task in tasks]
+                try:
+                    for future in as_completed(futures):
+                        record(future.result())
+                        if stop_chunks < num_chunks:
+                            # Converged: drop queued chunks and let running ones finish writing
+                            for queued in futures:
+                                queued.cancel()
+                            wait(futures)
+                            break
+                        # Check for cancellation as chunks complete
+                        if len(completed) < num_chunks and check_cancel_requested(job_id):
+                            mark_cancelled(job_id)
+                            raise InterruptedError("Job cancelled during chunk processing")
+                except InterruptedError:
+                    for future in futures:
+                        future.cancel()
+                    raise
+                except Exception as e:
+                    logger.warning(f"Monte Carlo pool unavailable ({e}), running remaining chunks serially")
+                    for future in futures:
+                        future.cancel()
+                    _reset_pool()
             
-            all_results.append(chunk_results)
-            for name, samples in chunk_drivers.items():
-                all_driver_samples[name].append(samples)
+            # Serial path (single worker, single chunk, or chunks left by a failed pool);
+            # each chunk has its own seed, so the results are the same either way
+            for task in tasks:
+                if used_chunks >= stop_chunks:
+                    break
+                if task['chunk'] in completed:
+                    continue
+                # Check for cancellation during chunking
+                if check_cancel_requested(job_id):
+                    mark_cancelled(job_id)
+                    raise InterruptedError("Job cancelled during chunk processing")
+                record(_run_simulation_chunk(task))
             
-            # Update progress
-            progress = 10 + int((chunk_idx + 1) / num_chunks * 70)
-            update_progress(job_id, progress, {
-                'status': 'processing_chunks',
-                'chunk': chunk_idx + 1,
-                'total_chunks': num_chunks,
-            })
+            # Validate results (NaN or Inf become zeros) while collecting them
+            num_paths = tasks[stop_chunks - 1]['stop']
+            final_results, final_drivers = path_storage.collect(driver_names, num_paths)
+            completed_ok = True
+        finally:
+            # The memmap file outlives a successful run; the caller discards it
+            path_storage.release(keep_file=completed_ok)
         
-        # Concatenate all chunks
-        logger.info(f"Concatenating {num_chunks} chunks...")
-        final_results = np.concatenate(all_results, axis=0)
-        final_drivers = {
-            name: np.concatenate(samples_list, axis=0)
-            for name, samples_list in all_driver_samples.items()
-        }
+        if identity_violations:
+            logger.warning(f"{identity_violations} accounting identity violations (constraint x path x month) across {num_paths} paths")
         
-        return final_results, final_drivers
+        return final_results, final_drivers, accumulator
     except Exception as e:
         logger.error(f"Error in chunked simulations: {str(e)}", exc_info=True)
         raise
 
 
-def compute_survival_probability(results: np.ndarray, month_keys: List[str], initial_cash: float = 0.0) -> dict:
+def compute_survival_probability(results: Union[np.ndarray, SimulationAccumulator], month_keys: List[str], initial_cash: float = 0.0) -> dict:
     """
     Compute survival probability - MVP FEATURE: Probability of survival, not point forecast.
     
@@ -1084,7 +1177,8 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
     This is the key probabilistic metric that shows likelihood of survival, not just a single forecast.
     
     Args:
-        results: Array of shape (num_simulations, months) with cash flow results
+        results: Array of shape (num_simulations, months) with cash flow results, or the
+                 run's SimulationAccumulator (its survival counts are of ending cash balances)
         month_keys: List of month identifiers
         initial_cash: Starting cash balance (default 0, assumes results are cumulative)
     
@@ -1092,42 +1186,21 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
         Dictionary with survival probabilities at each time point and runway thresholds
     """
     try:
-        if results.size == 0:
+        if isinstance(results, SimulationAccumulator):
+            survival = results.survival
+        else:
+            survival = _survival_counts(results, initial_cash)
+        
+        if survival.num_paths == 0:
             raise ValueError("Results array is empty")
         
-        num_simulations = results.shape[0]
-        months = results.shape[1]
-        
-        # IMPORTANT: results semantics
-        # In this codebase, Monte Carlo simulation outputs are typically *ending cash balances*
-        # for each month (see run_vectorized_simulations_enhanced: results[s, m] = endingCash).
-        # Applying cumsum() to ending balances will incorrectly inflate cash and can produce
-        # survival_probability ~= 1.0 even when runway is near-zero.
-        #
-        # For safety/backward-compatibility, we detect whether `results` appears to already be
-        # an ending-cash series; if so, we use it directly. Otherwise, we treat it as monthly
-        # cash deltas and cumsum + initial_cash.
-
-        # Heuristic: treat as balances if magnitudes look balance-like (large relative to $0),
-        # regardless of proximity to initial_cash (month-1 ending cash can differ materially
-        # from initial cash when burn is large).
-        use_as_balances = False
-        try:
-            if months > 0:
-                first_col = results[:, 0]
-                use_as_balances = np.nanmedian(np.abs(first_col)) > 1000.0
-        except Exception:
-            use_as_balances = False
-
-        if use_as_balances:
-            cumulative_cash = results.astype(np.float64, copy=False)
-        else:
-            cumulative_cash = np.cumsum(results, axis=1) + initial_cash
+        num_simulations = survival.num_paths
+        months = survival.months
         
         # For each month, calculate probability that cash > 0 (survival)
         survival_by_month = []
         for m in range(months):
-            positive_cash = np.sum(cumulative_cash[:, m] > 0)
+            positive_cash = survival.positive[m]
             survival_prob = positive_cash / num_simulations
             survival_by_month.append({
                 'month': month_keys[m] if m < len(month_keys) else f"Month_{m+1}",
@@ -1143,7 +1216,7 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
         
         for threshold_months in runway_thresholds:
             if threshold_months <= months:
-                survived_to_threshold = np.sum(cumulative_cash[:, threshold_months - 1] > 0)
+                survived_to_threshold = survival.positive[threshold_months - 1]
                 prob = survived_to_threshold / num_simulations
                 runway_survival[f"{threshold_months}_months"] = {
                     'thresholdMonths': threshold_months,
@@ -1154,17 +1227,10 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
                 }
         
         # Overall survival metrics
-        final_survival = np.sum(cumulative_cash[:, -1] > 0) / num_simulations
-        
-        failure_months = []
-        for sim_idx in range(num_simulations):
-            for m in range(months):
-                if cumulative_cash[sim_idx, m] <= 0:
-                    failure_months.append(m + 1)
-                    break
+        final_survivors = int(survival.positive[-1])
+        final_survival = final_survivors / num_simulations
         
-        avg_months_to_failure = float(np.mean(failure_months)) if failure_months else float(months)
-        median_months_to_failure = float(np.median(failure_months)) if failure_months else float(months)
+        avg_months_to_failure, median_months_to_failure = survival.months_to_failure()
         
         return {
             'byMonth': survival_by_month,
@@ -1175,8 +1241,8 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
                 'averageMonthsToFailure': avg_months_to_failure,
                 'medianMonthsToFailure': median_months_to_failure,
                 'totalSimulations': int(num_simulations),
-                'simulationsSurvived': int(np.sum(cumulative_cash[:, -1] > 0)),
-                'simulationsFailed': int(np.sum(cumulative_cash[:, -1] <= 0)),
+                'simulationsSurvived': final_survivors,
+                'simulationsFailed': int(num_simulations - final_survivors),
             },
             'summary': {
                 'keyMessage': f"Probability of survival: {final_survival * 100:.1f}% chance of surviving the full {months}-month forecast period",
@@ -1188,40 +1254,93 @@ def compute_survival_probability(results: np.ndarray, month_keys: List[str], ini
         raise
 
 
-def compute_percentiles(results: np.ndarray, month_keys: List[str]) -> dict:
+def _survival_counts(results: np.ndarray, initial_cash: float = 0.0) -> SurvivalCounter:
+    """Survival counts of a full (num_simulations, months) results matrix"""
+    survival = SurvivalCounter(results.shape[1] if results.ndim == 2 else 0)
+    if results.size == 0:
+        return survival
+    months = results.shape[1]
+    
+    # IMPORTANT: results semantics
+    # In this codebase, Monte Carlo simulation outputs are typically *ending cash balances*
+    # for each month (see run_vectorized_simulations_enhanced: results[s, m] = endingCash).
+    # Applying cumsum() to ending balances will incorrectly inflate cash and can produce
+    # survival_probability ~= 1.0 even when runway is near-zero.
+    #
+    # For safety/backward-compatibility, we detect whether `results` appears to already be
+    # an ending-cash series; if so, we use it directly. Otherwise, we treat it as monthly
+    # cash deltas and cumsum + initial_cash.
+
+    # Heuristic: treat as balances if magnitudes look balance-like (large relative to $0),
+    # regardless of proximity to initial_cash (month-1 ending cash can differ materially
+    # from initial cash when burn is large).
+    use_as_balances = False
+    try:
+        if months > 0:
+            first_col = results[:, 0]
+            use_as_balances = np.nanmedian(np.abs(first_col)) > 1000.0
+    except Exception:
+        use_as_balances = False
+
+    if use_as_balances:
+        cumulative_cash = results.astype(np.float64, copy=False)
+    else:
+        cumulative_cash = np.cumsum(results, axis=1) + initial_cash
+    
+    survival.update(cumulative_cash)
+    return survival
+
+
+def compute_percentiles(results: Union[np.ndarray, SimulationAccumulator], month_keys: List[str]) -> dict:
     """
     Compute percentiles from simulation results (optimized with error handling).
     Uses vectorized numpy operations for performance.
+    
+    results is the (num_simulations, months) matrix, or the run's SimulationAccumulator;
+    its quantile sketch gives the same fan within the sketch's relative accuracy
+    without the full matrix.
     """
     try:
-        # Validate input
-        if results.size == 0:
-            raise ValueError("Results array is empty")
-        
-        if len(results.shape) != 2:
-            raise ValueError(f"Results must be 2D array, got shape {results.shape}")
-        
-        if results.shape[1] != len(month_keys):
-            raise ValueError(f"Month keys count ({len(month_keys)}) doesn't match results shape ({results.shape[1]})")
-        
-        # Ensure float64 for numerical stability
-        if results.dtype != np.float64:
-            results = results.astype(np.float64)
-        
-        # Check for NaN/Inf and handle
-        if np.any(np.isnan(results)) or np.any(np.isinf(results)):
-            logger.warning("NaN or Inf values detected in results, replacing with zeros")
-            results = np.nan_to_num(results, nan=0.0, posinf=0.0, neginf=0.0)
-        
-        # Compute percentiles in one vectorized operation (much faster)
-        # results shape: (num_simulations, months)
         percentiles = [5, 10, 25, 50, 75, 90, 95]
-        try:
-            percentile_values = np.percentile(results, percentiles, axis=0, method='linear')
-        except Exception as e:
-            logger.error(f"Error computing percentiles: {str(e)}", exc_info=True)
-            # Fallback to slower method if linear fails
-            percentile_values = np.percentile(results, percentiles, axis=0)
+        
+        if isinstance(results, SimulationAccumulator):
+            if results.num_paths == 0:
+                raise ValueError("Results array is empty")
+            
+            if results.months != len(month_keys):
+                raise ValueError(f"Month keys count ({len(month_keys)}) doesn't match results shape ({results.months})")
+            
+            num_simulations = results.num_paths
+            percentile_values = results.cash.percentiles(percentiles)
+        else:
+            # Validate input
+            if results.size == 0:
+                raise ValueError("Results array is empty")
+            
+            if len(results.shape) != 2:
+                raise ValueError(f"Results must be 2D array, got shape {results.shape}")
+            
+            if results.shape[1] != len(month_keys):
+                raise ValueError(f"Month keys count ({len(month_keys)}) doesn't match results shape ({results.shape[1]})")
+            
+            # Ensure float64 for numerical stability
+            if results.dtype != np.float64:
+                results = results.astype(np.float64)
+            
+            # Check for NaN/Inf and handle
+            if np.any(np.isnan(results)) or np.any(np.isinf(results)):
+                logger.warning("NaN or Inf values detected in results, replacing with zeros")
+                results = np.nan_to_num(results, nan=0.0, posinf=0.0, neginf=0.0)
+            
+            # Compute percentiles in one vectorized operation (much faster)
+            # results shape: (num_simulations, months)
+            num_simulations = results.shape[0]
+            try:
+                percentile_values = np.percentile(results, percentiles, axis=0, method='linear')
+            except Exception as e:
+                logger.error(f"Error computing percentiles: {str(e)}", exc_info=True)
+                # Fallback to slower method if linear fails
+                percentile_values = np.percentile(results, percentiles, axis=0)
         
         # Round to 2 decimal places (vectorized)
         percentile_values = np.round(percentile_values, 2)
@@ -1267,7 +1386,7 @@ def compute_percentiles(results: np.ndarray, month_keys: List[str]) -> dict:
         
         return {
             'meta': {
-                'numSimulations': int(results.shape[0]),
+                'numSimulations': int(num_simulations),
                 'months': len(month_keys),
                 'generatedAt': datetime.now(timezone.utc).isoformat(),
             },
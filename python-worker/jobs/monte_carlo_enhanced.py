@@ -6,12 +6,13 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any
 from scipy import stats
-from scipy.stats import spearmanr
 from utils.db import get_db_connection
 from utils.s3 import upload_bytes_to_s3
 from utils.logger import setup_logger
 from utils.timer import CPUTimer
 from jobs.runner import check_cancel_requested, mark_cancelled, update_progress, extend_visibility
+from jobs.driver_sampling import DriverSampler, compile_distribution
+from jobs.sensitivity_analysis import compute_tornado_sensitivity, compute_bivariate_sensitivity
 
 logger = setup_logger()
 
@@ -71,57 +72,9 @@ def sample_distribution(dist_type: str, params: Dict, size: Tuple[int, ...], rng
         rng: NumPy random generator
     
     Returns:
-        Array of samples
+        Array of samples (the constant 'value' when the parameters are invalid)
     """
-    try:
-        if dist_type == 'normal':
-            mu = float(params.get('mu', 0))
-            sigma = max(float(params.get('sigma', 1)), 1e-10)  # Avoid zero sigma
-            return rng.normal(mu, sigma, size=size)
-        
-        elif dist_type == 'lognormal':
-            mu = float(params.get('mu', 0))
-            sigma = max(float(params.get('sigma', 1)), 1e-10)
-            return np.exp(rng.normal(mu, sigma, size=size))
-        
-        elif dist_type == 'triangular':
-            left = float(params.get('min', 0))
-            mode = float(params.get('mode', 0.5))
-            right = float(params.get('max', 1))
-            if not (left <= mode <= right):
-                raise ValueError(f"Invalid triangular params: min={left}, mode={mode}, max={right}")
-            return rng.triangular(left, mode, right, size=size)
-        
-        elif dist_type == 'uniform':
-            low = float(params.get('min', 0))
-            high = float(params.get('max', 1))
-            if high <= low:
-                raise ValueError(f"Invalid uniform params: min={low}, max={high}")
-            return rng.uniform(low, high, size=size)
-        
-        elif dist_type == 'beta':
-            alpha = max(float(params.get('alpha', 2)), 1e-10)
-            beta = max(float(params.get('beta', 2)), 1e-10)
-            min_val = float(params.get('min', 0))
-            max_val = float(params.get('max', 1))
-            # Sample from standard beta [0, 1], then scale
-            samples = rng.beta(alpha, beta, size=size)
-            return samples * (max_val - min_val) + min_val
-        
-        elif dist_type == 'gamma':
-            shape = max(float(params.get('shape', 2)), 1e-10)
-            scale = max(float(params.get('scale', 1)), 1e-10)
-            return rng.gamma(shape, scale, size=size)
-        
-        else:
-            # Default: constant value
-            value = float(params.get('value', 0))
-            return np.full(size, value)
-    
-    except Exception as e:
-        logger.warning(f"Error sampling {dist_type} distribution: {str(e)}, falling back to constant")
-        value = float(params.get('value', 0))
-        return np.full(size, value)
+    return compile_distribution({**params, 'dist': dist_type}).draw(rng, np.empty(size))
 
 
 def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[float] = [0.80, 0.90, 0.95]) -> Dict:
@@ -163,119 +116,6 @@ def compute_confidence_intervals(results: np.ndarray, confidence_levels: List[fl
         return {}
 
 
-def compute_bivariate_sensitivity(
-    results: np.ndarray,
-    driver_samples: Dict[str, np.ndarray],
-    driver_x: str,
-    driver_y: str,
-    bins: int = 5
-) -> Dict:
-    """
-    Compute bivariate sensitivity analysis (heatmap data).
-    Calculates the average outcome for different ranges of two driver variables.
-    """
-    try:
-        outcome = results[:, -1]  # Final month outcome
-        x_vals = driver_samples[driver_x][:, -1]
-        y_vals = driver_samples[driver_y][:, -1]
-
-        # Define bins for X and Y
-        x_bins = np.linspace(np.min(x_vals), np.max(x_vals), bins + 1)
-        y_bins = np.linspace(np.min(y_vals), np.max(y_vals), bins + 1)
-
-        heatmap = []
-        for i in range(bins):
-            for j in range(bins):
-                # Mask for samples falling into this (X, Y) bucket
-                mask = (x_vals >= x_bins[i]) & (x_vals < x_bins[i+1]) & \
-                       (y_vals >= y_bins[j]) & (y_vals < y_bins[j+1])
-                
-                if np.any(mask):
-                    avg_outcome = np.mean(outcome[mask])
-                    count = np.sum(mask)
-                else:
-                    avg_outcome = 0
-                    count = 0
-                
-                heatmap.append({
-                    'x_bin': i,
-                    'y_bin': j,
-                    'x_range': [float(x_bins[i]), float(x_bins[i+1])],
-                    'y_range': [float(y_bins[j]), float(y_bins[j+1])],
-                    'avg_outcome': float(avg_outcome),
-                    'count': int(count)
-                })
-        
-        return {
-            'driver_x': driver_x,
-            'driver_y': driver_y,
-            'bins_x': x_bins.tolist(),
-            'bins_y': y_bins.tolist(),
-            'heatmap': heatmap,
-            'baseline_outcome': float(np.median(outcome))
-        }
-    except Exception as e:
-        logger.error(f"Error computing bivariate sensitivity: {str(e)}")
-        return {}
-
-
-def compute_tornado_sensitivity(
-    results: np.ndarray,
-    drivers: Dict[str, Dict],
-    driver_samples: Dict[str, np.ndarray],
-    months: int
-) -> Dict:
-    """
-    Compute tornado sensitivity analysis (correlation between drivers and outcomes).
-    
-    Args:
-        results: Array of shape (num_simulations, months)
-        drivers: Driver definitions
-        driver_samples: Dictionary of driver sample arrays
-        months: Number of months
-    
-    Returns:
-        Dictionary with sensitivity metrics per driver
-    """
-    try:
-        num_sims = results.shape[0]
-        sensitivity = {}
-        
-        # For each driver, compute correlation with final month cash
-        final_month_cash = results[:, -1]  # Last month
-        
-        for driver_name, driver_config in drivers.items():
-            if driver_name not in driver_samples:
-                continue
-            
-            driver_values = driver_samples[driver_name][:, -1]  # Last month values
-            
-            # Compute Pearson correlation
-            if len(driver_values) > 1 and np.std(driver_values) > 1e-10:
-                correlation = np.corrcoef(driver_values, final_month_cash)[0, 1]
-                
-                # Compute rank correlation (Spearman) for robustness
-                rank_corr, _ = spearmanr(driver_values, final_month_cash)
-                
-                sensitivity[driver_name] = {
-                    'pearson_correlation': float(correlation) if not np.isnan(correlation) else 0.0,
-                    'spearman_correlation': float(rank_corr) if not np.isnan(rank_corr) else 0.0,
-                    'abs_correlation': float(abs(correlation)) if not np.isnan(correlation) else 0.0,
-                }
-        
-        # Sort by absolute correlation (most sensitive first)
-        sorted_sensitivity = dict(sorted(
-            sensitivity.items(),
-            key=lambda x: x[1]['abs_correlation'],
-            reverse=True
-        ))
-        
-        return sorted_sensitivity
-    except Exception as e:
-        logger.error(f"Error computing tornado sensitivity: {str(e)}", exc_info=True)
-        return {}
-
-
 def handle_monte_carlo(job_id: str, org_id: str, object_id: str, logs: dict):
     """Handle Monte Carlo simulation job with enhanced features"""
     logger.info(f"Processing Monte Carlo job {job_id}")
@@ -575,16 +415,9 @@ def run_vectorized_simulations_enhanced(
 ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
     """Run vectorized simulations using NumPy with enhanced distribution support"""
     try:
-        rng = np.random.default_rng(seed)
-        
         # Prepare driver arrays (num_simulations × months)
-        driver_arrays = {}
-        for driver_name, driver_config in drivers.items():
-            dist_type = driver_config.get('dist', 'normal')
-            samples = sample_distribution(
-                dist_type, driver_config, (num_simulations, months), rng
-            )
-            driver_arrays[driver_name] = samples if samples is not None else np.zeros((num_simulations, months))
+        sampler = DriverSampler(drivers)
+        driver_arrays = sampler.by_driver(sampler.sample(0, num_simulations, months, seed))
         
         # Apply model computation (vectorized)
         revenue_driver_raw = driver_arrays.get('revenue_growth')
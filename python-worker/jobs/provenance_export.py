@@ -10,6 +10,8 @@ from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from utils.db import get_db_connection
 from utils.s3 import upload_bytes_to_s3, get_signed_url
+from utils.ledger_reader import iter_ledger_batches
+from jobs.provenance_lineage import get_lineage, DEFAULT_MAX_DEPTH
 from utils.logger import setup_logger
 
 logger = setup_logger()
@@ -39,6 +41,7 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
         model_run_id = params.get('modelRunId') or object_id
         format_type = params.get('format', 'json')
         include_transactions = params.get('includeTransactions', True)
+        cell_key = params.get('cellKey')  # Optional: export only this cell's lineage
         
         if not model_run_id:
             raise ValueError("modelRunId not found in job params")
@@ -51,8 +54,21 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
         """, (job_id,))
         conn.commit()
         
-        # Get all provenance entries for this model run
-        cursor.execute("""
+        lineage_txn_ids = set()
+        if cell_key:
+            # Single-cell drill-down: walk the lineage index instead of loading the whole run
+            lineage = get_lineage(cursor, model_run_id, cell_key, 'ancestors',
+                                  int(params.get('maxDepth', DEFAULT_MAX_DEPTH)))
+            lineage_cells = [cell_key] + [n['key'] for n in lineage['nodes'] if n['type'] == 'cell']
+            lineage_txn_ids = {n['key'][4:] for n in lineage['nodes'] if n['type'] == 'txn'}
+            cell_filter = "AND pe.cell_key = ANY(%s)"
+            query_params = (model_run_id, lineage_cells)
+        else:
+            cell_filter = ""
+            query_params = (model_run_id,)
+        
+        # Get the provenance entries for this model run (or this cell's lineage)
+        cursor.execute(f"""
             SELECT 
                 pe.id, pe.cell_key, pe.source_type, pe.source_ref,
                 pe.prompt_id, pe.confidence_score, pe.created_at,
@@ -60,8 +76,9 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
             FROM provenance_entries pe
             LEFT JOIN prompts p ON pe.prompt_id = p.id
             WHERE pe.model_run_id = %s
+              {cell_filter}
             ORDER BY pe.created_at DESC
-        """, (model_run_id,))
+        """, query_params)
         
         provenance_rows = cursor.fetchall()
         
@@ -76,7 +93,7 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
         conn.commit()
         
         # Collect all transaction IDs
-        transaction_ids = set()
+        transaction_ids = set(lineage_txn_ids)
         for row in provenance_rows:
             source_ref = row[3]  # source_ref column
             if source_ref and row[2] == 'txn':  # source_type == 'txn'
@@ -91,18 +108,9 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
                 except:
                     pass
         
-        # Get transactions if requested
-        transactions = []
-        if include_transactions and transaction_ids:
-            cursor.execute("""
-                SELECT id, date, amount, currency, category, description, source_id
-                FROM raw_transactions
-                WHERE id = ANY(%s::uuid[])
-                ORDER BY date DESC
-            """, (list(transaction_ids),))
-            
-            transactions = cursor.fetchall()
-            logger.info(f"Found {len(transactions)} related transactions")
+        # Transactions are streamed straight into the export below (server-side cursor)
+        include_transaction_rows = bool(include_transactions and transaction_ids)
+        transaction_count = 0
         
         # Update progress
         cursor.execute("""
@@ -165,25 +173,37 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
             )
             
             # 2. Transactions CSV
-            if transactions:
-                csv_buffer = io.StringIO()
-                writer = csv.writer(csv_buffer)
-                writer.writerow([
-                    'id', 'date', 'amount', 'currency', 'category', 'description', 'source_id'
-                ])
+            if include_transaction_rows:
+                batches = iter_ledger_batches(conn, """
+                    SELECT id, date, amount, currency, category, description, source_id
+                    FROM raw_transactions
+                    WHERE id = ANY(%s::uuid[])
+                    ORDER BY date DESC
+                """, (list(transaction_ids),))
                 
-                for txn in transactions:
+                with zip_file.open('transactions.csv', 'w') as csv_entry:
+                    csv_stream = io.TextIOWrapper(csv_entry, encoding='utf-8', newline='')
+                    writer = csv.writer(csv_stream)
                     writer.writerow([
-                        str(txn[0]),  # id
-                        txn[1].isoformat() if txn[1] else '',  # date
-                        str(txn[2]),  # amount
-                        txn[3] or '',  # currency
-                        txn[4] or '',  # category
-                        txn[5] or '',  # description
-                        txn[6] or '',  # source_id
+                        'id', 'date', 'amount', 'currency', 'category', 'description', 'source_id'
                     ])
+                    
+                    for batch in batches:
+                        for txn in batch:
+                            writer.writerow([
+                                str(txn[0]),  # id
+                                txn[1].isoformat() if txn[1] else '',  # date
+                                str(txn[2]),  # amount
+                                txn[3] or '',  # currency
+                                txn[4] or '',  # category
+                                txn[5] or '',  # description
+                                txn[6] or '',  # source_id
+                            ])
+                        transaction_count += len(batch)
+                    csv_stream.flush()
+                    csv_stream.detach()
                 
-                zip_file.writestr('transactions.csv', csv_buffer.getvalue())
+                logger.info(f"Exported {transaction_count} related transactions")
             
             # 3. Prompts JSON
             if prompts:
@@ -213,7 +233,7 @@ def handle_provenance_export(job_id: str, org_id: str, object_id: str, logs: dic
                 'format': format_type,
                 'include_transactions': include_transactions,
                 'provenance_count': len(provenance_data),
-                'transaction_count': len(transactions),
+                'transaction_count': transaction_count,
                 'prompt_count': len(prompts),
             }
             zip_file.writestr(
@@ -0,0 +1,179 @@
+"""
+Provenance Lineage Index
+Parent/child edges between model cells, assumptions, drivers, prompts,
+transactions and import batches, written alongside provenance entries.
+
+Node keys:
+    "2026-03:revenue"        model cell (canonical cell key)
+    "assumption:<id>"        assumption / input
+    "driver:<id>"            driver
+    "prompt:<uuid>"          AI prompt
+    "txn:<uuid>"             raw transaction
+    "batch:<uuid>"           import batch
+
+Drill-downs ("where did this number come from") are bounded recursive
+traversals over the indexed provenance_edges table instead of a full load
+of the run's provenance entries.
+"""
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_MAX_DEPTH = 5
+DEFAULT_NODE_LIMIT = 1000
+
+
+def _cell_scope(cell_key: str) -> str:
+    """'2026-03:revenue' -> '2026-03'; 'summary:arr' -> 'summary'"""
+    return cell_key.split(':', 1)[0]
+
+
+def derive_lineage_edges(
+    cell_key: str,
+    source_ref: Any,
+    prompt_id: Optional[str] = None,
+) -> List[Tuple[str, str, str]]:
+    """
+    Parent edges implied by a provenance entry.
+
+    Returns a list of (parent_key, parent_type, child_type) for the cell.
+    """
+    from jobs.provenance_writer import extract_transaction_ids
+
+    edges: List[Tuple[str, str, str]] = []
+    scope = _cell_scope(cell_key)
+
+    if isinstance(source_ref, dict):
+        for metric in source_ref.get('calculated_from') or []:
+            if isinstance(metric, str) and metric:
+                edges.append((f"{scope}:{metric}", 'cell', 'cell'))
+        for tid in source_ref.get('transaction_ids') or []:
+            edges.append((f"txn:{tid}", 'txn', 'cell'))
+        if source_ref.get('assumption_id'):
+            edges.append((f"assumption:{source_ref['assumption_id']}", 'assumption', 'cell'))
+        if source_ref.get('driver_id'):
+            edges.append((f"driver:{source_ref['driver_id']}", 'driver', 'cell'))
+        if source_ref.get('import_batch_id'):
+            edges.append((f"batch:{source_ref['import_batch_id']}", 'batch', 'cell'))
+
+    for tid in extract_transaction_ids(source_ref if isinstance(source_ref, list) else None):
+        edges.append((f"txn:{tid}", 'txn', 'cell'))
+
+    if prompt_id:
+        edges.append((f"prompt:{prompt_id}", 'prompt', 'cell'))
+
+    return list(dict.fromkeys(edges))
+
+
+def write_lineage_edges(
+    cursor,
+    model_run_id: str,
+    org_id: str,
+    edges: List[Tuple[str, str, str, str]],
+) -> int:
+    """
+    Bulk-insert (child_key, child_type, parent_key, parent_type) edges and link the
+    referenced transactions to their import batches.
+
+    Runs inside a savepoint so a missing table never aborts the caller's transaction.
+    """
+    if not edges:
+        return 0
+
+    from psycopg2.extras import execute_values
+
+    try:
+        cursor.execute("SAVEPOINT provenance_edges")
+        execute_values(cursor, """
+            INSERT INTO provenance_edges (model_run_id, org_id, child_key, child_type, parent_key, parent_type)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+        """, [(model_run_id, org_id, c, ct, p, pt) for c, ct, p, pt in edges], page_size=1000)
+
+        txn_ids = sorted({p[4:] for _, _, p, pt in edges if pt == 'txn'})
+        if txn_ids:
+            cursor.execute("""
+                INSERT INTO provenance_edges (model_run_id, org_id, child_key, child_type, parent_key, parent_type)
+                SELECT DISTINCT %s::uuid, %s::uuid, 'txn:' || rt.id::text, 'txn', 'batch:' || rt.import_batch_id::text, 'batch'
+                FROM raw_transactions rt
+                WHERE rt.id = ANY(%s::uuid[])
+                  AND rt.import_batch_id IS NOT NULL
+                ON CONFLICT DO NOTHING
+            """, (model_run_id, org_id, txn_ids))
+
+        cursor.execute("RELEASE SAVEPOINT provenance_edges")
+        return len(edges)
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT provenance_edges")
+        logger.warning(f"Could not write provenance lineage edges: {e}")
+        return 0
+
+
+def get_lineage(
+    cursor,
+    model_run_id: str,
+    node_key: str,
+    direction: str = 'ancestors',
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    limit: int = DEFAULT_NODE_LIMIT,
+) -> Dict[str, Any]:
+    """
+    Bounded traversal of the lineage graph from one node.
+
+    Args:
+        cursor: Database cursor
+        model_run_id: Model run whose lineage to traverse
+        node_key: Start node (e.g. "2026-03:netIncome" or "txn:<uuid>")
+        direction: 'ancestors' (where did this come from) or 'descendants' (what does this feed)
+        max_depth: Maximum number of hops
+        limit: Maximum number of distinct nodes returned (nearest first)
+
+    Returns:
+        { node, direction, nodes: [{key, type, depth}], edges: [{child, parent}] }
+    """
+    if direction not in ('ancestors', 'descendants'):
+        raise ValueError("direction must be 'ancestors' or 'descendants'")
+
+    if direction == 'ancestors':
+        near, far, far_type = 'child_key', 'parent_key', 'parent_type'
+    else:
+        near, far, far_type = 'parent_key', 'child_key', 'child_type'
+
+    # Breadth-first, one indexed lookup on (model_run_id, near) per hop. Every node is
+    # kept at its first (minimum) depth and expanded once, so diamonds and cycles cost
+    # one visit each, and discovery stops once the node budget is spent.
+    nodes: Dict[str, Dict[str, Any]] = {}
+    edges = []
+    frontier = [node_key]
+    for depth in range(1, int(max_depth) + 1):
+        if not frontier:
+            break
+        cursor.execute(f"""
+            SELECT DISTINCT e.{near}, e.{far}, e.{far_type}
+            FROM provenance_edges e
+            WHERE e.model_run_id = %s AND e.{near} = ANY(%s)
+            ORDER BY e.{far}, e.{near}
+        """, (model_run_id, frontier))
+
+        next_frontier = []
+        for from_key, key, node_type in cursor.fetchall():
+            if key == node_key:
+                continue
+            if key not in nodes:
+                if len(nodes) >= limit:
+                    continue
+                nodes[key] = {'key': key, 'type': node_type, 'depth': depth}
+                next_frontier.append(key)
+            if direction == 'ancestors':
+                edges.append({'child': from_key, 'parent': key})
+            else:
+                edges.append({'child': key, 'parent': from_key})
+        frontier = next_frontier
+
+    return {
+        'node': node_key,
+        'direction': direction,
+        'nodes': list(nodes.values()),
+        'edges': edges,
+    }
@@ -7,6 +7,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 from utils.db import get_db_connection
 from utils.logger import setup_logger
+from jobs.provenance_lineage import derive_lineage_edges, write_lineage_edges
 
 logger = setup_logger()
 
@@ -86,6 +87,11 @@ def write_provenance_entry(
         
         result = cursor.fetchone()
         entry_id = result[0] if result else None
+
+        write_lineage_edges(cursor, model_run_id, org_id, [
+            (cell_key, child_type, parent_key, parent_type)
+            for parent_key, parent_type, child_type in derive_lineage_edges(cell_key, source_ref, prompt_id)
+        ])
         
         if commit and should_close:
             conn.commit()
@@ -138,6 +144,7 @@ def write_provenance_batch(
     
     try:
         created_count = 0
+        lineage_edges = []
         
         for entry in entries:
             cell_key = entry['cell_key']
@@ -176,14 +183,21 @@ def write_provenance_batch(
                     float(confidence_score) if confidence_score is not None else None,
                 ))
                 created_count += cursor.rowcount
+                lineage_edges.extend(
+                    (cell_key, child_type, parent_key, parent_type)
+                    for parent_key, parent_type, child_type in derive_lineage_edges(cell_key, source_ref, prompt_id)
+                )
             except Exception as e:
                 logger.warning(f"Failed to insert provenance entry for {cell_key}: {str(e)}")
                 # Continue with other entries
         
+        # Lineage index for bounded ancestor/descendant drill-downs
+        edge_count = write_lineage_edges(cursor, model_run_id, org_id, lineage_edges)
+        
         if commit and should_close:
             conn.commit()
         
-        logger.info(f"Created {created_count} provenance entries for model run {model_run_id}")
+        logger.info(f"Created {created_count} provenance entries and {edge_count} lineage edges for model run {model_run_id}")
         return created_count
         
     except Exception as e:
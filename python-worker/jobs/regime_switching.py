@@ -0,0 +1,199 @@
+"""
+Regime Switching
+Vectorized Markov regime paths for stochastic drivers.
+
+A regime model is a K-state Markov chain over months: a (K, K) row-stochastic
+transition matrix (or one per month, (months, K, K)), a starting state or
+starting distribution, and per-state driver settings (a multiplier on the
+driver's draw and/or its own distribution parameters).
+
+Paths are generated for all simulations at once from one (paths, months)
+uniform matrix: each month, every path looks up its current state's cumulative
+transition row and moves to the first state whose cumulative probability
+exceeds its uniform, so the only Python loop is over months.
+
+simulate_rows draws the same paths row-indexed, from the driver sampling block
+streams (see DriverSampler), so a run split into chunks of paths matches the
+run done in one go; RegimeOccupancy merges occupancy statistics chunk by chunk.
+
+The legacy two-state config {'p_stay_normal', 'p_stay_stressed',
+'stressed_multiplier'} maps onto states ['normal', 'stressed'].
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from jobs.driver_sampling import SAMPLE_BLOCK_ROWS
+
+REGIME_STATE_KEYS = ('name', 'multiplier')  # Everything else in a state overrides driver parameters
+
+
+class RegimeModel:
+    """K-state Markov regime chain with per-state driver multipliers and parameter overrides"""
+
+    def __init__(
+        self,
+        transition_matrix: Any,
+        states: Optional[List[Dict[str, Any]]] = None,
+        initial_state: Any = 0,
+        initial_probabilities: Optional[Any] = None
+    ):
+        matrix = np.asarray(transition_matrix, dtype=np.float64)
+        if matrix.ndim not in (2, 3) or matrix.shape[-1] != matrix.shape[-2] or matrix.shape[-1] < 1:
+            raise ValueError(f"transition matrix must be (K, K) or (months, K, K), got {matrix.shape}")
+        if np.any(matrix < 0) or np.any(matrix.sum(axis=-1) <= 0):
+            raise ValueError("transition matrix rows must be non-negative with a positive sum")
+        self.transition_matrix = matrix / matrix.sum(axis=-1, keepdims=True)
+        self.num_states = matrix.shape[-1]
+
+        states = states or [{} for _ in range(self.num_states)]
+        if len(states) != self.num_states:
+            raise ValueError(f"{len(states)} states given for a {self.num_states}-state transition matrix")
+        self.states = [dict(state) for state in states]
+        self.names: List[str] = [str(state.get('name', f"regime_{k}")) for k, state in enumerate(self.states)]
+        self.multipliers = np.array([float(state.get('multiplier', 1.0)) for state in self.states])
+        self.overrides: List[Dict[str, Any]] = [
+            {key: value for key, value in state.items() if key not in REGIME_STATE_KEYS} for state in self.states
+        ]
+
+        if initial_probabilities is not None:
+            probabilities = np.asarray(initial_probabilities, dtype=np.float64)
+            if probabilities.shape != (self.num_states,) or np.any(probabilities < 0) or probabilities.sum() <= 0:
+                raise ValueError("initial probabilities must be K non-negative weights")
+            self.initial_probabilities: Optional[np.ndarray] = probabilities / probabilities.sum()
+        else:
+            self.initial_probabilities = None
+        self.initial_state = self.names.index(initial_state) if isinstance(initial_state, str) else int(initial_state)
+        if not 0 <= self.initial_state < self.num_states:
+            raise ValueError(f"initial state {initial_state} is not one of {self.names}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RegimeModel':
+        """
+        Model of a driver's 'regime_switching' config: either the legacy two-state
+        {'p_stay_normal', 'p_stay_stressed', 'stressed_multiplier'} or
+        {'transition_matrix', 'states': [{'name', 'multiplier', params...}],
+         'initial_state' | 'initial_probabilities'}.
+        """
+        if 'transition_matrix' not in config:
+            p_stay_normal = float(config.get('p_stay_normal', 0.95))
+            p_stay_stressed = float(config.get('p_stay_stressed', 0.80))
+            return cls(
+                [[p_stay_normal, 1.0 - p_stay_normal], [1.0 - p_stay_stressed, p_stay_stressed]],
+                [{'name': 'normal'}, {'name': 'stressed', 'multiplier': float(config.get('stressed_multiplier', 2.0))}],
+            )
+        return cls(
+            config['transition_matrix'],
+            config.get('states'),
+            config.get('initial_state', 0),
+            config.get('initial_probabilities'),
+        )
+
+    @property
+    def has_overrides(self) -> bool:
+        """True when some regime draws the driver with its own parameters"""
+        return any(self.overrides)
+
+    def _cumulative(self, months: int) -> np.ndarray:
+        """(months, K, K) cumulative transition rows, last column pinned to 1"""
+        matrix = self.transition_matrix
+        if matrix.ndim == 2:
+            matrix = np.broadcast_to(matrix, (months,) + matrix.shape)
+        elif matrix.shape[0] < months:
+            raise ValueError(f"{matrix.shape[0]} monthly transition matrices for {months} months")
+        cumulative = np.cumsum(matrix[:months], axis=-1)
+        cumulative[..., -1] = 1.0
+        return cumulative
+
+    def simulate(self, num_paths: int, months: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        (paths, months) state indices. Month m moves each path on from its previous
+        state (the starting state before month 0) using uniform u[path, m].
+        """
+        if self.initial_probabilities is not None:
+            starting = np.cumsum(self.initial_probabilities)
+            starting[-1] = 1.0
+            state = np.searchsorted(starting, rng.random(num_paths), side='right')
+        else:
+            state = np.full(num_paths, self.initial_state)
+
+        uniforms = rng.random((num_paths, months))
+        cumulative = self._cumulative(months)
+        paths = np.empty((num_paths, months), dtype=np.int16 if self.num_states > 127 else np.int8)
+        for month in range(months):
+            # Number of cumulative thresholds at or below u = index of the next state
+            state = (cumulative[month][state] <= uniforms[:, month, None]).sum(axis=1)
+            paths[:, month] = state
+        return paths
+
+    def simulate_rows(self, start: int, stop: int, months: int, seed: Any) -> np.ndarray:
+        """
+        (stop - start, months) state indices of path rows start .. stop - 1; block b of
+        SAMPLE_BLOCK_ROWS rows uses stream SeedSequence(seed, spawn_key=(b,)).
+        """
+        paths = np.empty((stop - start, months), dtype=np.int16 if self.num_states > 127 else np.int8)
+        for block in range(start // SAMPLE_BLOCK_ROWS, (stop - 1) // SAMPLE_BLOCK_ROWS + 1 if stop > start else 0):
+            block_start = block * SAMPLE_BLOCK_ROWS
+            first, last = max(start, block_start), min(stop, block_start + SAMPLE_BLOCK_ROWS)
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+            block_paths = self.simulate(SAMPLE_BLOCK_ROWS, months, rng)
+            paths[first - start:last - start] = block_paths[first - block_start:last - block_start]
+        return paths
+
+    def apply(self, paths: np.ndarray, regime_draws: np.ndarray) -> np.ndarray:
+        """
+        (paths, months) driver values: each path's draw under its current regime
+        (regime_draws is (K, paths)) times that regime's multiplier.
+        """
+        rows = np.arange(paths.shape[0])[:, None]
+        return regime_draws[paths, rows] * self.multipliers[paths]
+
+    def occupancy(self, paths: np.ndarray) -> Dict[str, Any]:
+        """Regime occupancy statistics of simulated state paths"""
+        return RegimeOccupancy(self.names, paths.shape[1]).update(paths).summary()
+
+
+class RegimeOccupancy:
+    """Occupancy statistics of regime paths, accumulated over chunks of paths"""
+
+    def __init__(self, names: List[str], months: int):
+        self.names = list(names)
+        self.num_paths = 0
+        self.months = int(months)
+        self.counts_by_month = np.zeros((self.months, len(self.names)), dtype=np.int64)
+        self.spells = np.zeros(len(self.names), dtype=np.int64)
+        self.visited = np.zeros(len(self.names), dtype=np.int64)
+        self.switches = 0
+
+    def update(self, paths: np.ndarray) -> 'RegimeOccupancy':
+        num_states = len(self.names)
+        num_paths = paths.shape[0]
+        self.num_paths += num_paths
+        self.counts_by_month += np.stack([np.bincount(paths[:, m], minlength=num_states) for m in range(self.months)])
+
+        # Spells: runs of one state along a path (a new spell starts at month 0 and at every switch)
+        switches = paths[:, 1:] != paths[:, :-1]
+        spell_starts = np.concatenate((np.ones((num_paths, 1), dtype=bool), switches), axis=1)
+        self.spells += np.bincount(paths[spell_starts], minlength=num_states)
+        self.visited += np.array([np.count_nonzero(np.any(paths == k, axis=1)) for k in range(num_states)])
+        self.switches += int(switches.sum())
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        num_paths = max(self.num_paths, 1)
+        share_by_month = self.counts_by_month / num_paths
+        months_in_state = self.counts_by_month.sum(axis=0)
+
+        return {
+            'states': self.names,
+            'occupancy': {
+                name: float(months_in_state[k] / max(self.num_paths * self.months, 1)) for k, name in enumerate(self.names)
+            },
+            'occupancyByMonth': {name: share_by_month[:, k].tolist() for k, name in enumerate(self.names)},
+            'probabilityEverIn': {name: float(self.visited[k] / num_paths) for k, name in enumerate(self.names)},
+            'meanSpellMonths': {
+                name: float(months_in_state[k] / self.spells[k]) if self.spells[k] else 0.0
+                for k, name in enumerate(self.names)
+            },
+            'switchesPerPath': float(self.switches / num_paths),
+        }
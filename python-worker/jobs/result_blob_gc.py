@@ -0,0 +1,100 @@
+"""
+Result Blob GC Job Handler
+Sweeps content-addressed model-run result sections that no run references any more
+(e.g. after runs are deleted by users or data retention).
+
+The all-org sweep is enqueued by the worker itself: each worker calls
+schedule_result_blob_gc() from its poll loop, which queues one org-less
+'result_blob_gc' job per RESULT_BLOB_GC_INTERVAL_HOURS across all workers.
+Set the interval to 0 to disable and enqueue the job externally instead.
+"""
+import os
+from typing import Dict, Any, Optional
+from utils.db import get_db_connection
+from utils.logger import setup_logger
+from utils.result_store import sweep_result_blobs, list_result_orgs
+from jobs.runner import update_progress, complete_job, fail_job, queue_job
+
+logger = setup_logger()
+
+RESULT_BLOB_GC_INTERVAL_HOURS = float(os.getenv('RESULT_BLOB_GC_INTERVAL_HOURS', '24'))
+# Arbitrary key for pg_advisory_xact_lock so concurrent workers don't both enqueue
+RESULT_BLOB_GC_LOCK_KEY = 7345012
+
+
+def schedule_result_blob_gc() -> Optional[str]:
+    """
+    Queue an all-org result blob GC unless one is queued/running or was created
+    within the last RESULT_BLOB_GC_INTERVAL_HOURS. Returns the new job id, if any.
+    """
+    if RESULT_BLOB_GC_INTERVAL_HOURS <= 0:
+        return None
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Held until commit, i.e. until the new job row is visible to the next worker
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (RESULT_BLOB_GC_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute("""
+            SELECT 1 FROM jobs
+            WHERE job_type = 'result_blob_gc'
+              AND org_id IS NULL
+              AND (status IN ('queued', 'running', 'retrying')
+                   OR created_at > NOW() - make_interval(secs => %s))
+            LIMIT 1
+        """, (RESULT_BLOB_GC_INTERVAL_HOURS * 3600,))
+        if cursor.fetchone():
+            return None
+        job_id = queue_job('result_blob_gc', None, priority=10)
+        if job_id:
+            logger.info(f"Scheduled result blob GC job {job_id}")
+        return job_id
+    finally:
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+
+def handle_result_blob_gc(job_id: str, org_id: str, object_id: str, params: Dict[str, Any]):
+    """
+    Delete unreferenced result blobs for one org (org_id set) or for every org.
+    """
+    logger.info(f"Processing result blob GC job {job_id} (org {org_id or 'all'})")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        if org_id:
+            org_ids = [org_id]
+        else:
+            # Enumerate orgs from S3, not model_runs: an org whose runs were all
+            # deleted still has blobs to sweep but no rows left to find it by
+            org_ids = list_result_orgs()
+
+        update_progress(job_id, 10, {'status': 'sweeping', 'orgs': len(org_ids)})
+
+        totals = {'blobs': 0, 'referenced': 0, 'deleted': 0, 'skipped': 0}
+        for idx, gc_org_id in enumerate(org_ids):
+            try:
+                stats = sweep_result_blobs(gc_org_id, cursor)
+                for key in totals:
+                    totals[key] += stats[key]
+                if stats['deleted']:
+                    logger.info(f"Result blob GC for org {gc_org_id}: deleted {stats['deleted']} of {stats['blobs']} blobs")
+            except Exception as e:
+                logger.warning(f"Result blob GC failed for org {gc_org_id}: {e}")
+            update_progress(job_id, 10 + int(85 * (idx + 1) / max(1, len(org_ids))))
+
+        complete_job(job_id, {'status': 'done', 'orgs': len(org_ids), **totals})
+
+    except Exception as e:
+        logger.error(f"Error processing result blob GC job {job_id}: {str(e)}", exc_info=True)
+        fail_job(job_id, e)
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
@@ -5,16 +5,36 @@ Integrates Monte Carlo simulations with the Hyperblock calculation engine.
 Supports probabilistic drivers (Normal, Uniform, Triangular) and multi-dimensional risk analysis.
 """
 
+import os
 import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
 from jobs.hyperblock_engine import HyperblockEngine
+from jobs.driver_sampling import DriverSampler
+from jobs.regime_switching import RegimeModel, RegimeOccupancy
+from jobs.simulation_accumulators import MomentAccumulator, QuantileSketch
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Risk drivers are period-over-period changes, so unspecified spreads default to +/-10%
+RISK_DISTRIBUTION_DEFAULTS = {
+    'normal': {'mu': 0.0, 'sigma': 0.1},
+    'lognormal': {'mu': 0.0, 'sigma': 0.1},
+    'uniform': {'min': -0.1, 'max': 0.1},
+    'triangular': {'min': -0.1, 'mode': 0.0, 'max': 0.1},
+}
+
+RISK_CHUNK_PATHS = int(os.getenv('RISK_CHUNK_PATHS', '10000'))  # Simulations evaluated per pass over the graph
+RISK_SAMPLE_PATHS = int(os.getenv('RISK_SAMPLE_PATHS', '10000'))  # Simulations returned as raw samples
+RISK_PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+
 class RiskEngine:
     """
     Orchestrates large-scale Monte Carlo simulations using Hyperblock vectorized processing.
+
+    Simulations are a leading sample axis of the model's arrays, evaluated in chunks of
+    RISK_CHUNK_PATHS; percentiles, moments, VaR/CVaR and attribution are streamed from
+    mergeable summaries, so memory does not grow with the number of simulations.
     """
     
     def __init__(self, model_id: str, months: List[str], dimensions: List[Dict[str, Any]] = None):
@@ -29,68 +49,33 @@ class RiskEngine:
                           seed: Optional[int] = None) -> Dict[str, Any]:
         """
         Runs a risk analysis with deterministic seed control and correlation validation.
+        Results do not depend on RISK_CHUNK_PATHS: every simulation's draws depend only
+        on the seed and its index.
         """
-        # 1. Initialize engine with a simulation dimension
-        sim_members = [f"sim_{i}" for i in range(num_simulations)]
+        # 1. Initialize engine with the model's own dimensions (simulations are the sample axis)
         engine = HyperblockEngine(f"{self.model_id}_risk")
         
-        # Add original dimensions
         for dim in self.dimensions:
             engine.define_dimension(dim['name'], dim['members'])
-            
-        # Add the simulation dimension
-        engine.define_dimension("_simulation", sim_members)
         
         engine.initialize_horizon(self.months)
         
         # 2. Add nodes to engine
         for node in nodes:
-            dims = node.get('dims', [])
-            dims_with_sim = ["_simulation"] + dims
-            engine.add_metric(node['id'], node['name'], node.get('category', 'operational'), dims_with_sim)
+            engine.add_metric(node['id'], node['name'], node.get('category', 'operational'), node.get('dims', []))
             
         for node in nodes:
             if node.get('formula'):
                 engine.set_formula(node['id'], node['formula'])
                 
-        # 3. Inject Stochastic Inputs (Deterministic Seed + Correlated Sampling)
-        rng = np.random.default_rng(seed)
-        
-        # Check for correlated parameters (e.g., CAC inversely correlated to Conversion Rate)
-        corr_matrix = None
-        var_names = list(proportions.keys())
-        has_correlations = any('correlations' in config for config in proportions.values())
-        
-        if has_correlations and len(var_names) > 1:
-            # Build correlation matrix
-            n_vars = len(var_names)
-            corr_matrix = np.eye(n_vars)
-            for i, (_, config) in enumerate(proportions.items()):
-                if 'correlations' in config:
-                    for target, corr_val in config['correlations'].items():
-                        if target in var_names:
-                            j = var_names.index(target)
-                            corr_matrix[i, j] = corr_val
-                            corr_matrix[j, i] = corr_val # Ensure symmetry
-            
-            # Use Cholesky decomposition to generate correlated uniform samples (Gaussian Copula)
-            # Ensure positive semi-definite (add small ridge if needed)
-            try:
-                L = np.linalg.cholesky(corr_matrix)
-            except np.linalg.LinAlgError:
-                # Add small ridge to diagonal
-                corr_matrix += np.eye(n_vars) * 1e-6
-                L = np.linalg.cholesky(corr_matrix)
-                
-            standard_normals = rng.standard_normal((num_simulations, n_vars))
-            correlated_normals = standard_normals @ L.T
+        # 3. Compile Stochastic Inputs (Deterministic Seed + Correlated Sampling)
+        # One draw per simulation and driver; correlated drivers (e.g. CAC inversely
+        # correlated to Conversion Rate) go through the sampler's Gaussian copula
+        sample_seed = seed if seed is not None else np.random.SeedSequence().entropy
+        sampler = DriverSampler(proportions, defaults=RISK_DISTRIBUTION_DEFAULTS)
+        stochastic = []  # (driver index, proportions key, engine node, regime model, regime samplers)
+        regime_occupancy = {}
             
-            from scipy.stats import norm
-            correlated_uniforms = norm.cdf(correlated_normals)
-        else:
-            correlated_uniforms = rng.uniform(0, 1, (num_simulations, len(var_names)))
-            
-        # Apply distributions
         for i, (node_id, config) in enumerate(proportions.items()):
             actual_node_id = node_id
             
@@ -107,179 +92,173 @@ class RiskEngine:
                 
                 if not found_by_name:
                     # If still not found, add as placeholder to avoid KeyError later
-                    engine.add_metric(node_id, node_id, "operational", ["_simulation"])
+                    engine.add_metric(node_id, node_id, "operational", [])
                     actual_node_id = node_id
             
             if actual_node_id not in engine.data:
                 logger.warning(f"Engine data missing for {actual_node_id}, skipping simulation for this driver.")
                 continue
-                
-            target_shape = engine.data[actual_node_id].shape
-            params = config.get('params', {})
             
-            # Helper to get parameter from 'params' or 'config' directly (frontend compatibility)
-            def get_p(key, default):
-                return params.get(key, config.get(key, default))
-
-            dist = config.get('dist', 'normal')
-            
-            # Use the correlated uniform variable for this driver
-            u = correlated_uniforms[:, i]
+            # 3.1 Regime Switching Stochastic Overlay (Institutional Standard)
+            # Regimes with their own parameters redraw the driver from the same
+            # random numbers, so only the parameters change between regimes
+            regimes = self._regime_model(node_id, config.get('regime_switching'))
+            regime_samplers = []
+            if regimes is not None:
+                regime_samplers = [
+                    self._regime_sampler(proportions, node_id, overrides) if overrides else None
+                    for overrides in regimes.overrides
+                ]
+                regime_occupancy[node_id] = RegimeOccupancy(regimes.names, len(self.months))
+            stochastic.append((i, node_id, actual_node_id, regimes, regime_samplers))
+        
+        # 4. Streaming summaries
+        cash_node_id = 'cash'
+        for nid, meta in engine.nodes_meta.items():
+            if meta.get('name', '').lower() == 'cash':
+                cash_node_id = nid
+                break
+        has_cash = cash_node_id in engine.data
+        summary_ids = [node['id'] for node in nodes] + ([cash_node_id] if has_cash else [])
+        sketches = {nid: QuantileSketch(len(self.months)) for nid in summary_ids}
+        moments = {nid: MomentAccumulator(len(self.months)) for nid in summary_ids}
+        attribution_drivers = [nid for nid in proportions if nid in engine.data]
+        attribution_moments = MomentAccumulator(len(attribution_drivers))
+        failure_counts = np.zeros(len(self.months), dtype=np.int64)
+        bankrupt_count = 0
+        sample_limit = min(num_simulations, RISK_SAMPLE_PATHS)
+        sample_parts: Dict[str, List[np.ndarray]] = {}
+        
+        # 5. Evaluate the graph chunk by chunk over the simulation axis
+        chunk_paths = max(1, RISK_CHUNK_PATHS)
+        for start in range(0, num_simulations, chunk_paths):
+            stop = min(start + chunk_paths, num_simulations)
+            num_paths = stop - start
+            draws = sampler.sample(start, stop, 1, sample_seed)[:, 0, :]
             
-            # We must reshape u to broadcast across months/dimensions if needed
-            broadcast_dims = len(target_shape) - 1
-            u_reshaped = u.reshape((num_simulations,) + (1,) * broadcast_dims)
-            u_broadcasts = np.broadcast_to(u_reshaped, target_shape)
+            sample_inputs = {}
+            for i, node_id, actual_node_id, regimes, regime_samplers in stochastic:
+                node_shape = engine.data[actual_node_id].shape
+                broadcast_dims = len(node_shape) - 1
+                if regimes is None:
+                    # Broadcast each simulation's draw across months/dimensions
+                    values = draws[:, i].reshape((num_paths,) + (1,) * (broadcast_dims + 1))
+                else:
+                    num_months = node_shape[-1]
+                    regime_paths = regimes.simulate_rows(start, stop, num_months, [sample_seed, i])
+                    per_regime = np.stack([
+                        regime_sampler.sample(start, stop, 1, sample_seed)[:, 0, i] if regime_sampler else draws[:, i]
+                        for regime_sampler in regime_samplers
+                    ])
+                    values = regimes.apply(regime_paths, per_regime)
+                    values = values.reshape((num_paths,) + (1,) * broadcast_dims + (num_months,))
+                    regime_occupancy[node_id].update(regime_paths)
+                sample_inputs[actual_node_id] = np.broadcast_to(values, (num_paths,) + node_shape)
             
-            # Inverse Transform Sampling using SciPy distributions
-            import scipy.stats as stats
+            results = engine.evaluate_samples(sample_inputs)
             
-            if dist == 'normal':
-                mu = get_p('mu', get_p('mean', 0.0))
-                sigma = max(1e-9, get_p('sigma', get_p('std', 0.1))) # Guard against zero/negative sigma
-                samples = stats.norm.ppf(u_broadcasts, loc=mu, scale=sigma)
-            elif dist == 't': # Fat-tail T-Distribution
-                df = get_p('df', 3.0) 
-                loc = get_p('loc', 0.0)
-                scale = get_p('scale', 1.0)
-                samples = stats.t.ppf(u_broadcasts, df=df, loc=loc, scale=scale)
-            elif dist == 'lognormal':
-                mu = get_p('mu', get_p('mean', 0.0))
-                sigma = max(1e-9, get_p('sigma', get_p('std', 0.1))) # Guard
-                samples = stats.lognorm.ppf(u_broadcasts, s=sigma, scale=np.exp(mu))
-            elif dist == 'uniform':
-                low = get_p('min', -0.1)
-                high = max(low + 1e-9, get_p('max', 0.1)) # Guard against zero-width
-                samples = stats.uniform.ppf(u_broadcasts, loc=low, scale=high-low)
-            elif dist == 'triangular':
-                left = get_p('min', -0.1)
-                mode = get_p('mode', 0.0)
-                right = get_p('max', 0.1)
-                c = (mode - left) / (right - left) if (right > left) else 0.5
-                samples = stats.triang.ppf(u_broadcasts, c=c, loc=left, scale=right-left)
-            elif dist == 'pareto': # Fat-tail
-                b = get_p('b', 2.0)
-                scale = get_p('scale', 1.0)
-                samples = stats.pareto.ppf(u_broadcasts, b=b, scale=scale)
-            else:
-                samples = np.full(target_shape, float(get_p('value', 0.0)))
-                
-            # 3.1 Regime Switching Stochastic Overlay (Institutional Standard)
-            regime_params = config.get('regime_switching')
-            if regime_params:
-                # Basic 2-regime model: Normal vs Stressed
-                p_stay_normal = regime_params.get('p_stay_normal', 0.95)
-                p_stay_stressed = regime_params.get('p_stay_stressed', 0.80)
-                stressed_multiplier = regime_params.get('stressed_multiplier', 2.0)
-                
-                # Chain for each simulation horizon
-                for s in range(num_simulations):
-                    state = 0 # 0=normal, 1=stressed
-                    for m in range(len(self.months)):
-                        if state == 0:
-                            if rng.uniform(0, 1) > p_stay_normal: state = 1
-                        else:
-                            if rng.uniform(0, 1) > p_stay_stressed: state = 0
-                        
-                        if state == 1:
-                            # Multi-dimensional broadcasting check
-                            if len(samples.shape) > 2:
-                                samples[s, ..., m] *= stressed_multiplier
-                            else:
-                                samples[s, m] *= stressed_multiplier
+            collapsed = {}
+            for nid in summary_ids:
+                data = np.broadcast_to(results[nid], (num_paths,) + engine.data[nid].shape)
+                if len(data.shape) > 2:
+                    data = np.mean(data, axis=tuple(range(1, len(data.shape) - 1)))
+                collapsed[nid] = data
+                sketches[nid].update(data)
+                moments[nid].update(data)
             
-            engine.data[actual_node_id] = samples
+            # 6. Specific Risk KPIs (exact counts)
+            if has_cash:
+                cash_data = collapsed[cash_node_id]
+                failure_counts += np.count_nonzero(cash_data < 0, axis=0)
+                bankrupt_count += int(np.count_nonzero(np.any(cash_data < 0, axis=1)))
+                if attribution_drivers:
+                    driver_means = np.column_stack([
+                        np.broadcast_to(results[nid], (num_paths,) + engine.data[nid].shape).reshape(num_paths, -1).mean(axis=1)
+                        for nid in attribution_drivers
+                    ])
+                    attribution_moments.update(driver_means, target=cash_data[:, -1])
             
-        # 4. Execute Full Recompute
-        engine.full_recompute()
+            if start < sample_limit:
+                keep = min(stop, sample_limit) - start
+                for nid, data in results.items():
+                    data = np.broadcast_to(data, (num_paths,) + engine.data[nid].shape)
+                    sample_parts.setdefault(nid, []).append(data[:keep])
         
-        # 5. Extract Results and Compute Risk Metrics
+        # 7. Extract Results and Compute Risk Metrics
         output_metrics = {}
         for node in nodes:
             node_id = node['id']
-            data = engine.data[node_id]
-            
-            if len(data.shape) > 2:
-                collapsed_data = np.mean(data, axis=tuple(range(1, len(data.shape)-1)))
-            else:
-                collapsed_data = data
-                
-            pvals = np.percentile(collapsed_data, [5, 10, 25, 50, 75, 90, 95], axis=0)
+            pvals = sketches[node_id].percentiles(RISK_PERCENTILES)
             
             output_metrics[node_id] = {
-                "p5": pvals[0].tolist(),
-                "p10": pvals[1].tolist(),
-                "p25": pvals[2].tolist(),
-                "p50": pvals[3].tolist(),
-                "p75": pvals[4].tolist(),
-                "p90": pvals[5].tolist(),
-                "p95": pvals[6].tolist(),
-                "mean": np.mean(collapsed_data, axis=0).tolist(),
-                "std": np.std(collapsed_data, axis=0).tolist()
+                **{f"p{p}": pvals[k].tolist() for k, p in enumerate(RISK_PERCENTILES)},
+                "mean": moments[node_id].mean.tolist(),
+                "std": moments[node_id].std().tolist()
             }
             
-        # 6. Specific Risk KPIs
         failure_prob = []
-        cash_node_id = 'cash'
-        for nid, meta in engine.nodes_meta.items():
-            if meta.get('name', '').lower() == 'cash':
-                cash_node_id = nid
-                break
-        
         var_95 = 0
+        cvar_95 = 0
         fatal_risk_prob = 0
         risk_insights = []
 
-        if cash_node_id in engine.data:
-            cash_data = engine.data[cash_node_id]
-            if len(cash_data.shape) > 2:
-                 cash_data = np.mean(cash_data, axis=tuple(range(1, len(cash_data.shape)-1)))
-            
-            bankrupt_sims = np.any(cash_data < 0, axis=1)
-            fatal_risk_prob = float(np.sum(bankrupt_sims) / num_simulations)
-            
-            final_cash = cash_data[:, -1]
-            var_95 = float(np.percentile(final_cash, 5))
-            
-            for m in range(len(self.months)):
-                fail_count = np.sum(cash_data[:, m] < 0)
-                failure_prob.append(float(fail_count / num_simulations))
+        if has_cash:
+            fatal_risk_prob = float(bankrupt_count / num_simulations)
+            var_95 = float(sketches[cash_node_id].percentiles([5])[0, -1])
+            cvar_95 = float(sketches[cash_node_id].lower_tail_mean(0.05)[-1])
+            failure_prob = (failure_counts / num_simulations).tolist()
 
             if fatal_risk_prob > 0.2:
                 risk_insights.append({"type": "critical", "msg": f"High bankruptcy risk detected: {fatal_risk_prob*100:.1f}%"})
             
         # 8. Shapley-Based Risk Attribution (Variance Decomposition)
         attribution = []
-        if cash_node_id in engine.data:
-            total_var = np.var(final_cash)
-            if total_var > 0:
-                for nid, config in proportions.items():
-                    if nid in engine.data:
-                        driver_samples = engine.data[nid]
-                        if len(driver_samples.shape) > 2:
-                            driver_samples = np.mean(driver_samples, axis=tuple(range(1, len(driver_samples.shape)-1)))
-                        
-                        d_val = np.mean(driver_samples, axis=1) if len(driver_samples.shape) > 1 else driver_samples
-                        
-                        # Partial correlation as proxy for Shapley attribution
-                        # This calculates how much of the final variance is explained by this driver
-                        corr = np.corrcoef(d_val, final_cash)[0, 1]
-                        explained_var = (corr ** 2) * 100 # Percentage
-                        
-                        attribution.append({
-                            "driver": nid,
-                            "attribution_pct": float(round(explained_var, 2)),
-                            "impact": "positive" if corr > 0 else "negative"
-                        })
-                attribution.sort(key=lambda x: x["attribution_pct"], reverse=True)
+        if has_cash and attribution_moments.target_m2 > 0:
+            # Partial correlation as proxy for Shapley attribution
+            # This calculates how much of the final variance is explained by this driver
+            for nid, corr in zip(attribution_drivers, attribution_moments.correlations()):
+                explained_var = (corr ** 2) * 100 # Percentage
+                
+                attribution.append({
+                    "driver": nid,
+                    "attribution_pct": float(round(explained_var, 2)),
+                    "impact": "positive" if corr > 0 else "negative"
+                })
+            attribution.sort(key=lambda x: x["attribution_pct"], reverse=True)
 
         return {
             "metrics": output_metrics,
             "failureProbability": failure_prob,
             "fatalRisk": fatal_risk_prob,
             "var95": var_95,
+            "cvar95": cvar_95,
             "insights": risk_insights,
             "attribution": attribution,
             "simulations": num_simulations,
-            "samples": {k: v.tolist() if hasattr(v, 'tolist') else v for k, v in engine.data.items()}
+            "regimes": {nid: occupancy.summary() for nid, occupancy in regime_occupancy.items()},
+            # Raw samples of the first RISK_SAMPLE_PATHS simulations: (simulations, *dims, months)
+            "samples": {nid: np.concatenate(parts).tolist() for nid, parts in sample_parts.items()}
         }
+
+    @staticmethod
+    def _regime_model(node_id: str, regime_params: Optional[Dict[str, Any]]) -> Optional[RegimeModel]:
+        """Compiled regime chain of a driver; an invalid config disables switching for it"""
+        if not regime_params:
+            return None
+        try:
+            return RegimeModel.from_config(regime_params)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Invalid regime switching config for {node_id}: {str(e)}, ignoring it")
+            return None
+
+    @staticmethod
+    def _regime_sampler(
+        proportions: Dict[str, Dict[str, Any]],
+        node_id: str,
+        overrides: Dict[str, Any]
+    ) -> DriverSampler:
+        """Driver sampler with one driver's parameters replaced by a regime's"""
+        config = proportions[node_id]
+        nested = config.get('params') if isinstance(config.get('params'), dict) else {}
+        regime_config = {**config, **overrides, 'params': {**nested, **overrides}}
+        return DriverSampler({**proportions, node_id: regime_config}, defaults=RISK_DISTRIBUTION_DEFAULTS)
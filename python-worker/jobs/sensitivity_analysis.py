@@ -0,0 +1,193 @@
+"""
+Monte Carlo Sensitivity Analysis
+Tornado (driver vs outcome correlation) and bivariate heatmap kernels over the
+final month of simulated paths.
+
+Every driver is handled in one batched pass: final-month values are stacked
+into a (paths, drivers) matrix, rank-transformed once, and all Pearson and
+Spearman coefficients come out of the same centered dot products. Bivariate
+grids bin both drivers with np.digitize and aggregate a combined bin index with
+np.bincount, so cost is a single pass regardless of the number of bins.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+from scipy import stats
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+MIN_DRIVER_STD = 1e-10  # Drivers that barely vary carry no sensitivity signal
+
+
+def correlations_with(columns: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of each column of a (paths, k) matrix with a (paths,) target;
+    NaN where either side is constant.
+    """
+    columns = np.asarray(columns, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    centered = columns - columns.mean(axis=0)
+    centered_target = target - target.mean()
+    covariance = centered.T @ centered_target
+    scale = np.sqrt(np.einsum('ij,ij->j', centered, centered) * np.dot(centered_target, centered_target))
+    correlation = np.divide(covariance, scale, out=np.full(covariance.shape, np.nan), where=scale > 0)
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def average_ranks(matrix: np.ndarray) -> np.ndarray:
+    """
+    1-based ranks of each column of a (rows, k) matrix, ties sharing their average
+    rank (scipy.stats.rankdata(method='average') per column, from one sort).
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rows, cols = matrix.shape
+    order = np.argsort(matrix, axis=0)
+    ordered = np.take_along_axis(matrix, order, axis=0)
+    positions = np.arange(1, rows + 1, dtype=np.float64)
+
+    ranks = np.empty(matrix.shape)
+    for col in range(cols):
+        sorted_ranks = positions
+        tied = ordered[1:, col] == ordered[:-1, col]
+        if tied.any():
+            # Every run of equal values takes the mean of the positions it spans
+            starts = np.flatnonzero(np.concatenate(([True], ~tied)))
+            run_lengths = np.diff(np.append(starts, rows))
+            sorted_ranks = np.repeat(starts + (run_lengths + 1) / 2.0, run_lengths)
+        ranks[order[:, col], col] = sorted_ranks
+    return ranks
+
+
+def rank_correlations_with(columns: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Spearman correlation of each column with the target (average ranks for ties)"""
+    ranks = average_ranks(np.column_stack((columns, target)))
+    return correlations_with(ranks[:, :-1], ranks[:, -1])
+
+
+def correlation_p_values(correlations: Sequence[float], num_samples: int) -> np.ndarray:
+    """
+    Two-sided p-values of Pearson correlations under the null of no correlation (same
+    beta distribution as scipy.stats.pearsonr); 1.0 where undefined.
+    """
+    correlations = np.asarray(correlations, dtype=np.float64)
+    if num_samples <= 2:
+        return np.ones(correlations.shape)
+    ab = num_samples / 2 - 1
+    p_values = 2 * stats.beta.sf(np.abs(correlations), ab, ab, loc=-1, scale=2)
+    return np.where(np.isnan(p_values), 1.0, np.clip(p_values, 0.0, 1.0))
+
+
+def compute_tornado_sensitivity(
+    results: np.ndarray,
+    drivers: Dict[str, Dict],
+    driver_samples: Dict[str, np.ndarray],
+    months: int
+) -> Dict:
+    """
+    Compute tornado sensitivity analysis (correlation between drivers and outcomes).
+
+    Args:
+        results: Array of shape (num_simulations, months)
+        drivers: Driver definitions
+        driver_samples: Dictionary of driver sample arrays
+        months: Number of months
+
+    Returns:
+        Dictionary with sensitivity metrics per driver, most sensitive first
+    """
+    try:
+        final_month_cash = results[:, -1]  # Last month
+        names: List[str] = [name for name in drivers if name in driver_samples]
+        if not names or len(final_month_cash) <= 1:
+            return {}
+
+        # Last month values of every driver, (paths, drivers)
+        driver_values = np.column_stack([driver_samples[name][:, -1] for name in names])
+        varying = driver_values.std(axis=0) > MIN_DRIVER_STD
+        names = [name for name, keep in zip(names, varying) if keep]
+        if not names:
+            return {}
+        driver_values = driver_values[:, varying]
+
+        pearson = correlations_with(driver_values, final_month_cash)
+        spearman = rank_correlations_with(driver_values, final_month_cash)
+        pearson = np.where(np.isnan(pearson), 0.0, pearson)
+        spearman = np.where(np.isnan(spearman), 0.0, spearman)
+
+        sensitivity = {
+            name: {
+                'pearson_correlation': float(pearson[i]),
+                'spearman_correlation': float(spearman[i]),
+                'abs_correlation': float(abs(pearson[i])),
+            }
+            for i, name in enumerate(names)
+        }
+
+        # Sort by absolute correlation (most sensitive first)
+        return dict(sorted(
+            sensitivity.items(),
+            key=lambda x: x[1]['abs_correlation'],
+            reverse=True
+        ))
+    except Exception as e:
+        logger.error(f"Error computing tornado sensitivity: {str(e)}", exc_info=True)
+        return {}
+
+
+def compute_bivariate_sensitivity(
+    results: np.ndarray,
+    driver_samples: Dict[str, np.ndarray],
+    driver_x: str,
+    driver_y: str,
+    bins: int = 5
+) -> Dict:
+    """
+    Compute bivariate sensitivity analysis (heatmap data).
+    Calculates the average outcome for different ranges of two driver variables.
+
+    Buckets are half-open [edge_i, edge_i+1) over each driver's min..max range.
+    """
+    try:
+        outcome = results[:, -1]  # Final month outcome
+        x_vals = driver_samples[driver_x][:, -1]
+        y_vals = driver_samples[driver_y][:, -1]
+
+        # Define bins for X and Y
+        x_bins = np.linspace(np.min(x_vals), np.max(x_vals), bins + 1)
+        y_bins = np.linspace(np.min(y_vals), np.max(y_vals), bins + 1)
+
+        # One combined (x_bin, y_bin) index per path; paths outside every bucket drop out
+        x_index = np.digitize(x_vals, x_bins) - 1
+        y_index = np.digitize(y_vals, y_bins) - 1
+        inside = (x_index >= 0) & (x_index < bins) & (y_index >= 0) & (y_index < bins)
+        cell = x_index[inside] * bins + y_index[inside]
+        counts = np.bincount(cell, minlength=bins * bins)
+        totals = np.bincount(cell, weights=outcome[inside], minlength=bins * bins)
+        averages = np.divide(totals, counts, out=np.zeros(bins * bins), where=counts > 0)
+
+        heatmap = [
+            {
+                'x_bin': i,
+                'y_bin': j,
+                'x_range': [float(x_bins[i]), float(x_bins[i+1])],
+                'y_range': [float(y_bins[j]), float(y_bins[j+1])],
+                'avg_outcome': float(averages[i * bins + j]),
+                'count': int(counts[i * bins + j])
+            }
+            for i in range(bins)
+            for j in range(bins)
+        ]
+
+        return {
+            'driver_x': driver_x,
+            'driver_y': driver_y,
+            'bins_x': x_bins.tolist(),
+            'bins_y': y_bins.tolist(),
+            'heatmap': heatmap,
+            'baseline_outcome': float(np.median(outcome))
+        }
+    except Exception as e:
+        logger.error(f"Error computing bivariate sensitivity: {str(e)}")
+        return {}
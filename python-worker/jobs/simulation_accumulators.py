@@ -0,0 +1,343 @@
+"""
+Simulation Accumulators
+Mergeable streaming summaries of Monte Carlo ending-cash paths.
+
+Each chunk of paths updates an accumulator; accumulators from different chunks
+or processes merge by adding counts. Percentile fans and survival curves are
+then read from O(months x bins) state instead of the (paths x months) matrix.
+
+QuantileSketch buckets |value| logarithmically (bucket k covers
+(gamma**(k-1), gamma**k], gamma = (1 + a) / (1 - a)), so every quantile is
+returned within relative accuracy `a` of the exact sample quantile, whatever
+the range of the values. SurvivalCounter counts are exact, as are the means,
+variances and correlations of MomentAccumulator.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_RELATIVE_ACCURACY = 0.002
+ZERO_THRESHOLD = 0.005  # |value| below half a cent counts as zero
+
+
+class _BucketStore:
+    """Dense (months, width) bucket counts for keys offset .. offset + width - 1"""
+
+    def __init__(self, months: int):
+        self.offset = 0
+        self.counts = np.zeros((months, 0), dtype=np.int64)
+
+    def _extend(self, low: int, high: int) -> None:
+        width = self.counts.shape[1]
+        if width:
+            low, high = min(low, self.offset), max(high, self.offset + width - 1)
+            if low == self.offset and high == self.offset + width - 1:
+                return
+        counts = np.zeros((self.counts.shape[0], high - low + 1), dtype=np.int64)
+        if width:
+            counts[:, self.offset - low:self.offset - low + width] = self.counts
+        self.offset, self.counts = low, counts
+
+    def add(self, month_index: np.ndarray, keys: np.ndarray) -> None:
+        if not keys.size:
+            return
+        self._extend(int(keys.min()), int(keys.max()))
+        months, width = self.counts.shape
+        flat = month_index * width + (keys - self.offset)
+        self.counts += np.bincount(flat, minlength=months * width).reshape(months, width)
+
+    def merge(self, other: '_BucketStore') -> None:
+        if not other.counts.shape[1]:
+            return
+        self._extend(other.offset, other.offset + other.counts.shape[1] - 1)
+        start = other.offset - self.offset
+        self.counts[:, start:start + other.counts.shape[1]] += other.counts
+
+    def keys(self) -> np.ndarray:
+        return np.arange(self.offset, self.offset + self.counts.shape[1])
+
+
+class QuantileSketch:
+    """Per-month relative-error quantile sketch of (paths, months) values"""
+
+    def __init__(self, months: int, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.months = int(months)
+        self.relative_accuracy = float(relative_accuracy)
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = _BucketStore(self.months)
+        self.negative = _BucketStore(self.months)
+        self.zero = np.zeros(self.months, dtype=np.int64)
+        self.count = np.zeros(self.months, dtype=np.int64)
+        self.total = np.zeros(self.months)
+        self.min = np.full(self.months, np.inf)
+        self.max = np.full(self.months, -np.inf)
+
+    def _keys(self, magnitudes: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        """Add a block of paths, shaped (paths, months)"""
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.months)
+        if not values.shape[0]:
+            return
+        month_index = np.broadcast_to(np.arange(self.months), values.shape)
+        positive = values >= ZERO_THRESHOLD
+        negative = values <= -ZERO_THRESHOLD
+        self.positive.add(month_index[positive], self._keys(values[positive]))
+        self.negative.add(month_index[negative], self._keys(-values[negative]))
+        self.zero += values.shape[0] - positive.sum(axis=0) - negative.sum(axis=0)
+        self.count += values.shape[0]
+        self.total += values.sum(axis=0)
+        np.minimum(self.min, values.min(axis=0), out=self.min)
+        np.maximum(self.max, values.max(axis=0), out=self.max)
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        if other.months != self.months or other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different months or accuracy")
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+        return self
+
+    def _bucket_values(self, keys: np.ndarray) -> np.ndarray:
+        """Representative magnitude of each bucket, within relative_accuracy of all its values"""
+        return 2 * self.gamma ** keys / (self.gamma + 1)
+
+    def _ordered_buckets(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Bucket values (ascending) and the (months, buckets) counts in the same order"""
+        values = np.concatenate((
+            -self._bucket_values(self.negative.keys()[::-1]),
+            [0.0],
+            self._bucket_values(self.positive.keys()),
+        ))
+        counts = np.concatenate((self.negative.counts[:, ::-1], self.zero[:, None], self.positive.counts), axis=1)
+        return values, counts
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Quantiles per month, shaped (len(q), months), interpolated between order
+        statistics like np.percentile(method='linear'); NaN for months with no values.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        values, counts = self._ordered_buckets()
+        cumulative = np.cumsum(counts, axis=1)
+        rank = q[:, None] * (self.count - 1)[None, :]
+
+        def order_statistic(r: np.ndarray) -> np.ndarray:
+            # Bucket holding the r-th smallest value (0-based) of each month
+            index = np.array([np.searchsorted(cumulative[m], r[:, m], side='right') for m in range(self.months)]).T
+            found = values[np.minimum(index, values.size - 1)] if values.size else np.zeros_like(r)
+            found = np.where(r <= 0, self.min, np.where(r >= self.count - 1, self.max, found))
+            return np.clip(found, self.min, self.max)
+
+        low_rank = np.floor(rank)
+        with np.errstate(invalid='ignore'):
+            low = order_statistic(low_rank)
+            high = order_statistic(np.ceil(rank))
+            result = low + (high - low) * (rank - low_rank)
+        return np.where(self.count > 0, result, np.nan)
+
+    def percentiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        return self.quantiles(np.asarray(percentiles, dtype=np.float64) / 100.0)
+
+    def mean(self) -> np.ndarray:
+        """Exact mean per month; NaN for months with no values"""
+        return np.divide(self.total, self.count, out=np.full(self.months, np.nan), where=self.count > 0)
+
+    def lower_tail_mean(self, q: float) -> np.ndarray:
+        """
+        Mean of the lowest q share of values per month (expected shortfall / CVaR at
+        level q), from bucket values; NaN for months with no values.
+        """
+        values, counts = self._ordered_buckets()
+        values = np.clip(values[None, :], self.min[:, None], self.max[:, None])
+        take = float(q) * self.count
+        before = np.cumsum(counts, axis=1) - counts
+        taken = np.clip(take[:, None] - before, 0, counts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = (taken * values).sum(axis=1) / take
+        return np.where((self.count > 0) & (take > 0), result, np.nan)
+
+
+class SurvivalCounter:
+    """Per-month positive-cash counts and first-failure months of cash paths"""
+
+    def __init__(self, months: int):
+        self.months = int(months)
+        self.num_paths = 0
+        self.positive = np.zeros(self.months, dtype=np.int64)
+        self.first_failure = np.zeros(self.months, dtype=np.int64)  # paths whose cash first hits <= 0 in month m
+
+    def update(self, cash: np.ndarray) -> None:
+        """Add a block of cash balance paths, shaped (paths, months)"""
+        cash = np.asarray(cash, dtype=np.float64).reshape(-1, self.months)
+        failed = cash <= 0
+        self.num_paths += cash.shape[0]
+        self.positive += np.count_nonzero(cash > 0, axis=0)
+        ever_failed = failed.any(axis=1)
+        self.first_failure += np.bincount(np.argmax(failed[ever_failed], axis=1), minlength=self.months)
+
+    def merge(self, other: 'SurvivalCounter') -> 'SurvivalCounter':
+        if other.months != self.months:
+            raise ValueError("Cannot merge survival counters over different months")
+        self.num_paths += other.num_paths
+        self.positive += other.positive
+        self.first_failure += other.first_failure
+        return self
+
+    def months_to_failure(self) -> Tuple[float, float]:
+        """Mean and median month (1-based) of first failure over the paths that failed"""
+        failed = int(self.first_failure.sum())
+        if not failed:
+            return float(self.months), float(self.months)
+        month_numbers = np.arange(1, self.months + 1)
+        mean = float(np.dot(month_numbers, self.first_failure) / failed)
+        cumulative = np.cumsum(self.first_failure)
+        middle = np.searchsorted(cumulative, [(failed - 1) // 2, failed // 2], side='right')
+        return mean, float(month_numbers[middle].mean())
+
+    def runway_percentiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """
+        Percentiles of runway, the month (1-based) of each path's first failure; paths
+        that never fail count as the full horizon. Lower percentiles are the short runways.
+        """
+        if not self.num_paths:
+            return np.full(len(percentiles), np.nan)
+        counts = self.first_failure.copy()
+        counts[-1] += self.num_paths - int(self.first_failure.sum())
+        cumulative = np.cumsum(counts)
+        # Smallest month whose cumulative share reaches the percentile (inverted CDF)
+        target = np.ceil(np.asarray(percentiles, dtype=np.float64) / 100.0 * self.num_paths)
+        index = np.searchsorted(cumulative, np.maximum(target, 1), side='left')
+        return (np.minimum(index, self.months - 1) + 1).astype(np.float64)
+
+
+class MomentAccumulator:
+    """
+    Mergeable mean and variance of each column of (rows, width) blocks, plus each
+    column's covariance with a per-row target when one is given (Chan et al. pairwise
+    update, so large offsets such as cash balances do not lose precision).
+    """
+
+    def __init__(self, width: int):
+        self.width = int(width)
+        self.count = 0
+        self.mean = np.zeros(self.width)
+        self.m2 = np.zeros(self.width)
+        self.target_mean = 0.0
+        self.target_m2 = 0.0
+        self.comoment = np.zeros(self.width)
+
+    def update(self, values: np.ndarray, target: Optional[np.ndarray] = None) -> 'MomentAccumulator':
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.width)
+        if not values.shape[0]:
+            return self
+        block = MomentAccumulator(self.width)
+        block.count = values.shape[0]
+        block.mean = values.mean(axis=0)
+        centered = values - block.mean
+        block.m2 = np.einsum('ij,ij->j', centered, centered)
+        if target is not None:
+            target = np.asarray(target, dtype=np.float64).reshape(-1)
+            block.target_mean = float(target.mean())
+            centered_target = target - block.target_mean
+            block.target_m2 = float(np.dot(centered_target, centered_target))
+            block.comoment = centered.T @ centered_target
+        return self.merge(block)
+
+    def merge(self, other: 'MomentAccumulator') -> 'MomentAccumulator':
+        if other.width != self.width:
+            raise ValueError("Cannot merge moments of different widths")
+        if not other.count:
+            return self
+        count = self.count + other.count
+        weight = self.count * other.count / count
+        delta = other.mean - self.mean
+        delta_target = other.target_mean - self.target_mean
+        self.m2 = self.m2 + other.m2 + delta ** 2 * weight
+        self.target_m2 = self.target_m2 + other.target_m2 + delta_target ** 2 * weight
+        self.comoment = self.comoment + other.comoment + delta * delta_target * weight
+        self.mean = self.mean + delta * other.count / count
+        self.target_mean = self.target_mean + delta_target * other.count / count
+        self.count = count
+        return self
+
+    def std(self) -> np.ndarray:
+        """Population standard deviation of each column"""
+        return np.sqrt(self.m2 / self.count) if self.count else np.full(self.width, np.nan)
+
+    def correlations(self) -> np.ndarray:
+        """Pearson correlation of each column with the target; NaN where either is constant"""
+        scale = np.sqrt(self.m2 * self.target_m2)
+        return np.divide(self.comoment, scale, out=np.full(self.width, np.nan), where=scale > 0)
+
+
+class SimulationAccumulator:
+    """Streaming summary of a Monte Carlo run's ending cash (paths x months)"""
+
+    def __init__(self, months: int, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.months = int(months)
+        self.cash = QuantileSketch(months, relative_accuracy)
+        self.survival = SurvivalCounter(months)
+
+    @property
+    def num_paths(self) -> int:
+        return self.survival.num_paths
+
+    def update(self, cash: np.ndarray) -> 'SimulationAccumulator':
+        """Add a block of ending cash paths, shaped (paths, months); NaN/Inf count as 0"""
+        cash = np.nan_to_num(np.asarray(cash, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        self.cash.update(cash)
+        self.survival.update(cash)
+        return self
+
+    def merge(self, other: 'SimulationAccumulator') -> 'SimulationAccumulator':
+        self.cash.merge(other.cash)
+        self.survival.merge(other.survival)
+        return self
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Plain arrays that rebuild the accumulator with from_state (e.g. through np.savez)"""
+        sketch, survival = self.cash, self.survival
+        return {
+            'months': np.array(self.months),
+            'relative_accuracy': np.array(sketch.relative_accuracy),
+            'positive_offset': np.array(sketch.positive.offset),
+            'positive_counts': sketch.positive.counts,
+            'negative_offset': np.array(sketch.negative.offset),
+            'negative_counts': sketch.negative.counts,
+            'zero': sketch.zero,
+            'count': sketch.count,
+            'total': sketch.total,
+            'min': sketch.min,
+            'max': sketch.max,
+            'num_paths': np.array(survival.num_paths),
+            'positive': survival.positive,
+            'first_failure': survival.first_failure,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> 'SimulationAccumulator':
+        accumulator = cls(int(state['months']), float(state['relative_accuracy']))
+        sketch, survival = accumulator.cash, accumulator.survival
+        sketch.positive.offset = int(state['positive_offset'])
+        sketch.positive.counts = np.array(state['positive_counts'], dtype=np.int64)
+        sketch.negative.offset = int(state['negative_offset'])
+        sketch.negative.counts = np.array(state['negative_counts'], dtype=np.int64)
+        sketch.zero = np.array(state['zero'], dtype=np.int64)
+        sketch.count = np.array(state['count'], dtype=np.int64)
+        sketch.total = np.array(state['total'], dtype=np.float64)
+        sketch.min = np.array(state['min'], dtype=np.float64)
+        sketch.max = np.array(state['max'], dtype=np.float64)
+        survival.num_paths = int(state['num_paths'])
+        survival.positive = np.array(state['positive'], dtype=np.int64)
+        survival.first_failure = np.array(state['first_failure'], dtype=np.int64)
+        return accumulator
+
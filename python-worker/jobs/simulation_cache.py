@@ -0,0 +1,171 @@
+"""
+Simulation Cache
+Completed Monte Carlo summaries keyed by a stable digest of the simulation inputs.
+
+The digest (SHA256 of the canonical JSON of model run, drivers, overrides, seed,
+sampling mode and resolved model inputs) also seeds the run, so the same inputs
+give the same paths on every worker. Because every path depends only on the seed and its row, a cached
+run of N paths is exactly the first N paths of any longer run: a request for
+more paths simulates only the new ones and merges them into the cached summary.
+
+An entry holds the run's SimulationAccumulator (percentile fans, survival,
+confidence intervals) and the final-month ending cash and driver values of each
+path (sensitivity), stored as an .npz under montecarlo/cache/ in S3 when S3 is
+configured, else under MONTECARLO_CACHE_DIR.
+"""
+import hashlib
+import io
+import json
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from jobs.simulation_accumulators import SimulationAccumulator
+from utils.logger import setup_logger
+from utils.s3 import upload_bytes_to_s3, download_from_s3
+
+logger = setup_logger()
+
+CACHE_VERSION = 2  # Bump when the path sampling layout changes
+MONTECARLO_CACHE = os.getenv('MONTECARLO_CACHE', 'true').lower() in ('1', 'true', 'yes')
+MONTECARLO_CACHE_DIR = os.getenv(
+    'MONTECARLO_CACHE_DIR', os.path.join(os.getenv('MONTECARLO_TEMP_DIR', '/tmp/monte'), 'cache')
+)
+S3_BUCKET = os.getenv('S3_BUCKET_NAME')
+
+
+def simulation_digest(
+    model_run_id: Any,
+    drivers: Dict[str, Dict],
+    overrides: Dict,
+    random_seed: Any = None,
+    sampling_method: str = 'random',
+    antithetic: bool = False,
+    inputs: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    SHA256 of the canonical JSON of everything that determines a run's paths (not its
+    path count); inputs are the resolved model inputs (see SimulationPlan).
+    """
+    input_string = json.dumps({
+        'version': CACHE_VERSION,
+        'modelRunId': model_run_id,
+        'drivers': drivers,
+        'driverOrder': list(drivers),  # Samples are drawn in driver order
+        'overrides': overrides,
+        'randomSeed': random_seed,
+        'sampling': sampling_method,
+        'antithetic': bool(antithetic),
+        'inputs': inputs,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(input_string.encode('utf-8')).hexdigest()
+
+
+def seed_from_digest(digest: str) -> int:
+    """64-bit simulation seed from a digest (the same on every process, unlike hash())"""
+    return int(digest[:16], 16)
+
+
+class CachedSimulation:
+    """Summary of a completed run: accumulator plus final-month values of every path"""
+
+    def __init__(self, accumulator: SimulationAccumulator, final_cash: np.ndarray, final_driver_samples: Dict[str, np.ndarray]):
+        self.accumulator = accumulator
+        self.final_cash = np.asarray(final_cash, dtype=np.float64).reshape(-1, 1)
+        self.final_driver_samples = {
+            name: np.asarray(values, dtype=np.float64).reshape(-1, 1) for name, values in final_driver_samples.items()
+        }
+
+    @property
+    def num_paths(self) -> int:
+        return self.accumulator.num_paths
+
+    @property
+    def months(self) -> int:
+        return self.accumulator.months
+
+    def extend(
+        self,
+        accumulator: SimulationAccumulator,
+        final_cash: np.ndarray,
+        final_driver_samples: Dict[str, np.ndarray]
+    ) -> 'CachedSimulation':
+        """This run followed by the next paths of the same streams"""
+        return CachedSimulation(
+            SimulationAccumulator.from_state(self.accumulator.state()).merge(accumulator),
+            np.concatenate((self.final_cash, np.asarray(final_cash).reshape(-1, 1))),
+            {
+                name: np.concatenate((values, np.asarray(final_driver_samples[name]).reshape(-1, 1)))
+                for name, values in self.final_driver_samples.items()
+            },
+        )
+
+    def to_bytes(self) -> bytes:
+        names = list(self.final_driver_samples)
+        final_drivers = (np.hstack([self.final_driver_samples[name] for name in names])
+                         if names else np.zeros((self.final_cash.shape[0], 0)))
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            final_cash=self.final_cash,
+            final_drivers=final_drivers,
+            driver_names=np.array(names, dtype=str),
+            **{f"acc_{key}": value for key, value in self.accumulator.state().items()},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CachedSimulation':
+        with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+            state = {key[4:]: archive[key] for key in archive.files if key.startswith('acc_')}
+            final_drivers = archive['final_drivers']
+            names = [str(name) for name in archive['driver_names']]
+            return cls(
+                SimulationAccumulator.from_state(state),
+                archive['final_cash'],
+                {name: final_drivers[:, index] for index, name in enumerate(names)},
+            )
+
+
+def _cache_key(digest: str) -> str:
+    return f"montecarlo/cache/{digest}.npz"
+
+
+def load_cached_simulation(digest: str) -> Optional[CachedSimulation]:
+    """Cached summary for a digest, or None (cache disabled, missing or unreadable)"""
+    if not MONTECARLO_CACHE:
+        return None
+    try:
+        if S3_BUCKET:
+            data = download_from_s3(_cache_key(digest))
+        else:
+            path = os.path.join(MONTECARLO_CACHE_DIR, f"{digest}.npz")
+            if not os.path.exists(path):
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+        return CachedSimulation.from_bytes(data) if data else None
+    except Exception as e:
+        logger.info(f"No cached Monte Carlo summary for {digest[:12]}: {str(e)}")
+        return None
+
+
+def store_cached_simulation(digest: str, cached: CachedSimulation) -> None:
+    """Store (or replace) the summary for a digest; failures are logged, never raised"""
+    if not MONTECARLO_CACHE:
+        return
+    try:
+        data = cached.to_bytes()
+        if S3_BUCKET:
+            upload_bytes_to_s3(_cache_key(digest), data, 'application/octet-stream')
+            return
+        os.makedirs(MONTECARLO_CACHE_DIR, exist_ok=True)
+        path = os.path.join(MONTECARLO_CACHE_DIR, f"{digest}.npz")
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)  # Readers never see a partial entry
+    except Exception as e:
+        logger.warning(f"Failed to cache Monte Carlo summary {digest[:12]}: {str(e)}")
@@ -0,0 +1,147 @@
+"""
+Simulation Convergence
+Batch-means precision tracking for adaptive (early-stopping) Monte Carlo runs.
+
+Every chunk of paths is one batch. After each batch the monitor recomputes the
+target metrics of every batch so far; their spread gives the standard error of
+the pooled estimate and a Student-t confidence interval:
+
+    half_width = t(confidence, batches - 1) * std(batch metrics) / sqrt(batches)
+
+The run stops once every metric's half-width is within tolerance: relative to
+the estimate for runway and ending cash, absolute (probability points) for
+survival probability. Batches must be added in chunk order so the stopping
+point, and therefore the result, does not depend on scheduling.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import stats
+
+from jobs.simulation_accumulators import SimulationAccumulator
+
+# Metric name -> whether its tolerance is relative to the estimate
+CONVERGENCE_METRICS = {
+    'p50_runway': True,
+    'p5_runway': True,
+    'survival_probability': False,
+    'mean_ending_cash': True,
+    'p50_ending_cash': True,
+    'p5_ending_cash': True,
+}
+DEFAULT_TOLERANCE = 0.01
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MIN_BATCHES = 5
+
+
+def target_metrics(accumulator: SimulationAccumulator, metrics: Sequence[str]) -> np.ndarray:
+    """Final-month value of each target metric, from a run's (or one batch's) accumulator"""
+    p50_runway, p5_runway = accumulator.survival.runway_percentiles([50, 5])
+    p50_cash, p5_cash = accumulator.cash.percentiles([50, 5])[:, -1]
+    num_paths = max(accumulator.num_paths, 1)
+    values = {
+        'p50_runway': p50_runway,
+        'p5_runway': p5_runway,
+        'survival_probability': accumulator.survival.positive[-1] / num_paths,
+        'mean_ending_cash': accumulator.cash.mean()[-1],
+        'p50_ending_cash': p50_cash,
+        'p5_ending_cash': p5_cash,
+    }
+    return np.array([values[name] for name in metrics], dtype=np.float64)
+
+
+class ConvergenceMonitor:
+    """Stopping rule of an adaptive run, fed one batch accumulator per chunk in chunk order"""
+
+    def __init__(
+        self,
+        tolerance: float = DEFAULT_TOLERANCE,
+        confidence: float = DEFAULT_CONFIDENCE,
+        min_batches: int = DEFAULT_MIN_BATCHES,
+        metrics: Optional[Sequence[str]] = None
+    ):
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        self.metrics: List[str] = [name for name in (metrics or CONVERGENCE_METRICS) if name in CONVERGENCE_METRICS]
+        if not self.metrics:
+            raise ValueError(f"metrics must include one of {list(CONVERGENCE_METRICS)}")
+        self.tolerance = float(tolerance)
+        self.confidence = float(confidence)
+        self.min_batches = max(int(min_batches), 2)
+        self.num_paths = 0
+        self._batches: List[np.ndarray] = []
+
+    @classmethod
+    def from_params(cls, params: Any) -> Optional['ConvergenceMonitor']:
+        """
+        Monitor for a job's 'convergence' parameter: True for the defaults, or
+        {'tolerance', 'confidence', 'minBatches', 'metrics'}; None when the job is not adaptive.
+        """
+        if not params:
+            return None
+        if not isinstance(params, dict):
+            return cls()
+        return cls(
+            tolerance=float(params.get('tolerance', DEFAULT_TOLERANCE)),
+            confidence=float(params.get('confidence', DEFAULT_CONFIDENCE)),
+            min_batches=int(params.get('minBatches', DEFAULT_MIN_BATCHES)),
+            metrics=params.get('metrics'),
+        )
+
+    @property
+    def num_batches(self) -> int:
+        return len(self._batches)
+
+    def add(self, batch: SimulationAccumulator) -> bool:
+        """Record the next batch; True once the run has converged"""
+        self._batches.append(target_metrics(batch, self.metrics))
+        self.num_paths += batch.num_paths
+        return self.converged
+
+    def _estimates(self) -> np.ndarray:
+        return np.mean(self._batches, axis=0)
+
+    def half_widths(self) -> np.ndarray:
+        """Confidence interval half-width of each metric (inf until there are two batches)"""
+        if len(self._batches) < 2:
+            return np.full(len(self.metrics), np.inf)
+        batches = np.array(self._batches)
+        standard_error = batches.std(axis=0, ddof=1) / np.sqrt(len(batches))
+        return stats.t.ppf((1 + self.confidence) / 2, len(batches) - 1) * standard_error
+
+    def _targets(self, estimates: np.ndarray) -> np.ndarray:
+        relative = np.array([CONVERGENCE_METRICS[name] for name in self.metrics])
+        return np.where(relative, self.tolerance * np.abs(estimates), self.tolerance)
+
+    @property
+    def converged(self) -> bool:
+        if len(self._batches) < self.min_batches:
+            return False
+        half_widths = self.half_widths()
+        return bool(np.all(np.isfinite(half_widths) & (half_widths <= self._targets(self._estimates()))))
+
+    def report(self, accumulator: Optional[SimulationAccumulator] = None, max_paths: Optional[int] = None) -> Dict[str, Any]:
+        """Achieved precision per metric; estimates come from the pooled accumulator when given"""
+        estimates = target_metrics(accumulator, self.metrics) if accumulator is not None else self._estimates()
+        half_widths = self.half_widths()
+        targets = self._targets(estimates)
+        return {
+            'converged': self.converged,
+            'pathsSimulated': int(self.num_paths),
+            'maxPaths': int(max_paths) if max_paths is not None else None,
+            'batches': self.num_batches,
+            'confidence': self.confidence,
+            'tolerance': self.tolerance,
+            'metrics': {
+                name: {
+                    'estimate': float(estimates[i]),
+                    'halfWidth': float(half_widths[i]) if np.isfinite(half_widths[i]) else None,
+                    'targetHalfWidth': float(targets[i]),
+                    'relative': CONVERGENCE_METRICS[name],
+                    'met': bool(half_widths[i] <= targets[i]),
+                }
+                for i, name in enumerate(self.metrics)
+            },
+        }
@@ -0,0 +1,229 @@
+"""
+Simulation Plan
+Everything a Monte Carlo job needs to simulate its paths, compiled once per job.
+
+SimulationPlan.compile resolves the model baseline (one model_runs.summary_json
+query), compiles the driver spec (validated distributions and Cholesky factor,
+see DriverSampler), maps drivers onto 3-statement assumptions and selects the
+output metric. run_chunked_simulations_enhanced then only adds the chunk
+schedule; pool workers get the plan pickled once per run and keep it for every
+chunk they process.
+
+A plan is hashable: its key is the digest of everything that determines the
+simulated paths (not how many are run), which also seeds the run and keys the
+summary cache. Latin Hypercube runs are the exception: their strata span all of
+the run's paths, so their cache entries are keyed by path count too (cache_key).
+"""
+import hashlib
+import pickle
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from jobs.driver_sampling import DriverSampler, sampling_options
+from jobs.simulation_cache import simulation_digest, seed_from_digest
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+# Driver keys from the frontend -> 3-statement growth assumptions
+DRIVER_ASSUMPTIONS = {
+    'revenue_growth': 'revenueGrowth',
+    'cogs_percentage': 'cogsPercentage',
+    'opex_percentage': 'opexPercentage',
+    'ar_days': 'arDays',
+    'ap_days': 'apDays',
+    'dio': 'dio'
+}
+OUTPUT_METRIC = ('cash_flow', 'endingCash')  # Statement section and line simulated per path and month
+
+_SUMMARY_FIELDS = ('cashBalance', 'mrr', 'monthlyRevenue', 'revenue', 'monthlyBurn', 'burnRate', 'expenses', 'opex')
+
+
+def _first_float(values: List[Any]) -> Optional[float]:
+    for value in values:
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def _run_summary(cursor, model_run_id: Any) -> Dict[str, Any]:
+    """Baseline fields of model_runs.summary_json (empty when unavailable)"""
+    try:
+        cursor.execute(f"""
+            SELECT {', '.join(f"summary_json->>'{field}'" for field in _SUMMARY_FIELDS)}
+            FROM model_runs
+            WHERE id = %s
+        """, (model_run_id,))
+        row = cursor.fetchone()
+        return dict(zip(_SUMMARY_FIELDS, row)) if row else {}
+    except Exception as e:
+        logger.warning(f"Could not read model run summary for {model_run_id}: {str(e)}")
+        return {}
+
+
+def resolve_simulation_inputs(cursor, model_run_id: Any, baseline: Any) -> Dict[str, Any]:
+    """
+    Initial values and base assumptions of the simulated 3-statement model, from the
+    model baseline with model_runs.summary_json as the fallback (one query).
+    """
+    baseline = baseline if isinstance(baseline, dict) else {}
+    baseline_cash = baseline.get('cash', baseline.get('cashBalance', baseline.get('initialCash')))
+
+    # Revenue and burn fall back to the run summary, as does missing baseline cash
+    summary = _run_summary(cursor, model_run_id)
+    # Survival is measured against the baseline cash, else the summary's (0 when neither has it)
+    initial_cash = _first_float([baseline_cash]) or _first_float([summary.get('cashBalance')]) or 0.0
+    if baseline_cash is None:
+        baseline_cash = _first_float([summary.get('cashBalance')])
+    baseline_revenue = _first_float([
+        baseline.get('revenue'), summary.get('mrr'), summary.get('monthlyRevenue'), summary.get('revenue')
+    ])
+    baseline_monthly_burn = _first_float([
+        summary.get('monthlyBurn'), summary.get('burnRate'), summary.get('expenses'), summary.get('opex')
+    ])
+
+    if baseline_revenue is None:
+        baseline_revenue = 100000.0
+    if baseline_monthly_burn is None:
+        baseline_monthly_burn = 50000.0
+
+    # Convert burn into opexPercentage for 3-statement engine: opex ~= revenue * opexPercentage.
+    # Clamp to avoid extreme or invalid values.
+    opex_percentage_from_burn = float(baseline_monthly_burn / baseline_revenue) if baseline_revenue > 0 else 0.30
+    opex_percentage_from_burn = min(max(opex_percentage_from_burn, 0.0), 10.0)
+
+    initial_values = {
+        'cash': float(baseline_cash if baseline_cash is not None else 1000000),
+        'revenue': float(baseline_revenue),
+        'accountsReceivable': float(baseline.get('accountsReceivable', 50000)),
+        'accountsPayable': float(baseline.get('accountsPayable', 30000)),
+        'inventory': float(baseline.get('inventory', 20000)),
+        'ppe': float(baseline.get('ppe', 500000)),
+        'debt': float(baseline.get('debt', 200000)),
+        'equity': float(baseline.get('equity', 1000000)),
+        'retainedEarnings': float(baseline.get('retainedEarnings', 0))
+    }
+
+    base_growth = {
+        'revenueGrowth': 0.05,
+        'cogsPercentage': 0.40,
+        'opexPercentage': opex_percentage_from_burn,
+        'taxRate': 0.25,
+        'depreciationRate': 0.01,
+        'arDays': 45,
+        'apDays': 30,
+        'capexPercentage': 0.05,
+        'dio': 45
+    }
+
+    return {
+        'initial_values': initial_values,
+        'base_growth': base_growth,
+        'start_month': datetime.now().strftime('%Y-%m'),
+        'initial_cash': initial_cash,
+    }
+
+
+class SimulationPlan:
+    """
+    Compiled inputs of one Monte Carlo job. Plans are equal (and hash equal) when they
+    simulate the same paths; the chunk schedule is not part of the identity.
+    """
+
+    def __init__(
+        self,
+        model_run_id: Any,
+        drivers: Dict[str, Dict],
+        overrides: Dict,
+        months: int,
+        inputs: Dict[str, Any],
+        sampling: Optional[Dict[str, Any]] = None,
+        random_seed: Any = None,
+        output: Tuple[str, str] = OUTPUT_METRIC
+    ):
+        sampling = dict(sampling or sampling_options('random'))
+        self.months = int(months)
+        self.overrides = overrides or {}
+        self.initial_values: Dict[str, float] = inputs['initial_values']
+        self.base_growth: Dict[str, float] = inputs['base_growth']
+        self.start_month: str = inputs['start_month']
+        self.initial_cash: float = inputs.get('initial_cash', 0.0)
+        self.output = tuple(output)
+
+        # Everything that determines the paths (not their number) -> key and seed
+        self.key = simulation_digest(
+            model_run_id, drivers, self.overrides, random_seed, sampling['method'], sampling['antithetic'],
+            inputs={
+                'months': self.months,
+                'initialValues': self.initial_values,
+                'baseGrowth': self.base_growth,
+                'startMonth': self.start_month,
+                'output': list(self.output),
+            },
+        )
+        self.seed = seed_from_digest(self.key)
+        sampling['seed'] = self.seed
+        self.sampling = sampling
+        self.sampler = DriverSampler(drivers, sampling)
+        self.assumptions: List[str] = [DRIVER_ASSUMPTIONS.get(name, name) for name in self.sampler.names]
+
+        self.num_simulations = 0
+        self.first_path = 0
+        self.chunk_size = 0
+
+    @classmethod
+    def compile(
+        cls,
+        cursor,
+        model_run_id: Any,
+        model_data: Dict[str, Any],
+        drivers: Dict[str, Dict],
+        overrides: Dict,
+        random_seed: Any = None,
+        sampling: Optional[Dict[str, Any]] = None
+    ) -> 'SimulationPlan':
+        """Plan of a job from its loaded model snapshot (see load_model_snapshot)"""
+        inputs = resolve_simulation_inputs(cursor, model_run_id, model_data.get('baseline'))
+        return cls(model_run_id, drivers, overrides, model_data.get('months', 12), inputs, sampling, random_seed)
+
+    @property
+    def driver_names(self) -> List[str]:
+        return self.sampler.names
+
+    def schedule(self, num_simulations: int, chunk_size: int, first_path: int = 0) -> 'SimulationPlan':
+        """Set the run to paths first_path .. num_simulations - 1 in chunks of chunk_size"""
+        if num_simulations <= first_path:
+            raise ValueError(f"Invalid path range: first_path={first_path}, num_simulations={num_simulations}")
+        self.num_simulations = int(num_simulations)
+        self.first_path = int(first_path)
+        self.chunk_size = max(1, int(chunk_size))
+        return self
+
+    @property
+    def chunks(self) -> List[Tuple[int, int]]:
+        """(start, stop) storage rows of every chunk; row r holds path first_path + r"""
+        new_paths = self.num_simulations - self.first_path
+        return [(start, min(start + self.chunk_size, new_paths)) for start in range(0, new_paths, self.chunk_size)]
+
+    def cache_key(self, num_simulations: int) -> str:
+        """
+        Summary cache key of a run of num_simulations paths. Rows are the same paths
+        whatever the path count, so a longer run extends a cached shorter one under
+        the plan's key; Latin Hypercube rows are not, so only a run of the same size
+        reuses a Latin Hypercube entry (no prefix extension).
+        """
+        if not self.sampler.latin_hypercube(self.months):
+            return self.key
+        return hashlib.sha256(f"{self.key}:lhs:{int(num_simulations)}".encode('utf-8')).hexdigest()
+
+    def to_bytes(self) -> bytes:
+        return pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, SimulationPlan) and other.key == self.key
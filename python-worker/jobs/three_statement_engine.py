@@ -7,15 +7,352 @@ Industrial-grade FP&A engine that generates:
 - Balance Sheet
 
 With proper accounting linkages and cross-statement consistency.
+
+Statements are computed struct-of-arrays: every line item is a NumPy array over
+the projection months, and balance rollforwards are cumulative sums. The nested
+per-month dictionaries consumed by the API and UI are produced by
+StatementArrays.to_dict().
 """
 
 import logging
 from typing import Dict, List, Any, Optional, Union
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from operator import itemgetter
+
+import numpy as np
+
+from utils.period_rollup import PeriodCalendar
 
 logger = logging.getLogger(__name__)
 
+LEASE_MONTHLY_RATE = 0.05 / 12.0  # Incremental borrowing rate for IFRS 16 leases
+DEBT_ANNUAL_RATE = 0.08
+DEFAULT_DEBT_REPAYMENT_RATE = 0.01  # Monthly, when no debtRepayment override
+
+# Line items emitted by the compatibility adapter (monthly) and the annual summary
+PL_FIELDS = ['revenue', 'cogs', 'grossProfit', 'grossMargin', 'operatingExpenses', 'sbc',
+             'depreciation', 'tax_depreciation', 'impairment', 'ebitda', 'ebit', 'interestExpense',
+             'ebt', 'incomeTax', 'dtlChange', 'nolBalance', 'netIncome']
+CF_FIELDS = ['netIncome', 'depreciation', 'sbc', 'impairment', 'workingCapitalChange', 'arChange',
+             'apChange', 'inventoryChange', 'operatingCashFlow', 'capex', 'investingCashFlow',
+             'debtRepayment', 'newDebt', 'noteConversion', 'equityFinancing', 'financingCashFlow',
+             'netCashFlow', 'endingCash']
+DIRECT_CF_FIELDS = ['cashFromCustomers', 'cashToVendors', 'cashToEmployeesAndOps', 'cashInterest',
+                    'cashTaxes', 'netOperatingCashFlow']
+BS_FIELDS = ['cash', 'ar', 'inventory', 'totalCurrentAssets', 'ppe', 'accumulatedDepreciation',
+             'fixedAssets', 'rouAsset', 'dta', 'totalAssets', 'ap', 'currentLiabilities', 'debt',
+             'leaseLiability', 'dtl', 'totalLiabilities', 'commonStock', 'retainedEarnings',
+             'totalEquity', 'balanceCheck']
+ANNUAL_PL_FIELDS = ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 'depreciation', 'ebitda',
+                    'ebit', 'interestExpense', 'ebt', 'incomeTax', 'netIncome']
+ANNUAL_CF_FIELDS = ['netIncome', 'depreciation', 'workingCapitalChange', 'operatingCashFlow',
+                    'investingCashFlow', 'financingCashFlow', 'netCashFlow']
+
+
+def _round(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """
+    Elementwise round() with Python's semantics.
+
+    np.round rounds values * 10**ndigits half-to-even, but that product is itself
+    rounded: a value just above or below a half-cent can land exactly on .5 and
+    tip the wrong way. For those ties the exact product error is recovered
+    (Dekker's two-product) and decides the direction, so the arrays match the
+    scalar round() to the cent.
+    """
+    scale = 10.0 ** ndigits
+    # np.round(values, ndigits) is rint(values * scale) / scale; the scaled buffer is
+    # reused in place for the distance to the nearest integer (0.5 on a tie)
+    scaled = np.multiply(values, scale)
+    rounded = np.rint(scaled)
+    np.subtract(scaled, rounded, out=scaled)
+    np.abs(scaled, out=scaled)
+    ties = np.flatnonzero(scaled == 0.5)
+    rounded /= scale
+    if ties.size:
+        flat_values = values.reshape(-1)[ties]
+        magnitude = np.abs(flat_values)
+        product = magnitude * scale
+        split = magnitude * 134217729.0  # 2**27 + 1
+        high = split - (split - magnitude)
+        low = magnitude - high
+        error = (high * scale - product) + low * scale  # exact: magnitude * scale == product + error
+        nearest = np.where(error > 0, np.ceil(product), np.where(error < 0, np.floor(product), np.rint(product)))
+        rounded.reshape(-1)[ties] = np.copysign(nearest / scale, flat_values)
+    return rounded
+
+
+def _full_items(items: Dict[str, np.ndarray], shape) -> Dict[str, np.ndarray]:
+    """Broadcast line items that do not vary by path (or month) to the full (paths, months) shape"""
+    return {k: v if np.shape(v) == shape else np.array(np.broadcast_to(v, shape)) for k, v in items.items()}
+
+
+def _round_items(items: Dict[str, np.ndarray], shape, ndigits: int = 2) -> Dict[str, np.ndarray]:
+    """Round a group of line items in one pass, broadcast to the full (paths, months) shape"""
+    rounded = _round(np.array([np.broadcast_to(v, shape) for v in items.values()]), ndigits)
+    return dict(zip(items.keys(), rounded))
+
+
+def _with_opening(opening, values: np.ndarray) -> np.ndarray:
+    """Prepend the opening balance (scalar or one per path) along the month axis"""
+    first = np.broadcast_to(opening, values.shape[:-1] + (1,))
+    return np.concatenate((first, values), axis=-1)
+
+
+def _running(opening, deltas: np.ndarray) -> np.ndarray:
+    """Closing balance after each month (sequential sum, same rounding as `balance += delta`)"""
+    return np.cumsum(_with_opening(opening, deltas), axis=-1)[..., 1:]
+
+
+def _opening(opening, closing: np.ndarray) -> np.ndarray:
+    """Opening balance of each month given the closing balances"""
+    return _with_opening(opening, closing[..., :-1])
+
+
+def _amortizing_balance(opening, additions: np.ndarray) -> np.ndarray:
+    """
+    Closing balances of an account that recognises its balance straight-line over
+    the remaining horizon and receives `additions` each month:
+
+        b[i] = b[i-1] * (1 - 1 / (H - i)) + additions[i]
+
+    Dividing by (H - i - 1) turns the recurrence into a cumulative sum.
+    """
+    horizon = additions.shape[-1]
+    balances = np.empty(additions.shape)
+    if horizon == 0:
+        return balances
+    if horizon > 1:
+        remaining = (horizon - 1 - np.arange(horizon - 1)).astype(float)
+        balances[..., :-1] = remaining * (opening / horizon + np.cumsum(additions[..., :-1] / remaining, axis=-1))
+    balances[..., -1] = additions[..., -1]
+    return balances
+
+
+def _month_calendar(start_month: datetime, horizon_months: int):
+    """Month keys ('YYYY-MM'), days in month and days in year for each projection month"""
+    first = np.datetime64(f"{start_month.year:04d}-{start_month.month:02d}", 'M')
+    months = first + np.arange(horizon_months)
+    month_starts = months.astype('datetime64[D]')
+    days_in_month = ((months + 1).astype('datetime64[D]') - month_starts).astype(np.int64)
+    years = months.astype('datetime64[Y]')
+    days_in_year = ((years + 1).astype('datetime64[D]') - years.astype('datetime64[D]')).astype(np.int64)
+    return [str(m) for m in months], days_in_month.astype(float), days_in_year.astype(float)
+
+
+def _override_column(overrides: Dict[str, Dict[str, float]], month_index: Dict[str, int],
+                     horizon_months: int, *names: str):
+    """Per-month override values for the first present key in `names` (and where one was given)"""
+    values = np.zeros(horizon_months)
+    given = np.zeros(horizon_months, dtype=bool)
+    for month_key, override in overrides.items():
+        i = month_index.get(month_key)
+        if i is None or not override:
+            continue
+        for name in names:
+            if name in override:
+                values[i] = override[name]
+                given[i] = True
+                break
+    return values, given
+
+
+class StatementArrays:
+    """
+    Struct-of-arrays three-statement projection.
+
+    income_statement, cash_flow, direct_method and balance_sheet map each line
+    item to a float64 array over `month_keys`, holding exactly the values the
+    monthly dictionaries report. Batched projections carry a leading path axis:
+    every line item is then shaped (paths, months).
+    """
+
+    def __init__(self, month_keys: List[str], income_statement: Dict[str, np.ndarray],
+                 cash_flow: Dict[str, np.ndarray], direct_method: Dict[str, np.ndarray],
+                 balance_sheet: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+        self.month_keys = month_keys
+        self.income_statement = income_statement
+        self.cash_flow = cash_flow
+        self.direct_method = direct_method
+        self.balance_sheet = balance_sheet
+        self.metadata = metadata
+
+    def __len__(self) -> int:
+        return len(self.month_keys)
+
+    @property
+    def num_paths(self) -> Optional[int]:
+        """Number of paths of a batched projection (None for a single projection)"""
+        values = self.balance_sheet['cash']
+        return values.shape[0] if values.ndim == 2 else None
+
+    def path(self, index: int) -> 'StatementArrays':
+        """One path of a batched projection as a single projection (views, no copies)"""
+        def take(items):
+            return {k: v[index] for k, v in items.items()}
+        return StatementArrays(self.month_keys, take(self.income_statement), take(self.cash_flow),
+                               take(self.direct_method), take(self.balance_sheet), self.metadata)
+
+    def stack(self, statement: str) -> np.ndarray:
+        """
+        One statement as a single array shaped (..., months, line_items), with line
+        items in the order of PL_FIELDS / CF_FIELDS / DIRECT_CF_FIELDS / BS_FIELDS.
+
+        statement is 'incomeStatement', 'cashFlow', 'directMethod' or 'balanceSheet'.
+        """
+        items = {
+            'incomeStatement': self.income_statement,
+            'cashFlow': self.cash_flow,
+            'directMethod': self.direct_method,
+            'balanceSheet': self.balance_sheet,
+        }[statement]
+        return np.stack(list(items.values()), axis=-1)
+
+    def _monthly_balance_sheet(self) -> List[Dict[str, Any]]:
+        bs = {k: v.tolist() for k, v in self.balance_sheet.items()}
+        rows = []
+        for i in range(len(self.month_keys)):
+            rows.append({
+                'assets': {
+                    'cash': bs['cash'][i],
+                    'ar': bs['ar'][i],
+                    'inventory': bs['inventory'][i],
+                    'totalCurrentAssets': bs['totalCurrentAssets'][i],
+                    'ppe': bs['ppe'][i],
+                    'accumulatedDepreciation': bs['accumulatedDepreciation'][i],
+                    'fixedAssets': bs['fixedAssets'][i],
+                    'rouAsset': bs['rouAsset'][i],
+                    'dta': bs['dta'][i],
+                    'totalAssets': bs['totalAssets'][i]
+                },
+                'liabilities': {
+                    'ap': bs['ap'][i],
+                    'currentLiabilities': bs['currentLiabilities'][i],
+                    'debt': bs['debt'][i],
+                    'leaseLiability': bs['leaseLiability'][i],
+                    'dtl': bs['dtl'][i],
+                    'totalLiabilities': bs['totalLiabilities'][i]
+                },
+                'equity': {
+                    'commonStock': bs['commonStock'][i],
+                    'retainedEarnings': bs['retainedEarnings'][i],
+                    'totalEquity': bs['totalEquity'][i]
+                },
+                'balanceCheck': bs['balanceCheck'][i],
+                # Legacy flat structure for backward compatibility with ThreeStatementViewer
+                'cash': bs['cash'][i],
+                'accountsReceivable': bs['ar'][i],
+                'inventory': bs['inventory'][i],
+                'currentAssets': bs['totalCurrentAssets'][i],
+                'ppe': bs['ppe'][i],
+                'accumulatedDepreciation': bs['accumulatedDepreciation'][i],
+                'fixedAssets': bs['fixedAssets'][i],
+                'totalAssets': bs['totalAssets'][i],
+                'accountsPayable': bs['ap'][i],
+                'currentLiabilities': bs['currentLiabilities'][i],
+                'longTermDebt': bs['debt'][i],
+                'totalLiabilities': bs['totalLiabilities'][i],
+                'commonStock': bs['commonStock'][i],
+                'retainedEarnings': bs['retainedEarnings'][i],
+                'totalEquity': bs['totalEquity'][i]
+            })
+        return rows
+
+    def annual_summary(self, monthly_bs: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+        """Annual P&L / cash flow totals and year-end balance sheets (one pass per line item)"""
+        annual = {'incomeStatement': {}, 'cashFlow': {}, 'balanceSheet': {}}
+        calendar = PeriodCalendar(self.month_keys)
+        years = calendar.index('year')
+        if not len(years):
+            return annual
+
+        pl_totals = {k: calendar.flow(self.income_statement[k], 'year').tolist() for k in ANNUAL_PL_FIELDS}
+        gross_margin = calendar.ratio(self.income_statement['grossProfit'], self.income_statement['revenue'], 'year').tolist()
+        cf_totals = {k: calendar.flow(self.cash_flow[k], 'year').tolist() for k in ANNUAL_CF_FIELDS}
+        ending_cash = calendar.balance(self.cash_flow['endingCash'], 'year').tolist()
+        if monthly_bs is None:
+            monthly_bs = dict(zip(self.month_keys, self._monthly_balance_sheet()))
+
+        for n, (year, _, stop) in enumerate(years.segments()):
+            year_pl = {k: pl_totals[k][n] for k in ANNUAL_PL_FIELDS}
+            year_pl['grossMargin'] = gross_margin[n]
+            annual['incomeStatement'][year] = {k: round(v, 2) for k, v in year_pl.items()}
+
+            year_cf = {k: cf_totals[k][n] for k in ANNUAL_CF_FIELDS}
+            year_cf['endingCash'] = ending_cash[n]
+            annual['cashFlow'][year] = {k: round(v, 2) for k, v in year_cf.items()}
+
+            annual['balanceSheet'][year] = monthly_bs[self.month_keys[stop - 1]]
+        return annual
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compatibility adapter: the nested monthly/annual dictionaries of compute_statements"""
+        pl = {k: self.income_statement[k].tolist() for k in PL_FIELDS}
+        cf = {k: self.cash_flow[k].tolist() for k in CF_FIELDS}
+        direct = {k: self.direct_method[k].tolist() for k in DIRECT_CF_FIELDS}
+
+        monthly_pl, monthly_cf = {}, {}
+        for i, month_key in enumerate(self.month_keys):
+            monthly_pl[month_key] = {k: pl[k][i] for k in PL_FIELDS}
+            row = {k: cf[k][i] for k in CF_FIELDS}
+            row['directMethod'] = {k: direct[k][i] for k in DIRECT_CF_FIELDS}
+            monthly_cf[month_key] = row
+        monthly_bs = dict(zip(self.month_keys, self._monthly_balance_sheet()))
+
+        annual_summary = self.annual_summary(monthly_bs)
+        return {
+            'incomeStatement': {
+                'monthly': monthly_pl,
+                'annual': annual_summary.get('incomeStatement', {})
+            },
+            'cashFlow': {
+                'monthly': monthly_cf,
+                'annual': annual_summary.get('cashFlow', {})
+            },
+            'balanceSheet': {
+                'monthly': monthly_bs,
+                'annual': annual_summary.get('balanceSheet', {})
+            },
+            'metadata': self.metadata
+        }
+
+    def identity_checks(self, initial_values: Optional[Dict[str, float]] = None):
+        """
+        Accounting identity checks per month (and per path for batched projections):
+        (cash flow ending cash = balance sheet cash, A = L + E, retained earnings
+        roll-forward, cash flow reconciliation). Each is a boolean array shaped like
+        a line item.
+        """
+        cf, bs = self.cash_flow, self.balance_sheet
+        initial_cash = initial_values.get('cash', 0) if initial_values else 0
+
+        cash_match = np.abs(cf['endingCash'] - bs['cash']) < 0.1
+        balance_match = np.abs(bs['totalAssets'] - (bs['totalLiabilities'] + bs['totalEquity'])) < 0.1
+        re_match = np.ones(bs['cash'].shape, dtype=bool)
+        re_match[..., 1:] = np.abs(bs['retainedEarnings'][..., 1:] - (bs['retainedEarnings'][..., :-1] + cf['netIncome'][..., 1:])) < 1.0
+        begin_cash = _opening(initial_cash, bs['cash'])
+        calc_end_cash = begin_cash + cf['operatingCashFlow'] + cf['investingCashFlow'] + cf['financingCashFlow']
+        cf_recon_match = np.abs(calc_end_cash - cf['endingCash']) < 0.1
+        return cash_match, balance_match, re_match, cf_recon_match
+
+    def validate(self, initial_values: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Same checks as ThreeStatementEngine.validate_statements, evaluated on the arrays"""
+        validations = {'passed': True, 'checks': []}
+        if not self.month_keys:
+            return validations
+
+        cash_match, balance_match, re_match, cf_recon_match = self.identity_checks(initial_values)
+        failed = ~(cash_match & balance_match & re_match & cf_recon_match)
+        for i in np.flatnonzero(failed):
+            validations['passed'] = False
+            validations['checks'].append({
+                'month': self.month_keys[i],
+                'cashMatch': bool(cash_match[i]),
+                'balanceMatch': bool(balance_match[i]),
+                'reMatch': bool(re_match[i]),
+                'cfReconMatch': bool(cf_recon_match[i])
+            })
+        return validations
+
 
 class ThreeStatementEngine:
     """
@@ -61,483 +398,423 @@ class ThreeStatementEngine:
         Returns:
             Complete 3-statement model with monthly breakdowns
         """
-        # Initialize statement containers
-        monthly_pl = {}
-        monthly_cf = {}
-        monthly_bs = {}
+        return self.compute_statement_arrays(
+            start_month, horizon_months, initial_values, growth_assumptions,
+            monthly_overrides, headcount_costs
+        ).to_dict()
+
+    def compute_statement_arrays(
+        self,
+        start_month: datetime,
+        horizon_months: int,
+        initial_values: Dict[str, float],
+        growth_assumptions: Dict[str, float],
+        monthly_overrides: Optional[Dict[str, Dict[str, float]]] = None,
+        headcount_costs: Optional[Dict[str, float]] = None
+    ) -> StatementArrays:
+        """
+        Compute all three statements as arrays over months (see compute_statements).
+
+        Callers that only need a few line items (e.g. Monte Carlo ending cash)
+        should use this directly and skip building the monthly dictionaries.
+        """
+        statements = self.compute_statement_batch(
+            start_month, horizon_months, initial_values, growth_assumptions,
+            monthly_overrides=monthly_overrides, headcount_costs=headcount_costs
+        ).path(0)
+        if len(statements):
+            self.nol_balance = float(statements.income_statement['nolBalance'][-1])
+        return statements
+
+    def compute_statement_batch(
+        self,
+        start_month: datetime,
+        horizon_months: int,
+        initial_values: Dict[str, float],
+        growth_assumptions: Dict[str, float],
+        path_drivers: Optional[Dict[str, np.ndarray]] = None,
+        path_initial_values: Optional[Dict[str, np.ndarray]] = None,
+        path_overrides: Optional[Dict[str, np.ndarray]] = None,
+        monthly_overrides: Optional[Dict[str, Dict[str, float]]] = None,
+        headcount_costs: Optional[Dict[str, float]] = None
+    ) -> StatementArrays:
+        """
+        Compute all three statements for many paths / scenarios in one set of array passes.
+
+        Args (in addition to compute_statements):
+            path_drivers: Growth assumptions that vary by path, each shaped (paths,) for one
+                          value per path or (paths, months) for a monthly driver path
+            path_initial_values: Initial values that vary by path, each shaped (paths,)
+            path_overrides: Monthly line-item overrides that vary by path ('revenue', 'cogs',
+                            'opex', 'capex', ...), each shaped (paths, months); NaN = not overridden.
+                            They take precedence over monthly_overrides.
+
+        Returns:
+            StatementArrays with every line item shaped (paths, months). Each path satisfies
+            the same accounting identities as a single compute_statements run.
+        """
         monthly_overrides = monthly_overrides or {}
-        
+        path_drivers = path_drivers or {}
+        path_initial_values = path_initial_values or {}
+        path_overrides = path_overrides or {}
+        horizon = max(0, int(horizon_months))
+        month_keys, days_in_month, days_in_year = _month_calendar(start_month, horizon)
+        month_index = {k: i for i, k in enumerate(month_keys)}
+        months = np.arange(horizon, dtype=float)
+
+        path_arrays = [np.asarray(v) for v in (*path_drivers.values(), *path_initial_values.values(), *path_overrides.values())]
+        num_paths = max((v.shape[0] for v in path_arrays if v.ndim), default=1)
+        shape = (num_paths, horizon)
+
+        def override(*names):
+            values, given = _override_column(monthly_overrides, month_index, horizon, *names)
+            for name in names:
+                if name in path_overrides:
+                    path_values = np.asarray(path_overrides[name], dtype=float)
+                    path_given = ~np.isnan(path_values)
+                    return np.where(path_given, path_values, values), path_given | given
+            return values, given
+
+        def initial(key, default):
+            if key in path_initial_values:
+                return np.asarray(path_initial_values[key], dtype=float).reshape(-1, 1)
+            return initial_values.get(key, default)
+
+        def driver(key, default):
+            if key in path_drivers:
+                values = np.asarray(path_drivers[key], dtype=float)
+                return values.reshape(-1, 1) if values.ndim == 1 else values
+            return growth_assumptions.get(key, default)
+
         # Extract initial values with defaults
-        initial_cash = initial_values.get('cash', 500000.0)
-        initial_ar = initial_values.get('accountsReceivable', 0.0)
-        initial_ap = initial_values.get('accountsPayable', 0.0)
-        initial_inventory = initial_values.get('inventory', 0.0)
-        initial_ppe = initial_values.get('ppe', 100000.0)  # Property, Plant, Equipment
-        initial_debt = initial_values.get('debt', 0.0)
-        initial_equity = initial_values.get('equity', 500000.0)
-        initial_retained_earnings = initial_values.get('retainedEarnings', 0.0)
-        starting_revenue = initial_values.get('revenue', 50000.0)
+        initial_cash = initial('cash', 500000.0)
+        initial_ar = initial('accountsReceivable', 0.0)
+        initial_ap = initial('accountsPayable', 0.0)
+        initial_inventory = initial('inventory', 0.0)
+        initial_ppe = initial('ppe', 100000.0)  # Property, Plant, Equipment
+        initial_debt = initial('debt', 0.0)
+        initial_equity = initial('equity', 500000.0)
+        initial_prepaid = initial('prepaidExpenses', 0.0)
+        initial_deferred_revenue = initial('deferredRevenue', 0.0)
+        starting_revenue = initial('revenue', 50000.0)
         
         # Extract growth assumptions with defaults
-        revenue_growth = growth_assumptions.get('revenueGrowth', 0.08)
-        cogs_percentage = growth_assumptions.get('cogsPercentage', 0.30)
-        opex_percentage = growth_assumptions.get('opexPercentage', 0.40)
-        depreciation_rate = growth_assumptions.get('depreciationRate', 0.02)  # Monthly
-        tax_rate = growth_assumptions.get('taxRate', 0.25)
-        ar_days = growth_assumptions.get('arDays', 30.0)  # Days Sales Outstanding
-        ap_days = growth_assumptions.get('apDays', 45.0)  # Days Payable Outstanding
-        capex_percentage = growth_assumptions.get('capexPercentage', 0.05)  # of revenue
-        
-        # Track running balances
-        running_cash = initial_cash
-        running_ar = initial_ar
-        running_ap = initial_ap
-        running_inventory = initial_inventory
-        running_ppe = initial_ppe
-        running_prepaid = initial_values.get('prepaidExpenses', 0.0)
-        running_deferred_revenue = initial_values.get('deferredRevenue', 0.0)
-        running_debt = initial_debt
-        running_equity = initial_equity
-        running_retained_earnings = initial_retained_earnings
-        accumulated_depreciation = 0.0
-        running_rou_asset = 0.0
-        running_lease_liability = 0.0
-        
-        import calendar
+        revenue_growth = driver('revenueGrowth', 0.08)
+        cogs_percentage = driver('cogsPercentage', 0.30)
+        opex_percentage = driver('opexPercentage', 0.40)
+        depreciation_rate = driver('depreciationRate', 0.02)  # Monthly
+        tax_rate = driver('taxRate', 0.25)
+        ar_days = driver('arDays', 30.0)  # Days Sales Outstanding
+        ap_days = driver('apDays', 45.0)  # Days Payable Outstanding
+        capex_percentage = driver('capexPercentage', 0.05)  # of revenue
+        dio = driver('dio', 45.0)
+        prepaid_ratio = driver('prepaidRatio', 0.05)
+        deferred_ratio = driver('deferredRatio', 0.20)
 
-        for i in range(horizon_months):
-            month_date = start_month + relativedelta(months=i)
-            month_key = f"{month_date.year}-{str(month_date.month).zfill(2)}"
-            
-            # Leap Year / Precise Day Handling
-            # Institutional CFOs often use Actual/360 or Actual/365. 
-            # We'll calculate a 'days_in_month' factor.
-            _, days_in_month = calendar.monthrange(month_date.year, month_date.month)
-            days_in_year = 366 if calendar.isleap(month_date.year) else 365
-            
-            # --- IFRS 16 Lease Accounting (Institutional Grade) ---
-            # Use persistent variables initialized before loop or at start
-            if i == 0:
-                lease_payment = growth_assumptions.get('leasePayment', 0.0)
-                lease_term = int(growth_assumptions.get('leaseTerm', 60))
-                incremental_borrowing_rate = 0.05 / 12.0
-                
-                if lease_payment > 0:
-                    pv_factor = (1 - (1 + incremental_borrowing_rate)**-lease_term) / incremental_borrowing_rate
-                    running_rou_asset = round(lease_payment * pv_factor, 2)
-                    running_lease_liability = running_rou_asset
-                    # Seed initial if missing
-                    initial_values.setdefault('rouAsset', running_rou_asset)
-                    initial_values.setdefault('leaseLiability', running_lease_liability)
-                else:
-                    running_rou_asset = 0.0
-                    running_lease_liability = 0.0
-            
-            lease_payment = growth_assumptions.get('leasePayment', 0.0)
-            if lease_payment > 0:
-                lease_term = int(growth_assumptions.get('leaseTerm', 60))
-                incremental_borrowing_rate = 0.05 / 12.0
-                
-                lease_interest = round(running_lease_liability * incremental_borrowing_rate, 2)
-                lease_depreciation = round(initial_values.get('rouAsset', 0.0) / lease_term, 2)
-                lease_principal = lease_payment - lease_interest
-                running_lease_liability -= lease_principal
-                running_rou_asset -= lease_depreciation
-            else:
-                lease_interest = 0
-                lease_depreciation = 0
-            
-            # Proration factor for the first month if starting mid-month
-            if i == 0 and start_month.day > 1:
-                proration_factor = (days_in_month - start_month.day + 1) / days_in_month
-                logger.info(f"Prorating first month ({month_key}) by {proration_factor:.2f} due to mid-month start ({start_month.day})")
-            else:
-                proration_factor = 1.0
+        # Proration factor for the first month if starting mid-month
+        proration = np.ones(horizon)
+        if horizon and start_month.day > 1:
+            proration[0] = (days_in_month[0] - start_month.day + 1) / days_in_month[0]
+            logger.info(f"Prorating first month ({month_keys[0]}) by {proration[0]:.2f} due to mid-month start ({start_month.day})")
 
-            # ============================================
-            # INCOME STATEMENT (P&L)
-            # ============================================
-            
-            # Check for overrides (Driver-Based Input)
-            override = monthly_overrides.get(month_key, {})
-            
-            # Revenue
-            if 'revenue' in override:
-                revenue = override['revenue']
-            else:
-                growth_factor = (1 + revenue_growth) ** i
-                revenue = round(starting_revenue * growth_factor * proration_factor, 2)
-            
-            # Cost of Goods Sold
-            if 'cogs' in override:
-                cogs = override['cogs']
-            else:
-                cogs = round(revenue * cogs_percentage, 2)
-            
-            # Gross Profit
-            gross_profit = round(revenue - cogs, 2)
-            gross_margin = round(gross_profit / revenue, 4) if revenue > 0 else 0
-            
-            # Operating Expenses
-            if 'opex' in override:
-                operating_expenses = override['opex']
-            elif 'operatingExpenses' in override:
-                operating_expenses = override['operatingExpenses']
-            else:
-                # Integrate Headcount Costs if available
-                payroll_cost = headcount_costs.get(month_key, 0.0) if headcount_costs else 0.0
-                
-                # Standard OPEX (Marketing, G&A, etc.) - traditionally 40% of revenue in SaaS if not specified
-                standard_opex = round((revenue / proration_factor if proration_factor > 0 else 0) * opex_percentage * proration_factor, 2)
-                
-                # Combine headcount costs with standard OPEX
-                operating_expenses = round(standard_opex + payroll_cost, 2)
-                
-            # Stock-Based Compensation
-            sbc = override.get('sbc', 0.0)
-            if sbc == 0 and i > 0:
-                sbc = round(operating_expenses * 0.05, 2)
-            
-            # Depreciation (Precise monthly scaling)
-            depreciation = round(running_ppe * depreciation_rate * proration_factor, 2)
-            
-            # Asset Impairment
-            impairment = override.get('impairment', 0.0)
-            
-            total_non_cash_ops = depreciation + sbc + impairment
-            accumulated_depreciation += depreciation
-            
-            # EBIT / EBITDA
-            ebitda = round(gross_profit - operating_expenses, 2)
-            ebit = round(ebitda - depreciation - impairment, 2)
-            
-            # Interest Expense (Now using precise days in month logic)
-            daily_rate = 0.08 / days_in_year
-            interest_expense = round(running_debt * daily_rate * days_in_month * proration_factor, 2)
-            
-            # Net Income
-            # Deferred Tax Liability (DTL) / Asset (DTA)
-            # Standard Enterprise approach: Book use SL, Tax use MACRS (simplified here as 1.5x SL)
-            tax_depreciation = (depreciation + lease_depreciation) * 1.5
-            # Temporary Difference (Net of Tax)
-            dtl_change = (tax_depreciation - (depreciation + lease_depreciation)) * tax_rate
-            
-            ebt = round(ebit - interest_expense, 2)
-            
-            # --- Net Operating Loss (NOL) Carryforward Engine ---
-            if not hasattr(self, 'nol_balance') or self.nol_balance == 0: 
-                self.nol_balance = initial_values.get('nolBalance', 0.0)
-            if ebt < 0:
-                self.nol_balance += abs(ebt)
-                income_tax = 0.0
-            else:
-                applied_nol = min(self.nol_balance, ebt)
-                income_tax = round(max(0, (ebt - applied_nol) * tax_rate), 2)
-                self.nol_balance -= applied_nol
-            
-            # DTA for NOL
-            running_dta = self.nol_balance * tax_rate
-            running_dtl = initial_values.get('dtl', 0.0) + (dtl_change * (i+1))
-            
-            net_income = round(ebt - income_tax, 2)
-            
-            monthly_pl[month_key] = {
-                'revenue': revenue,
-                'cogs': cogs,
-                'grossProfit': gross_profit,
-                'grossMargin': gross_margin,
-                'operatingExpenses': operating_expenses,
-                'sbc': sbc,
-                'depreciation': depreciation + lease_depreciation,
-                'tax_depreciation': tax_depreciation,
-                'impairment': impairment,
-                'ebitda': ebitda,
-                'ebit': ebit,
-                'interestExpense': interest_expense + lease_interest,
-                'ebt': ebt,
-                'incomeTax': income_tax,
-                'dtlChange': dtl_change,
-                'nolBalance': self.nol_balance,
-                'netIncome': net_income
-            }
-            
-            # ============================================
-            # CASH FLOW STATEMENT (Indirect Method)
-            # ============================================
-            
-            # Changes in Working Capital
-            # AR: Precise DSO logic
-            new_ar = (revenue / days_in_month) * ar_days
-            ar_change = new_ar - running_ar
-            running_ar = new_ar
-            
-            # AP: Precise DPO logic
-            new_ap = ((cogs + (operating_expenses - sbc)) / days_in_month) * ap_days
-            ap_change = new_ap - running_ap
-            running_ap = new_ap
-            
-            # Inventory: Precise DIO logic
-            dio = growth_assumptions.get('dio', 45.0)
-            new_inventory = (cogs / days_in_month) * dio
-            inventory_change = new_inventory - running_inventory
-            running_inventory = new_inventory
-            
-            # Prepaid Expenses (Enterprise Waterfall)
-            prepaid_ratio = growth_assumptions.get('prepaidRatio', 0.05)
-            # Logic: We pay % up-front for future months
-            new_prepaid_payment = operating_expenses * prepaid_ratio
-            prepaid_recognition = running_prepaid / (horizon_months - i) if (horizon_months - i) > 1 else running_prepaid
-            prepaid_change = new_prepaid_payment - prepaid_recognition
-            running_prepaid += prepaid_change
-            
-            # Deferred Revenue (Institutional Prepayment Logic)
-            deferred_ratio = growth_assumptions.get('deferredRatio', 0.20)
-            # Cash collected for future months
-            new_deferred_collection = revenue * deferred_ratio
-            revenue_recognition_from_deferred = running_deferred_revenue * (1 / (horizon_months - i)) if (horizon_months - i) > 0 else running_deferred_revenue
-            deferred_change = new_deferred_collection - revenue_recognition_from_deferred
-            running_deferred_revenue += deferred_change
-            
-            cf_working_capital = -ar_change + ap_change - inventory_change - prepaid_change + deferred_change
-            cf_operating = net_income + depreciation + sbc + impairment + cf_working_capital
-            
-            # Investing
-            if 'capex' in override:
-                capex = override['capex']
-            else:
-                capex = revenue * capex_percentage
-            
-            running_ppe += capex - impairment
-            cf_investing = -capex
-            
-            # Financing
-            debt_repayment = override.get('debtRepayment', running_debt * 0.01)
-            new_debt = override.get('newDebt', 0.0)
-            note_conversion = override.get('noteConversion', 0.0)
-            
-            if note_conversion > 0:
-                actual_conversion = min(note_conversion, running_debt)
-                running_debt -= actual_conversion
-                running_equity += actual_conversion
-            else:
-                actual_conversion = 0
-                
-            running_debt = max(0, running_debt - debt_repayment + new_debt)
-            new_equity = override.get('newEquity', 0.0)
-            running_equity += new_equity + sbc
-            
-            cf_financing = -debt_repayment + new_debt + new_equity
-            
-            # Update Cash
-            net_cash_flow = cf_operating + cf_investing + cf_financing
-            running_cash += net_cash_flow
-            
-            # ============================================
-            # CASH FLOW STATEMENT (Direct Method)
-            # ============================================
-            cash_from_customers = revenue - ar_change + deferred_change
-            cash_to_vendors = -(cogs + inventory_change - ap_change + prepaid_change)
-            cash_to_employees_and_ops = -(operating_expenses - sbc)  # Assuming OpEx is largely employees
-            cash_interest = -interest_expense
-            cash_taxes = -income_tax
-            direct_cf_ops = cash_from_customers + cash_to_vendors + cash_to_employees_and_ops + cash_interest + cash_taxes
+        # --- IFRS 16 Lease Accounting (Institutional Grade) ---
+        lease_payment = growth_assumptions.get('leasePayment', 0.0)
+        if lease_payment > 0:
+            lease_term = int(growth_assumptions.get('leaseTerm', 60))
+            rate = LEASE_MONTHLY_RATE
+            pv_factor = (1 - (1 + rate)**-lease_term) / rate
+            opening_lease = round(lease_payment * pv_factor, 2)
+            # Seed initial if missing
+            initial_values.setdefault('rouAsset', opening_lease)
+            initial_values.setdefault('leaseLiability', opening_lease)
+            lease_depreciation = np.full(horizon, round(initial_values.get('rouAsset', 0.0) / lease_term, 2))
 
-            
-            monthly_cf[month_key] = {
-                # Indirect Method
-                'netIncome': round(net_income, 2),
-                'depreciation': round(depreciation, 2),
-                'sbc': round(sbc, 2),
-                'impairment': round(impairment, 2),
-                'workingCapitalChange': round(cf_working_capital, 2),
-                'arChange': round(-ar_change, 2),
-                'apChange': round(ap_change, 2),
-                'inventoryChange': round(-inventory_change, 2),
-                'operatingCashFlow': round(cf_operating, 2),
-                'capex': round(-capex, 2),
-                'investingCashFlow': round(cf_investing, 2),
-                'debtRepayment': round(-debt_repayment, 2),
-                'newDebt': round(new_debt, 2),
-                'noteConversion': round(actual_conversion, 2),
-                'equityFinancing': round(new_equity, 2),
-                'financingCashFlow': round(cf_financing, 2),
-                'netCashFlow': round(net_cash_flow, 2),
-                'endingCash': round(running_cash, 2),
-                # Direct Method
-                'directMethod': {
-                    'cashFromCustomers': round(cash_from_customers, 2),
-                    'cashToVendors': round(cash_to_vendors, 2),
-                    'cashToEmployeesAndOps': round(cash_to_employees_and_ops, 2),
-                    'cashInterest': round(cash_interest, 2),
-                    'cashTaxes': round(cash_taxes, 2),
-                    'netOperatingCashFlow': round(direct_cf_ops, 2)
-                }
-            }
-            
-            # ============================================
-            # BALANCE SHEET
-            # ============================================
-            running_retained_earnings += net_income
-            
-            # --- Assets ---
-            current_assets = running_cash + running_ar + running_inventory + running_prepaid + running_dta
-            fixed_assets = running_ppe - accumulated_depreciation
-            total_assets = current_assets + fixed_assets + running_rou_asset
-            
-            # --- Liabilities ---
-            current_liabilities = running_ap + running_deferred_revenue
-            long_term_liabilities = running_debt + running_lease_liability + running_dtl
-            total_liabilities = current_liabilities + long_term_liabilities
-            
-            # --- Equity ---
-            total_equity = running_equity + running_retained_earnings
-            
-            # Rounding and balancing logic (enforce A = L + E)
-            balance_plug = total_assets - (total_liabilities + total_equity)
-            running_retained_earnings += balance_plug
-            total_equity = running_equity + running_retained_earnings
-            
-            monthly_bs[month_key] = {
-                'assets': {
-                    'cash': round(running_cash, 2),
-                    'ar': round(running_ar, 2),
-                    'inventory': round(running_inventory, 2),
-                    'totalCurrentAssets': round(current_assets, 2),
-                    'ppe': round(running_ppe, 2),
-                    'accumulatedDepreciation': round(accumulated_depreciation, 2),
-                    'fixedAssets': round(fixed_assets, 2),
-                    'rouAsset': round(running_rou_asset, 2),
-                    'dta': round(running_dta, 2),
-                    'totalAssets': round(total_assets, 2)
-                },
-                'liabilities': {
-                    'ap': round(running_ap, 2),
-                    'currentLiabilities': round(current_liabilities, 2),
-                    'debt': round(running_debt, 2),
-                    'leaseLiability': round(running_lease_liability, 2),
-                    'dtl': round(running_dtl, 2),
-                    'totalLiabilities': round(total_liabilities, 2)
-                },
-                'equity': {
-                    'commonStock': round(running_equity, 2),
-                    'retainedEarnings': round(running_retained_earnings, 2),
-                    'totalEquity': round(total_equity, 2)
-                },
-                'balanceCheck': round(total_assets - (total_liabilities + total_equity), 2),
-                # Legacy flat structure for backward compatibility with ThreeStatementViewer
-                'cash': round(running_cash, 2),
-                'accountsReceivable': round(running_ar, 2),
-                'inventory': round(running_inventory, 2),
-                'currentAssets': round(current_assets, 2),
-                'ppe': round(running_ppe, 2),
-                'accumulatedDepreciation': round(accumulated_depreciation, 2),
-                'fixedAssets': round(fixed_assets, 2),
-                'totalAssets': round(total_assets, 2),
-                'accountsPayable': round(running_ap, 2),
-                'currentLiabilities': round(current_liabilities, 2),
-                'longTermDebt': round(running_debt, 2),
-                'totalLiabilities': round(total_liabilities, 2),
-                'commonStock': round(running_equity, 2),
-                'retainedEarnings': round(running_retained_earnings, 2),
-                'totalEquity': round(total_equity, 2)
-            }
+            # Interest is rounded on the opening liability each month. Start from the
+            # closed-form annuity balance and re-derive until the rounded interest is a
+            # fixed point of the rollforward (usually 1-2 passes, exact on exit).
+            growth = (1 + rate) ** months
+            lease_interest = _round((opening_lease * growth - lease_payment * (growth - 1) / rate) * rate, 2)
+            for _ in range(horizon):
+                lease_liability = _running(opening_lease, -(lease_payment - lease_interest))
+                next_interest = _round(_opening(opening_lease, lease_liability) * rate, 2)
+                if np.array_equal(next_interest, lease_interest):
+                    break
+                lease_interest = next_interest
+            lease_liability = _running(opening_lease, -(lease_payment - lease_interest))
+            rou_asset = _running(opening_lease, -lease_depreciation)
+        else:
+            lease_interest = lease_depreciation = rou_asset = lease_liability = np.zeros(horizon)
 
+        # ============================================
+        # INCOME STATEMENT (P&L)
+        # ============================================
 
+        # Revenue (driver-based overrides win over growth logic)
+        # Growth compounds from the first month; a monthly driver path compounds month by month
+        if np.ndim(revenue_growth) == 2 and revenue_growth.shape[-1] == horizon > 1:
+            growth_factor = np.cumprod(_with_opening(1.0, 1 + revenue_growth[:, 1:]), axis=-1)
+        else:
+            growth_factor = (1 + revenue_growth) ** months
+        revenue_override, has_revenue = override('revenue')
+        revenue = np.broadcast_to(np.where(has_revenue, revenue_override,
+                                           _round(starting_revenue * growth_factor * proration, 2)), shape)
 
-        
-        # Calculate annual summaries
-        annual_summary = self._calculate_annual_summary(monthly_pl, monthly_cf, monthly_bs)
-        
-        return {
-            'incomeStatement': {
-                'monthly': monthly_pl,
-                'annual': annual_summary.get('incomeStatement', {})
-            },
-            'cashFlow': {
-                'monthly': monthly_cf,
-                'annual': annual_summary.get('cashFlow', {})
-            },
-            'balanceSheet': {
-                'monthly': monthly_bs,
-                'annual': annual_summary.get('balanceSheet', {})
-            },
-            'metadata': {
-                'startMonth': start_month.strftime('%Y-%m'),
-                'horizonMonths': horizon_months,
-                'generatedAt': datetime.now().isoformat(),
-                'assumptions': {
-                    'revenueGrowth': revenue_growth,
-                    'cogsPercentage': cogs_percentage,
-                    'opexPercentage': opex_percentage,
-                    'taxRate': tax_rate,
-                    'depreciationRate': depreciation_rate,
-                    'arDays': ar_days,
-                    'apDays': ap_days,
-                    'capexPercentage': capex_percentage
-                }
+        # Cost of Goods Sold
+        cogs_override, has_cogs = override('cogs')
+        cogs = np.where(has_cogs, cogs_override, _round(revenue * cogs_percentage, 2))
+
+        # Gross Profit
+        gross_profit = _round(revenue - cogs, 2)
+        gross_margin = np.zeros(shape)
+        np.divide(gross_profit, revenue, out=gross_margin, where=revenue > 0)
+        gross_margin = _round(gross_margin, 4)
+
+        # Operating Expenses: standard OPEX (% of unprorated revenue, then prorated) plus headcount costs
+        opex_override, has_opex = override('opex', 'operatingExpenses')
+        payroll_cost = np.array([headcount_costs.get(k, 0.0) for k in month_keys], dtype=float) \
+            if headcount_costs else np.zeros(horizon)
+        unprorated_revenue = np.zeros(shape)
+        np.divide(revenue, proration, out=unprorated_revenue, where=proration > 0)
+        standard_opex = _round(unprorated_revenue * opex_percentage * proration, 2)
+        operating_expenses = np.where(has_opex, opex_override, _round(standard_opex + payroll_cost, 2))
+
+        # Stock-Based Compensation (5% of OPEX after the first month unless given)
+        sbc, _ = override('sbc')
+        sbc = np.where((sbc == 0) & (months > 0), _round(operating_expenses * 0.05, 2), sbc)
+
+        # Asset Impairment
+        impairment, _ = override('impairment')
+
+        # Capex (needed up front: PP&E rollforward drives depreciation)
+        capex_override, has_capex = override('capex')
+        capex = np.where(has_capex, capex_override, revenue * capex_percentage)
+        ppe = _running(initial_ppe, capex - impairment)
+
+        # Depreciation on opening PP&E (precise monthly scaling)
+        depreciation = _round(_opening(initial_ppe, ppe) * depreciation_rate * proration, 2)
+        accumulated_depreciation = _running(0.0, depreciation)
+
+        # EBIT / EBITDA
+        ebitda = _round(gross_profit - operating_expenses, 2)
+        ebit = _round(ebitda - depreciation - impairment, 2)
+
+        # Debt schedule (opening balance drives interest)
+        debt_repayment, debt_closing, new_debt, actual_conversion = self._debt_schedule(
+            initial_debt, override('debtRepayment'), override('newDebt')[0], override('noteConversion')[0], shape
+        )
+        opening_debt = _opening(initial_debt, debt_closing)
+
+        # Interest Expense (Actual/365 or Actual/366, precise days in month)
+        interest_expense = _round(opening_debt * (DEBT_ANNUAL_RATE / days_in_year) * days_in_month * proration, 2)
+
+        # Deferred Tax Liability (DTL): Book uses SL, Tax uses MACRS (simplified as 1.5x SL)
+        tax_depreciation = (depreciation + lease_depreciation) * 1.5
+        dtl_change = (tax_depreciation - (depreciation + lease_depreciation)) * tax_rate
+
+        ebt = _round(ebit - interest_expense, 2)
+
+        # --- Net Operating Loss (NOL) Carryforward Engine ---
+        # nol[i] = max(0, nol[i-1] - ebt[i]) (losses add, profits consume), solved as a
+        # running sum minus its running minimum
+        opening_nol = self.nol_balance or initial('nolBalance', 0.0)
+        loss_sum = np.cumsum(-ebt, axis=-1)
+        floor = np.minimum.accumulate(np.minimum(loss_sum, 0.0), axis=-1)
+        nol_balance = loss_sum + np.maximum(opening_nol, -floor)
+        applied_nol = np.minimum(_opening(opening_nol, nol_balance), ebt)
+        income_tax = np.where(ebt < 0, 0.0, _round(np.maximum(0, (ebt - applied_nol) * tax_rate), 2))
+
+        # DTA for NOL
+        dta = nol_balance * tax_rate
+        dtl = initial('dtl', 0.0) + dtl_change * (months + 1)
+
+        net_income = _round(ebt - income_tax, 2)
+
+        income_statement = _full_items({
+            'revenue': revenue,
+            'cogs': cogs,
+            'grossProfit': gross_profit,
+            'grossMargin': gross_margin,
+            'operatingExpenses': operating_expenses,
+            'sbc': sbc,
+            'depreciation': depreciation + lease_depreciation,
+            'tax_depreciation': tax_depreciation,
+            'impairment': impairment,
+            'ebitda': ebitda,
+            'ebit': ebit,
+            'interestExpense': interest_expense + lease_interest,
+            'ebt': ebt,
+            'incomeTax': income_tax,
+            'dtlChange': dtl_change,
+            'nolBalance': nol_balance,
+            'netIncome': net_income
+        }, shape)
+
+        # ============================================
+        # CASH FLOW STATEMENT (Indirect Method)
+        # ============================================
+
+        # Working capital balances: DSO / DPO / DIO on the month's activity
+        ar = (revenue / days_in_month) * ar_days
+        ar_change = ar - _opening(initial_ar, ar)
+        ap = ((cogs + (operating_expenses - sbc)) / days_in_month) * ap_days
+        ap_change = ap - _opening(initial_ap, ap)
+        inventory = (cogs / days_in_month) * dio
+        inventory_change = inventory - _opening(initial_inventory, inventory)
+
+        # Prepaid expenses (paid up-front) and deferred revenue (collected up-front) are
+        # recognised straight-line over the remaining horizon
+        prepaid = _amortizing_balance(initial_prepaid, operating_expenses * prepaid_ratio)
+        prepaid_change = prepaid - _opening(initial_prepaid, prepaid)
+        deferred_revenue = _amortizing_balance(initial_deferred_revenue, revenue * deferred_ratio)
+        deferred_change = deferred_revenue - _opening(initial_deferred_revenue, deferred_revenue)
+
+        cf_working_capital = -ar_change + ap_change - inventory_change - prepaid_change + deferred_change
+        cf_operating = net_income + depreciation + sbc + impairment + cf_working_capital
+
+        # Investing
+        cf_investing = -capex
+
+        # Financing
+        new_equity, _ = override('newEquity')
+        equity = _running(initial_equity, actual_conversion + (new_equity + sbc))
+        cf_financing = -debt_repayment + new_debt + new_equity
+
+        # Update Cash
+        net_cash_flow = cf_operating + cf_investing + cf_financing
+        cash = _running(initial_cash, net_cash_flow)
+
+        # ============================================
+        # CASH FLOW STATEMENT (Direct Method)
+        # ============================================
+        cash_from_customers = revenue - ar_change + deferred_change
+        cash_to_vendors = -(cogs + inventory_change - ap_change + prepaid_change)
+        cash_to_employees_and_ops = -(operating_expenses - sbc)  # Assuming OpEx is largely employees
+        cash_interest = -interest_expense
+        cash_taxes = -income_tax
+        direct_cf_ops = cash_from_customers + cash_to_vendors + cash_to_employees_and_ops + cash_interest + cash_taxes
+
+        cash_flow = _round_items({
+            'netIncome': net_income,
+            'depreciation': depreciation,
+            'sbc': sbc,
+            'impairment': impairment,
+            'workingCapitalChange': cf_working_capital,
+            'arChange': -ar_change,
+            'apChange': ap_change,
+            'inventoryChange': -inventory_change,
+            'operatingCashFlow': cf_operating,
+            'capex': -capex,
+            'investingCashFlow': cf_investing,
+            'debtRepayment': -debt_repayment,
+            'newDebt': new_debt,
+            'noteConversion': actual_conversion,
+            'equityFinancing': new_equity,
+            'financingCashFlow': cf_financing,
+            'netCashFlow': net_cash_flow,
+            'endingCash': cash
+        }, shape)
+        direct_method = _round_items({
+            'cashFromCustomers': cash_from_customers,
+            'cashToVendors': cash_to_vendors,
+            'cashToEmployeesAndOps': cash_to_employees_and_ops,
+            'cashInterest': cash_interest,
+            'cashTaxes': cash_taxes,
+            'netOperatingCashFlow': direct_cf_ops
+        }, shape)
+
+        # ============================================
+        # BALANCE SHEET
+        # ============================================
+
+        # --- Assets ---
+        current_assets = cash + ar + inventory + prepaid + dta
+        fixed_assets = ppe - accumulated_depreciation
+        total_assets = current_assets + fixed_assets + rou_asset
+
+        # --- Liabilities ---
+        current_liabilities = ap + deferred_revenue
+        long_term_liabilities = debt_closing + lease_liability + dtl
+        total_liabilities = current_liabilities + long_term_liabilities
+
+        # --- Equity ---
+        # Retained earnings absorb the balancing plug (enforce A = L + E)
+        retained_earnings = total_assets - total_liabilities - equity
+        total_equity = equity + retained_earnings
+
+        balance_sheet = _round_items({
+            'cash': cash,
+            'ar': ar,
+            'inventory': inventory,
+            'totalCurrentAssets': current_assets,
+            'ppe': ppe,
+            'accumulatedDepreciation': accumulated_depreciation,
+            'fixedAssets': fixed_assets,
+            'rouAsset': rou_asset,
+            'dta': dta,
+            'totalAssets': total_assets,
+            'ap': ap,
+            'currentLiabilities': current_liabilities,
+            'debt': debt_closing,
+            'leaseLiability': lease_liability,
+            'dtl': dtl,
+            'totalLiabilities': total_liabilities,
+            'commonStock': equity,
+            'retainedEarnings': retained_earnings,
+            'totalEquity': total_equity,
+            'balanceCheck': total_assets - (total_liabilities + total_equity)
+        }, shape)
+
+        metadata = {
+            'startMonth': start_month.strftime('%Y-%m'),
+            'horizonMonths': horizon_months,
+            'generatedAt': datetime.now().isoformat(),
+            'assumptions': {
+                'revenueGrowth': growth_assumptions.get('revenueGrowth', 0.08),
+                'cogsPercentage': growth_assumptions.get('cogsPercentage', 0.30),
+                'opexPercentage': growth_assumptions.get('opexPercentage', 0.40),
+                'taxRate': growth_assumptions.get('taxRate', 0.25),
+                'depreciationRate': growth_assumptions.get('depreciationRate', 0.02),
+                'arDays': growth_assumptions.get('arDays', 30.0),
+                'apDays': growth_assumptions.get('apDays', 45.0),
+                'capexPercentage': growth_assumptions.get('capexPercentage', 0.05)
             }
         }
-    
-    def _calculate_annual_summary(
-        self,
-        monthly_pl: Dict[str, Dict],
-        monthly_cf: Dict[str, Dict],
-        monthly_bs: Dict[str, Dict]
-    ) -> Dict[str, Any]:
-        """Calculate annual summaries from monthly data."""
-        annual = {
-            'incomeStatement': {},
-            'cashFlow': {},
-            'balanceSheet': {}
-        }
-        
-        # Group by year
-        years = set()
-        for month_key in monthly_pl.keys():
-            years.add(month_key[:4])
-        
-        for year in sorted(years):
-            # P&L - Sum up all P&L items for the year
-            year_pl = {k: 0.0 for k in ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 
-                                         'depreciation', 'ebitda', 'ebit', 'interestExpense', 
-                                         'ebt', 'incomeTax', 'netIncome']}
-            for month_key, pl_data in monthly_pl.items():
-                if month_key.startswith(year):
-                    for key in year_pl:
-                        year_pl[key] += pl_data.get(key, 0)
-            
-            # Calculate gross margin for year
-            if year_pl['revenue'] > 0:
-                year_pl['grossMargin'] = year_pl['grossProfit'] / year_pl['revenue']
-            else:
-                year_pl['grossMargin'] = 0
-                
-            annual['incomeStatement'][year] = {k: round(v, 2) for k, v in year_pl.items()}
-            
-            # Cash Flow - Sum up all CF items for the year
-            year_cf = {k: 0.0 for k in ['netIncome', 'depreciation', 'workingCapitalChange',
-                                         'operatingCashFlow', 'investingCashFlow', 
-                                         'financingCashFlow', 'netCashFlow']}
-            for month_key, cf_data in monthly_cf.items():
-                if month_key.startswith(year):
-                    for key in year_cf:
-                        year_cf[key] += cf_data.get(key, 0)
-            
-            # Get ending cash for the year
-            year_months = [k for k in monthly_cf.keys() if k.startswith(year)]
-            if year_months:
-                last_month = sorted(year_months)[-1]
-                year_cf['endingCash'] = monthly_cf[last_month].get('endingCash', 0)
-            
-            annual['cashFlow'][year] = {k: round(v, 2) for k, v in year_cf.items()}
-            
-            # Balance Sheet - Take the last month of the year
-            year_months = [k for k in monthly_bs.keys() if k.startswith(year)]
-            if year_months:
-                last_month = sorted(year_months)[-1]
-                annual['balanceSheet'][year] = monthly_bs[last_month]
-        
-        return annual
+
+        return StatementArrays(month_keys, income_statement, cash_flow, direct_method, balance_sheet, metadata)
+
+    @staticmethod
+    def _debt_schedule(initial_debt, repayment_override, new_debt: np.ndarray, note_conversion: np.ndarray, shape):
+        """
+        Debt repayment, closing debt, new debt and converted notes per month, shaped (paths, months).
+
+        Without financing overrides debt amortizes geometrically (1% of the opening
+        balance per month). Repayment / new debt / conversion events make the
+        balance path-dependent (conversion is capped at the outstanding debt, the
+        balance is floored at zero), so those horizons are rolled forward month by
+        month (still vectorized across paths).
+        """
+        repayment_values, has_repayment = repayment_override
+        horizon = shape[-1]
+        if not (has_repayment.any() or new_debt.any() or note_conversion.any()) and np.all(np.asarray(initial_debt) >= 0):
+            opening = initial_debt * (1 - DEFAULT_DEBT_REPAYMENT_RATE) ** np.arange(horizon, dtype=float)
+            repayment = np.broadcast_to(opening * DEFAULT_DEBT_REPAYMENT_RATE, shape)
+            return repayment, opening - repayment, new_debt, np.zeros(shape)
+
+        repayment_values, has_repayment, new_debt, note_conversion = np.broadcast_arrays(
+            repayment_values, has_repayment, new_debt, note_conversion
+        )
+        repayment = np.empty(shape)
+        closing = np.empty(shape)
+        conversion = np.zeros(shape)
+        running_debt = np.broadcast_to(initial_debt, shape[:-1] + (1,))[:, 0].astype(float)
+        for i in range(horizon):
+            repayment[:, i] = np.where(has_repayment[..., i], repayment_values[..., i], running_debt * DEFAULT_DEBT_REPAYMENT_RATE)
+            converting = note_conversion[..., i] > 0
+            conversion[:, i] = np.where(converting, np.minimum(note_conversion[..., i], running_debt), 0.0)
+            running_debt = np.where(converting, running_debt - conversion[:, i], running_debt)
+            running_debt = np.maximum(0, running_debt - repayment[:, i] + new_debt[..., i])
+            closing[:, i] = running_debt
+        return repayment, closing, new_debt, conversion
     
     def validate_statements(self, statements: Dict[str, Any], initial_values: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
@@ -592,6 +869,36 @@ class ThreeStatementEngine:
         return validations
 
 
+def _parse_start_month(start_month: Union[str, datetime]) -> datetime:
+    """Parse start month robustly"""
+    if isinstance(start_month, str):
+        from dateutil.parser import parse
+        return parse(start_month)
+    return start_month
+
+
+def compute_three_statement_arrays(
+    start_month: Union[str, datetime],
+    horizon_months: int,
+    initial_values: Dict[str, float],
+    growth_assumptions: Dict[str, float],
+    monthly_overrides: Optional[Dict[str, Dict[str, float]]] = None,
+    headcount_costs: Optional[Dict[str, float]] = None
+) -> StatementArrays:
+    """
+    Convenience function to compute the 3-statement model as arrays (no validation,
+    no monthly dictionaries). Used by per-path hot loops such as Monte Carlo.
+    """
+    return ThreeStatementEngine().compute_statement_arrays(
+        start_month=_parse_start_month(start_month),
+        horizon_months=horizon_months,
+        initial_values=initial_values,
+        growth_assumptions=growth_assumptions,
+        monthly_overrides=monthly_overrides,
+        headcount_costs=headcount_costs
+    )
+
+
 def compute_three_statements(
     start_month: str,
     horizon_months: int,
@@ -603,18 +910,8 @@ def compute_three_statements(
     """
     Convenience function to compute 3-statement model.
     """
-    engine = ThreeStatementEngine()
-    
-    # Parse start month robustly
-    from dateutil.parser import parse
-    if isinstance(start_month, str):
-        start_dt = parse(start_month)
-    else:
-        start_dt = start_month
-    
-    # Compute statements
-    statements = engine.compute_statements(
-        start_month=start_dt,
+    arrays = compute_three_statement_arrays(
+        start_month=start_month,
         horizon_months=horizon_months,
         initial_values=initial_values,
         growth_assumptions=growth_assumptions,
@@ -622,24 +919,86 @@ def compute_three_statements(
         headcount_costs=headcount_costs
     )
     
+    statements = arrays.to_dict()
+    
     # Validate
-    validation = engine.validate_statements(statements)
-    statements['validation'] = validation
+    statements['validation'] = arrays.validate()
     
     return statements
+
+
+
+# Line items rolled up by ConsolidationEngine (P&L at average rate, balance sheet at closing rate)
+CONSOLIDATION_PL_FIELDS = ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 'sbc', 'depreciation',
+                           'impairment', 'ebitda', 'ebit', 'interestExpense', 'ebt', 'incomeTax']
+CONSOLIDATION_ASSET_FIELDS = ['cash', 'ar', 'inventory', 'totalCurrentAssets', 'ppe', 'accumulatedDepreciation',
+                              'fixedAssets', 'rouAsset', 'investmentInSubsidiaries']
+CONSOLIDATION_LIABILITY_FIELDS = ['ap', 'deferredRevenue', 'currentLiabilities', 'debt', 'leaseLiability', 'dtl',
+                                  'totalLiabilities']
+CONSOLIDATION_EQUITY_FIELDS = ['commonStock', 'retainedEarnings']
+
+
+def _entity_metadata(entity: Union[Dict[str, Any], StatementArrays]) -> Dict[str, Any]:
+    return entity.metadata if isinstance(entity, StatementArrays) else entity.get('metadata', {})
+
+
+def _stack_entity_lines(entities: List[Union[Dict[str, Any], StatementArrays]], month_keys: List[str],
+                        statement: str, fields: List[str], group: Optional[str] = None) -> np.ndarray:
+    """(entities, months, fields) tensor of one statement's monthly line items (missing = 0)"""
+    stacked = np.zeros((len(entities), len(month_keys), len(fields)))
+    getter = itemgetter(*fields)
+    for e, entity in enumerate(entities):
+        if isinstance(entity, StatementArrays):
+            # Arrays are already columns; only the month axis needs aligning
+            items = entity.income_statement if statement == 'incomeStatement' else entity.balance_sheet
+            missing = np.zeros(len(entity.month_keys))
+            columns = np.stack([items.get(k, missing) for k in fields], axis=-1)
+            if entity.month_keys == month_keys:
+                stacked[e] = columns
+            else:
+                position = {m: i for i, m in enumerate(entity.month_keys)}
+                rows = [(i, position[m]) for i, m in enumerate(month_keys) if m in position]
+                stacked[e, [i for i, _ in rows]] = columns[[j for _, j in rows]]
+            continue
+
+        monthly = entity[statement]['monthly']
+        rows = []
+        for month_key in month_keys:
+            lines = monthly.get(month_key, {})
+            if group:
+                lines = lines.get(group, {})
+            try:
+                rows.append(getter(lines))
+            except KeyError:
+                rows.append([lines.get(k, 0) for k in fields])
+        if rows:
+            stacked[e] = rows
+    return stacked
+
+
+def _entity_sum(values: np.ndarray) -> np.ndarray:
+    """Sum over the leading entity axis in entity order (same rounding as `total += value`)"""
+    total = np.zeros(values.shape[1:])
+    for entity_values in values:
+        total += entity_values
+    return total
+
+
 class ConsolidationEngine:
     """
     Handles multi-entity consolidation with intercompany eliminations, FX translation, 
     minority interest accounting, and regional tax overriding.
     """
     
-    def __init__(self, entities: List[Dict[str, Any]], fx_rates: Optional[Dict[str, float]] = None, 
+    def __init__(self, entities: List[Union[Dict[str, Any], StatementArrays]], fx_rates: Optional[Dict[str, float]] = None, 
                  avg_fx_rates: Optional[Dict[str, float]] = None,
                  regional_tax_rates: Optional[Dict[str, float]] = None, 
                  minority_interests: Optional[Dict[str, float]] = None):
         """
         Args:
-            entities: List of output dictionaries from compute_three_statements
+            entities: List of output dictionaries from compute_three_statements, or
+                      StatementArrays from compute_three_statement_arrays (entityId,
+                      currency and entityType are then read from their metadata)
             fx_rates: Mapping of currency to USD (Closing Rate)
             avg_fx_rates: Mapping of currency to USD (Average Rate)
             regional_tax_rates: Optional map of region/entity code to tax rate.
@@ -655,11 +1014,18 @@ class ConsolidationEngine:
         """
         Roll up all entities and apply eliminations, minority interest, FX translation adjustments (CTA), and tax overrides.
         Industrial grade implementation supporting IFRS/GAAP standards.
+
+        Entity statements are stacked into (entities, months, lines) tensors: FX
+        translation and NCI are weight vectors over the entity axis, intercompany
+        eliminations a (months, entries) matrix, so the roll-up is a handful of
+        array reductions whatever the number of subsidiaries.
         """
         if not self.entities:
             return {}
             
-        all_month_keys = sorted(list(self.entities[0]['incomeStatement']['monthly'].keys()))
+        first = self.entities[0]
+        all_month_keys = sorted(first.month_keys if isinstance(first, StatementArrays)
+                                else first['incomeStatement']['monthly'].keys())
         consolidated = {
             'incomeStatement': {'monthly': {}, 'annual': {}},
             'cashFlow': {'monthly': {}, 'annual': {}},
@@ -672,155 +1038,149 @@ class ConsolidationEngine:
                 'fxRates': self.fx_rates
             }
         }
-        
-        # Cumulative tracking for minority interest equity buildup and CTA
-        cumulative_mi_equity = 0.0
-        cumulative_cta = 0.0
-        
-        # Tracking for Investment vs Equity elimination
-        # In a real system, we'd look for 'investmentInSubsidiaries' on the Parent's BS.
-        # We'll simulate this by identifying the 'parent' entity.
-        subsidiary_equity_eliminated = {} # {entity_id: total_eliminated}
-
-        for month_key in all_month_keys:
-            # Aggregate P&L
-            month_pl = {k: 0.0 for k in ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 
-                                         'sbc', 'depreciation', 'impairment', 'ebitda', 'ebit', 
-                                         'interestExpense', 'ebt', 'incomeTax', 'netIncomeBeforeMI', 'minorityInterest', 'netIncome']}
-            # Aggregate BS
+        num_months = len(all_month_keys)
+
+        # Entity weight vectors: FX rates, NCI share, regional tax overrides
+        entity_meta = [_entity_metadata(entity) for entity in self.entities]
+        entity_ids = [meta.get('entityId', 'UNKNOWN') for meta in entity_meta]
+        currencies = [meta.get('currency', 'USD') for meta in entity_meta]
+        is_subsidiary = [meta.get('entityType', 'subsidiary') == 'subsidiary' for meta in entity_meta]
+
+        closing_fx = np.array([self.fx_rates.get(c, 1.0) for c in currencies], dtype=float)
+        avg_fx = np.array([self.avg_fx_rates.get(c, self.fx_rates.get(c, 1.0)) for c in currencies], dtype=float)
+        mi_pct = np.array([self.minority_interests.get(e, 0.0) for e in entity_ids], dtype=float)
+        has_tax_override = np.array([e in self.regional_tax_rates for e in entity_ids])
+        override_tax_rate = np.array([self.regional_tax_rates.get(e, 0.0) for e in entity_ids], dtype=float)
+
+        pl = _stack_entity_lines(self.entities, all_month_keys, 'incomeStatement', CONSOLIDATION_PL_FIELDS + ['netIncome'])
+        assets = _stack_entity_lines(self.entities, all_month_keys, 'balanceSheet', CONSOLIDATION_ASSET_FIELDS, 'assets')
+        liabilities = _stack_entity_lines(self.entities, all_month_keys, 'balanceSheet', CONSOLIDATION_LIABILITY_FIELDS, 'liabilities')
+        equity = _stack_entity_lines(self.entities, all_month_keys, 'balanceSheet', CONSOLIDATION_EQUITY_FIELDS, 'equity')
+
+        # 1. Regional Tax Override
+        ebt = pl[:, :, CONSOLIDATION_PL_FIELDS.index('ebt')]
+        override_tax = np.maximum(0, ebt * override_tax_rate[:, None])
+        tax = pl[:, :, CONSOLIDATION_PL_FIELDS.index('incomeTax')]
+        tax[:] = np.where(has_tax_override[:, None], override_tax, tax)
+        entity_ni = np.where(has_tax_override[:, None], ebt - override_tax, pl[:, :, -1])
+
+        # 2. Income Statement Aggregation (Average Rate); sums run over entities in order
+        month_pl = _entity_sum(pl[:, :, :-1] * avg_fx[:, None, None])
+        ni_before_mi = _entity_sum(entity_ni * avg_fx[:, None])
+
+        # 3. Minority Interest Calculation (NCI Expense), NCI equity builds up month by month
+        mi_translated = entity_ni * mi_pct[:, None] * avg_fx[:, None]
+        mi_expense = _entity_sum(mi_translated)
+        cumulative_mi_equity = _running(0.0, mi_translated.T.reshape(-1)).reshape(num_months, -1)[:, -1]
+
+        # 4. Balance Sheet Aggregation (Closing Rate)
+        month_assets = _entity_sum(assets * closing_fx[:, None, None])
+        month_liabilities = _entity_sum(liabilities * closing_fx[:, None, None])
+        month_equity = _entity_sum(equity * closing_fx[:, None, None])
+
+        # 5. Equity elimination: parent's share of each subsidiary's equity (last entity per id)
+        elimination = (equity[:, :, 0] + equity[:, :, 1]) * closing_fx[:, None] * (1.0 - mi_pct)[:, None]
+        eliminated_by_id = {}
+        for e, entity_id in enumerate(entity_ids):
+            if is_subsidiary[e]:
+                eliminated_by_id[entity_id] = e
+        total_equity_eliminated = _entity_sum(elimination[list(eliminated_by_id.values())]) \
+            if eliminated_by_id else np.zeros(num_months)
+
+        # --- APPLY GROUP ELIMINATIONS ---
+        asset_col = {k: month_assets[:, n] for n, k in enumerate(CONSOLIDATION_ASSET_FIELDS)}
+        liability_col = {k: month_liabilities[:, n] for n, k in enumerate(CONSOLIDATION_LIABILITY_FIELDS)}
+        pl_col = {k: month_pl[:, n] for n, k in enumerate(CONSOLIDATION_PL_FIELDS)}
+        common_stock = month_equity[:, 0]
+        retained_earnings = month_equity[:, 1] - total_equity_eliminated
+
+        goodwill_raw = asset_col['investmentInSubsidiaries'] - total_equity_eliminated
+        goodwill = np.where(goodwill_raw > 0, goodwill_raw, 0.0)
+        total_assets = 0.0
+        for k in CONSOLIDATION_ASSET_FIELDS[:-1]:
+            total_assets = total_assets + asset_col[k]
+        total_assets = total_assets + goodwill
+
+        # D. Intercompany eliminations: one column per reported entry and month
+        ic_entries = [
+            list(intercompany_map[m].items()) if intercompany_map and m in intercompany_map else []
+            for m in all_month_keys
+        ]
+        width = max((len(entries) for entries in ic_entries), default=0)
+        ic = np.zeros((4, num_months, width))
+        for i, entries in enumerate(ic_entries):
+            for n, (_, data) in enumerate(entries):
+                ic[:, i, n] = [data.get('revenue', 0), data.get('cogs', 0), data.get('ar', 0), data.get('ap', 0)]
+        ic_rev, ic_cogs, ic_ar, ic_ap = ic
+        sale = ic_rev > 0
+        for n in range(width):
+            pl_col['revenue'] = pl_col['revenue'] - np.where(sale[:, n], ic_rev[:, n], 0.0)
+            pl_col['cogs'] = pl_col['cogs'] - np.where(sale[:, n], ic_cogs[:, n], 0.0)
+            asset_col['ar'] = asset_col['ar'] - np.where(ic_ar[:, n] > 0, ic_ar[:, n], 0.0)
+            liability_col['ap'] = liability_col['ap'] - np.where(ic_ap[:, n] > 0, ic_ap[:, n], 0.0)
+
+        # E. Final Net Income
+        net_income = ni_before_mi - mi_expense
+
+        # F. CTA Engine (Cumulative Translation Adjustment): the plug to make A = L + E
+        equity_before_cta = common_stock + retained_earnings + cumulative_mi_equity
+        cumulative_cta = total_assets - (liability_col['totalLiabilities'] + equity_before_cta)
+        cta = _round(cumulative_cta)
+        total_equity = _round(equity_before_cta + cumulative_cta)
+        operating_cash_flow = _round(net_income + pl_col['depreciation'])
+
+        pl_rows = np.column_stack([pl_col[k] for k in CONSOLIDATION_PL_FIELDS]
+                                  + [ni_before_mi, mi_expense, net_income]).tolist()
+        asset_rows = np.column_stack([asset_col[k] for k in CONSOLIDATION_ASSET_FIELDS[:-1]]
+                                     + [total_assets, goodwill_raw]).tolist()
+        liability_rows = np.column_stack([liability_col[k] for k in CONSOLIDATION_LIABILITY_FIELDS]).tolist()
+        equity_rows = np.column_stack([common_stock, retained_earnings, cumulative_mi_equity, cta, total_equity]).tolist()
+        elimination_rows = elimination.T.tolist()
+        cash_flow_rows = operating_cash_flow.tolist()
+
+        for i, month_key in enumerate(all_month_keys):
+            pl_values = pl_rows[i]
+            month_pl = dict(zip(CONSOLIDATION_PL_FIELDS + ['netIncomeBeforeMI', 'minorityInterest', 'netIncome'], pl_values))
+            assets_values = asset_rows[i]
+            goodwill_value = assets_values[-1]
+            month_assets_dict = dict(zip(CONSOLIDATION_ASSET_FIELDS[:-1] + ['totalAssets'], assets_values[:-1]))
+            month_assets_dict['goodwill'] = max(0, goodwill_value)
+            month_assets_dict['investmentInSubsidiaries'] = 0  # Fully eliminated at group level
             month_bs = {
-                'assets': {k: 0.0 for k in ['cash', 'ar', 'inventory', 'totalCurrentAssets', 'ppe', 'accumulatedDepreciation', 'fixedAssets', 'rouAsset', 'totalAssets', 'goodwill', 'investmentInSubsidiaries']},
-                'liabilities': {k: 0.0 for k in ['ap', 'deferredRevenue', 'currentLiabilities', 'debt', 'leaseLiability', 'dtl', 'totalLiabilities']},
-                'equity': {k: 0.0 for k in ['commonStock', 'retainedEarnings', 'minorityInterest', 'cta', 'totalEquity']}
+                'assets': month_assets_dict,
+                'liabilities': dict(zip(CONSOLIDATION_LIABILITY_FIELDS, liability_rows[i])),
+                'equity': dict(zip(['commonStock', 'retainedEarnings', 'minorityInterest', 'cta', 'totalEquity'], equity_rows[i])),
             }
-            
-            for entity in self.entities:
-                currency = entity.get('metadata', {}).get('currency', 'USD')
-                entity_id = entity.get('metadata', {}).get('entityId', 'UNKNOWN')
-                entity_type = entity.get('metadata', {}).get('entityType', 'subsidiary')
-                
-                # NCI (Minority Interest) Percentage
-                mi_pct = self.minority_interests.get(entity_id, 0.0)
-                parent_ownership = 1.0 - mi_pct
-                
-                # Select FX Rates
-                closing_fx = self.fx_rates.get(currency, 1.0)
-                avg_fx = self.avg_fx_rates.get(currency, closing_fx)
-                
-                e_pl = entity['incomeStatement']['monthly'].get(month_key, {})
-                e_bs = entity['balanceSheet']['monthly'].get(month_key, {})
-                
-                # 1. Regional Tax Override
-                entity_ebt = e_pl.get('ebt', 0.0)
-                if entity_id in self.regional_tax_rates:
-                    new_tax = max(0, entity_ebt * self.regional_tax_rates[entity_id])
-                    e_pl['incomeTax'] = new_tax
-                    e_pl['netIncome'] = entity_ebt - new_tax
-                
-                # 2. Income Statement Aggregation (Average Rate)
-                for k in ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 'sbc', 'depreciation', 'impairment', 'ebitda', 'ebit', 'interestExpense', 'ebt', 'incomeTax']:
-                    month_pl[k] += e_pl.get(k, 0) * avg_fx
-                
-                entity_ni = e_pl.get('netIncome', 0.0)
-                month_pl['netIncomeBeforeMI'] += entity_ni * avg_fx
-                
-                # 3. Minority Interest Calculation (NCI Expense)
-                mi_expense = entity_ni * mi_pct
-                month_pl['minorityInterest'] += mi_expense * avg_fx
-                
-                # 4. Balance Sheet Aggregation (Closing Rate)
-                # Current Assets
-                for k in ['cash', 'ar', 'inventory']:
-                    month_bs['assets'][k] += e_bs.get('assets', {}).get(k, 0) * closing_fx
-                month_bs['assets']['totalCurrentAssets'] += e_bs.get('assets', {}).get('totalCurrentAssets', 0) * closing_fx
-                
-                # Fixed Assets
-                for k in ['ppe', 'accumulatedDepreciation', 'fixedAssets', 'rouAsset']:
-                    month_bs['assets'][k] += e_bs.get('assets', {}).get(k, 0) * closing_fx
-                
-                # Liabilities
-                for k in ['ap', 'deferredRevenue', 'currentLiabilities', 'debt', 'leaseLiability', 'dtl', 'totalLiabilities']:
-                    month_bs['liabilities'][k] += e_bs.get('liabilities', {}).get(k, 0) * closing_fx
-                
-                # Equity (Aggregated first, then eliminated)
-                for k in ['commonStock', 'retainedEarnings']:
-                    month_bs['equity'][k] += e_bs.get('equity', {}).get(k, 0) * closing_fx
-                
-                # Investment account (if Parent)
-                inv_val = e_bs.get('assets', {}).get('investmentInSubsidiaries', 0)
-                month_bs['assets']['investmentInSubsidiaries'] += inv_val * closing_fx
-                
-                # 5. EQUITY ELIMINATION LOGIC
-                if entity_type == 'subsidiary':
-                    sub_equity = (e_bs.get('equity', {}).get('commonStock', 0) + e_bs.get('equity', {}).get('retainedEarnings', 0)) * closing_fx
-                    elimination_amount = sub_equity * parent_ownership
-                    subsidiary_equity_eliminated[entity_id] = elimination_amount
-                    
+
+            for e, entity_id in enumerate(entity_ids):
+                if is_subsidiary[e]:
                     consolidated['eliminationJournals'].append({
                         'month': month_key,
                         'account': 'Equity',
                         'action': 'Investment Elimination',
                         'entity': entity_id,
-                        'amount': elimination_amount,
+                        'amount': elimination_rows[i][e],
                         'debit': f'Subsidiary Equity ({entity_id})',
                         'credit': 'Investment in Subsidiary (Parent)'
                     })
 
-                # Cumulative NCI Equity buildup
-                cumulative_mi_equity += mi_expense * avg_fx
-            
-            # --- APPLY GROUP ELIMINATIONS ---
-            
-            # A. Deduct eliminated sub equity from aggregated Group Equity
-            total_equity_eliminated = sum(subsidiary_equity_eliminated.values())
-            month_bs['equity']['retainedEarnings'] -= total_equity_eliminated
-            
-            # B. Deduct Investment and calculate Goodwill
-            total_investment = month_bs['assets']['investmentInSubsidiaries']
-            goodwill = max(0, total_investment - total_equity_eliminated)
-            month_bs['assets']['goodwill'] = goodwill
-            month_bs['assets']['investmentInSubsidiaries'] = 0 # Fully eliminated at group level
-            
-            # Update total assets for Goodwill
-            month_bs['assets']['totalAssets'] = sum([v for k, v in month_bs['assets'].items() if k != 'totalAssets'])
-            
-            # C. Non-Controlling Interest (NCI) on Balance Sheet
-            month_bs['equity']['minorityInterest'] = cumulative_mi_equity
-            
-            # D. Standard Intercompany Eliminations (Revenue/AR/AP)
-            ic_rev = ic_cogs = ic_ar = ic_ap = ic_interest = 0
-            # Enhanced Intercompany Eliminations with Group-Level Reconciliation
-            if intercompany_map and month_key in intercompany_map:
-                month_data = intercompany_map[month_key]
+            if ic_entries[i]:
                 total_ic_ar = 0
                 total_ic_ap = 0
-                
-                for entity_code, data in month_data.items():
-                    ic_rev = data.get('revenue', 0)
-                    ic_cogs = data.get('cogs', 0)
-                    ic_ar = data.get('ar', 0)
-                    ic_ap = data.get('ap', 0) # AP should be explicitly reported
-                    
-                    total_ic_ar += ic_ar
-                    total_ic_ap += ic_ap
-                    
-                    if ic_rev > 0:
-                        month_pl['revenue'] -= ic_rev
-                        month_pl['cogs'] -= ic_cogs
+                for entity_code, data in ic_entries[i]:
+                    ic_rev_amount = data.get('revenue', 0)
+                    total_ic_ar += data.get('ar', 0)
+                    total_ic_ap += data.get('ap', 0)  # AP should be explicitly reported
+                    if ic_rev_amount > 0:
                         consolidated['eliminationJournals'].append({
                             'month': month_key, 
                             'account': 'P&L', 
                             'action': f'IC Sales Elimination ({entity_code})', 
-                            'amount': ic_rev, 
+                            'amount': ic_rev_amount, 
                             'debit': 'IC Revenue', 
                             'credit': 'IC COGS'
                         })
-                    
-                    if ic_ar > 0:
-                        month_bs['assets']['ar'] -= ic_ar
-                    if ic_ap > 0:
-                        month_bs['liabilities']['ap'] -= ic_ap
-                        
+
                 # Global Discrepancy Check (The "Net Zero" Audit Principle)
                 if abs(total_ic_ar - total_ic_ap) > 0.01:
                     consolidated['discrepancies'].append({
@@ -829,26 +1189,13 @@ class ConsolidationEngine:
                         'amount': total_ic_ar - total_ic_ap,
                         'details': f"Total Group IC-AR ({total_ic_ar}) does not match Total Group IC-AP ({total_ic_ap})"
                     })
-            
-            # E. Calculate Final Net Income
-            month_pl['netIncome'] = month_pl['netIncomeBeforeMI'] - month_pl['minorityInterest']
-            
-            # F. CTA Engine (Cumulative Translation Adjustment)
-            # CTA is the plug to make A = L + E
-            total_assets = month_bs['assets']['totalAssets']
-            total_liabilities = month_bs['liabilities']['totalLiabilities']
-            equity_before_cta = month_bs['equity']['commonStock'] + month_bs['equity']['retainedEarnings'] + month_bs['equity']['minorityInterest']
-            
-            cumulative_cta = total_assets - (total_liabilities + equity_before_cta)
-            month_bs['equity']['cta'] = round(cumulative_cta, 2)
-            month_bs['equity']['totalEquity'] = round(equity_before_cta + cumulative_cta, 2)
-            
+
             consolidated['incomeStatement']['monthly'][month_key] = month_pl
             consolidated['balanceSheet']['monthly'][month_key] = month_bs
             consolidated['cashFlow']['monthly'][month_key] = {
                 'netIncome': month_pl['netIncome'],
-                'operatingCashFlow': round(month_pl['netIncome'] + month_pl['depreciation'], 2),
-                'endingCash': month_bs['assets']['cash']
+                'operatingCashFlow': cash_flow_rows[i],
+                'endingCash': month_assets_dict['cash']
             }
 
         # Calculate annual summaries
@@ -869,42 +1216,39 @@ class ConsolidationEngine:
             'cashFlow': {},
             'balanceSheet': {}
         }
-        
-        years = set()
-        for month_key in monthly_pl.keys():
-            years.add(month_key[:4])
-        for month_key in monthly_bs.keys():
-            years.add(month_key[:4])
-            
-        for year in sorted(years):
-            # P&L
-            year_pl = {k: 0.0 for k in ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 
-                                         'depreciation', 'ebitda', 'ebit', 'interestExpense', 
-                                         'ebt', 'incomeTax', 'netIncome']}
-            for month_key, pl_data in monthly_pl.items():
-                if month_key.startswith(year):
-                    for key in year_pl:
-                        year_pl[key] += pl_data.get(key, 0)
-            
+
+        # One pass per statement, but each year's totals are accumulated in the
+        # monthly dicts' own order and rounded once, so sums match to the cent
+        years = sorted({month_key[:4] for month_key in monthly_pl} | {month_key[:4] for month_key in monthly_bs})
+
+        pl_keys = ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 'depreciation', 'ebitda',
+                   'ebit', 'interestExpense', 'ebt', 'incomeTax', 'netIncome']
+        pl_totals = {year: {k: 0.0 for k in pl_keys} for year in years}
+        for month_key, pl_data in monthly_pl.items():
+            year_pl = pl_totals[month_key[:4]]
+            for key in pl_keys:
+                year_pl[key] += pl_data.get(key, 0)
+
+        cf_totals = {year: {k: 0.0 for k in ['netIncome', 'operatingCashFlow', 'endingCash']} for year in years}
+        for month_key, cf_data in monthly_cf.items():
+            year_cf = cf_totals.get(month_key[:4])
+            if year_cf is None:
+                continue
+            for key in ['netIncome', 'operatingCashFlow']:
+                year_cf[key] += cf_data.get(key, 0)
+            year_cf['endingCash'] = cf_data.get('endingCash', 0)  # Overwrite with last
+
+        last_bs_month = {}
+        for month_key in sorted(monthly_bs):
+            last_bs_month[month_key[:4]] = month_key
+
+        for year in years:
+            year_pl = pl_totals[year]
             if year_pl['revenue'] > 0:
                 year_pl['grossMargin'] = year_pl['grossProfit'] / year_pl['revenue']
-            
             annual['incomeStatement'][year] = {k: round(v, 2) for k, v in year_pl.items()}
-            
-            # Cash Flow
-            year_cf = {k: 0.0 for k in ['netIncome', 'operatingCashFlow', 'endingCash']}
-            for month_key, cf_data in monthly_cf.items():
-                if month_key.startswith(year):
-                    for key in ['netIncome', 'operatingCashFlow']:
-                        year_cf[key] += cf_data.get(key, 0)
-                    year_cf['endingCash'] = cf_data.get('endingCash', 0) # Overwrite with last
-            
-            annual['cashFlow'][year] = {k: round(v, 2) for k, v in year_cf.items()}
-            
-            # Balance Sheet
-            year_months = [k for k in monthly_bs.keys() if k.startswith(year)]
-            if year_months:
-                last_month = sorted(year_months)[-1]
-                annual['balanceSheet'][year] = monthly_bs[last_month]
-        
+            annual['cashFlow'][year] = {k: round(v, 2) for k, v in cf_totals[year].items()}
+            if year in last_bs_month:
+                annual['balanceSheet'][year] = monthly_bs[last_bs_month[year]]
+
         return annual
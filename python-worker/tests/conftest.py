@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import worker modules the same way worker.py does (jobs.*, utils.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
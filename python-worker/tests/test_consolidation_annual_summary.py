@@ -0,0 +1,86 @@
+"""
+Parity of ConsolidationEngine._calculate_annual_summary with the original
+per-month loop: annual totals must match it exactly, to the cent.
+"""
+import random
+
+import pytest
+
+from jobs.three_statement_engine import ConsolidationEngine
+
+PL_KEYS = ['revenue', 'cogs', 'grossProfit', 'operatingExpenses', 'depreciation', 'ebitda',
+           'ebit', 'interestExpense', 'ebt', 'incomeTax', 'netIncome']
+
+
+def reference_annual_summary(monthly_pl, monthly_cf, monthly_bs):
+    """The per-month loop _calculate_annual_summary used to run."""
+    annual = {'incomeStatement': {}, 'cashFlow': {}, 'balanceSheet': {}}
+
+    years = set()
+    for month_key in monthly_pl.keys():
+        years.add(month_key[:4])
+    for month_key in monthly_bs.keys():
+        years.add(month_key[:4])
+
+    for year in sorted(years):
+        year_pl = {k: 0.0 for k in PL_KEYS}
+        for month_key, pl_data in monthly_pl.items():
+            if month_key.startswith(year):
+                for key in year_pl:
+                    year_pl[key] += pl_data.get(key, 0)
+        if year_pl['revenue'] > 0:
+            year_pl['grossMargin'] = year_pl['grossProfit'] / year_pl['revenue']
+        annual['incomeStatement'][year] = {k: round(v, 2) for k, v in year_pl.items()}
+
+        year_cf = {k: 0.0 for k in ['netIncome', 'operatingCashFlow', 'endingCash']}
+        for month_key, cf_data in monthly_cf.items():
+            if month_key.startswith(year):
+                for key in ['netIncome', 'operatingCashFlow']:
+                    year_cf[key] += cf_data.get(key, 0)
+                year_cf['endingCash'] = cf_data.get('endingCash', 0)
+        annual['cashFlow'][year] = {k: round(v, 2) for k, v in year_cf.items()}
+
+        year_months = [k for k in monthly_bs.keys() if k.startswith(year)]
+        if year_months:
+            annual['balanceSheet'][year] = monthly_bs[sorted(year_months)[-1]]
+
+    return annual
+
+
+def _month_keys(rng, start_year, months):
+    keys = [f"{start_year + m // 12}-{m % 12 + 1:02d}" for m in range(months)]
+    if rng.random() < 0.5:
+        rng.shuffle(keys)  # Insertion order is part of the summation order
+    return keys
+
+
+def _random_statements(seed):
+    rng = random.Random(seed)
+    keys = _month_keys(rng, 2024 + rng.randint(0, 3), rng.randint(1, 60))
+    # Consolidated lines are not always pre-rounded (e.g. FX-translated interest)
+    digits = 2 if seed % 2 else 9
+    monthly_pl = {
+        k: {key: round(rng.uniform(-1e6, 1e6), digits) for key in PL_KEYS if rng.random() < 0.95}
+        for k in keys
+    }
+    monthly_cf = {
+        k: {'netIncome': round(rng.uniform(-1e5, 1e5), 2),
+            'operatingCashFlow': round(rng.uniform(-1e5, 1e5), 2),
+            'endingCash': round(rng.uniform(0, 1e7), 2)}
+        for k in keys
+    }
+    monthly_bs = {k: {'assets': {'cash': round(rng.uniform(0, 1e7), 2)}} for k in keys}
+    return monthly_pl, monthly_cf, monthly_bs
+
+
+@pytest.fixture
+def engine():
+    return ConsolidationEngine([])
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_matches_per_month_loop(engine, seed):
+    monthly_pl, monthly_cf, monthly_bs = _random_statements(seed)
+    for args in [(monthly_pl, {}, {}), ({}, {}, monthly_bs), (monthly_pl, monthly_cf, monthly_bs)]:
+        assert engine._calculate_annual_summary(*args) == reference_annual_summary(*args)
+
@@ -0,0 +1,149 @@
+"""
+Ledger Reader
+Streams raw_transactions through a named (server-side) cursor in fixed-size
+batches so jobs can aggregate an org's full history in O(batch) memory.
+
+    for chunk in iter_ledger_chunks(cursor, org_id):
+        chunk['date']      # datetime64[D]
+        chunk['amount']    # float64 (NULL -> 0)
+        chunk['category']  # object (str or None)
+"""
+
+import os
+import uuid
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+LEDGER_BATCH_SIZE = int(os.getenv('LEDGER_BATCH_SIZE', '50000'))
+
+# Column name -> SQL expression. Amounts are converted to float8 in the database
+# so no per-row Decimal objects are created on the worker.
+LEDGER_COLUMNS = {
+    'id': 'id::text',
+    'date': 'date',
+    'amount': 'COALESCE(amount, 0)::float8',
+    'currency': 'currency',
+    'category': 'category',
+    'description': 'description',
+    'source_id': 'source_id',
+    'imported_at': 'imported_at',
+}
+
+# Per-row content hash over everything the ledger aggregates read. SUM() of it
+# changes when rows are edited in place (e.g. recategorized), which neither the
+# row count nor imported_at reveal.
+LEDGER_ROW_CHECKSUM = (
+    "hashtext(id::text || '|' || date::text || '|' || COALESCE(amount, 0)::text || '|' || COALESCE(category, ''))"
+)
+
+_COLUMN_DTYPES = {
+    'date': 'datetime64[D]',
+    'amount': np.float64,
+}
+
+
+def _connection_of(cursor_or_conn):
+    return getattr(cursor_or_conn, 'connection', cursor_or_conn)
+
+
+def iter_ledger_batches(
+    cursor_or_conn,
+    query: str,
+    params: Sequence,
+    batch_size: Optional[int] = None,
+) -> Iterator[List[tuple]]:
+    """
+    Run query on a named server-side cursor and yield lists of row tuples.
+
+    The cursor lives inside the caller's transaction; consume the generator
+    fully (or close it) before committing or rolling back.
+    """
+    batch_size = batch_size or LEDGER_BATCH_SIZE
+    conn = _connection_of(cursor_or_conn)
+    named = conn.cursor(name=f"ledger_{uuid.uuid4().hex[:12]}")
+    named.itersize = batch_size
+    try:
+        named.execute(query, params)
+        while True:
+            rows = named.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            named.close()
+        except Exception as e:
+            logger.warning(f"Could not close ledger cursor: {e}")
+
+
+def ledger_query(
+    org_id: str,
+    columns: Sequence[str] = ('date', 'amount', 'category', 'description'),
+    import_batch_id: Optional[str] = None,
+    months: Optional[Sequence[str]] = None,
+    since=None,
+    until=None,
+):
+    """Build the (query, params) pair for a filtered, deterministically ordered ledger read"""
+    unknown = [c for c in columns if c not in LEDGER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown ledger columns: {unknown}")
+
+    clauses = ["org_id = %s", "is_duplicate = false"]
+    params: List = [org_id]
+    if import_batch_id:
+        clauses.append("import_batch_id = %s")
+        params.append(import_batch_id)
+    if months is not None:
+        clauses.append("to_char(date, 'YYYY-MM') = ANY(%s)")
+        params.append(list(months))
+    if since is not None:
+        clauses.append("date >= %s")
+        params.append(since)
+    if until is not None:
+        clauses.append("date < %s")
+        params.append(until)
+
+    select = ",\n            ".join(f"{LEDGER_COLUMNS[c]} AS {c}" for c in columns)
+    query = f"""
+        SELECT
+            {select}
+        FROM raw_transactions
+        WHERE {' AND '.join(clauses)}
+        ORDER BY date ASC, id ASC
+    """
+    return query, params
+
+
+def iter_ledger_chunks(
+    cursor_or_conn,
+    org_id: str,
+    columns: Sequence[str] = ('date', 'amount', 'category', 'description'),
+    import_batch_id: Optional[str] = None,
+    months: Optional[Sequence[str]] = None,
+    since=None,
+    until=None,
+    batch_size: Optional[int] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Stream an org's non-duplicate transactions as columnar NumPy chunks.
+
+    Rows are ordered by (date, id). Dates come back as datetime64[D], amounts as
+    float64 and text columns as object arrays; wrap a chunk in pandas.DataFrame
+    if a frame is more convenient.
+    """
+    if months is not None and not months:
+        return
+    query, params = ledger_query(org_id, columns, import_batch_id, months, since, until)
+    for rows in iter_ledger_batches(cursor_or_conn, query, params, batch_size):
+        chunk = {}
+        for j, col in enumerate(columns):
+            values = [row[j] for row in rows]
+            dtype = _COLUMN_DTYPES.get(col)
+            chunk[col] = np.array(values, dtype=dtype) if dtype else np.array(values, dtype=object)
+        yield chunk
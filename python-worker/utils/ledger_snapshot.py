@@ -0,0 +1,185 @@
+"""
+Ledger Snapshot Cache
+Process-local, memory-bounded LRU cache of each org's non-duplicate ledger as
+columnar arrays (date, amount, category code), so back-to-back jobs for the
+same org (model run -> Monte Carlo -> alerts -> exports) read the ledger once.
+
+A cached snapshot is revalidated on every access against the org's ledger
+version: a counter in ledger_versions that statement-level triggers on
+raw_transactions bump on every insert, update (recategorization, duplicate
+flag) and delete, so the check is a primary-key lookup. Databases without the
+ledger_versions migration fall back to row count + latest imported_at, which
+misses in-place edits (invalidate_ledger_snapshot drops an org explicitly).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.ledger_reader import iter_ledger_chunks
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+LEDGER_SNAPSHOT_CACHE_BYTES = int(os.getenv('LEDGER_SNAPSHOT_CACHE_MB', '512')) * 1024 * 1024
+
+
+class LedgerSnapshot:
+    """Columnar copy of an org's ledger, ordered by (date, id)"""
+
+    def __init__(self, org_id: str, watermark: Tuple, dates: np.ndarray, amounts: np.ndarray,
+                 category_codes: np.ndarray, categories: np.ndarray):
+        self.org_id = org_id
+        self.watermark = watermark
+        self.dates = dates                    # datetime64[D]
+        self.amounts = amounts                # float64
+        self.category_codes = category_codes  # int32 index into categories
+        self.categories = categories          # object array of distinct categories (None allowed)
+
+    def __len__(self) -> int:
+        return int(self.amounts.size)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.dates.nbytes + self.amounts.nbytes + self.category_codes.nbytes
+                   + sum(len(c or '') + 50 for c in self.categories))
+
+    def slice(self, since=None, until=None) -> Tuple[int, int]:
+        """Row range [start, stop) with since <= date < until (dates are sorted)"""
+        start = 0 if since is None else int(np.searchsorted(self.dates, np.datetime64(since, 'D'), side='left'))
+        stop = len(self) if until is None else int(np.searchsorted(self.dates, np.datetime64(until, 'D'), side='left'))
+        return start, max(start, stop)
+
+    def chunk(self, since=None, until=None) -> Dict[str, np.ndarray]:
+        """The (optionally date-filtered) ledger in the same shape as utils.ledger_reader chunks"""
+        start, stop = self.slice(since, until)
+        return {
+            'date': self.dates[start:stop],
+            'amount': self.amounts[start:stop],
+            'category': self.categories[self.category_codes[start:stop]],
+        }
+
+
+def fetch_ledger_watermark(cursor, org_id: str) -> Tuple:
+    """
+    ('version', n) from ledger_versions (O(1)), or ('count', row count, latest
+    imported_at) of the org's non-duplicate ledger where that table does not exist
+    """
+    try:
+        cursor.execute("SAVEPOINT ledger_watermark")
+        cursor.execute("SELECT version FROM ledger_versions WHERE org_id = %s", (org_id,))
+        row = cursor.fetchone()
+        cursor.execute("RELEASE SAVEPOINT ledger_watermark")
+        return ('version', int(row[0]) if row else 0)
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT ledger_watermark")
+
+    cursor.execute("""
+        SELECT COUNT(*), MAX(imported_at)
+        FROM raw_transactions
+        WHERE org_id = %s
+          AND is_duplicate = false
+    """, (org_id,))
+    row = cursor.fetchone()
+    return ('count', int(row[0] or 0), row[1].isoformat() if row[1] else None)
+
+
+def load_ledger_snapshot(cursor, org_id: str, watermark: Tuple) -> LedgerSnapshot:
+    """Stream the org's ledger into a columnar snapshot"""
+    dates, amounts, codes = [], [], []
+    category_index: Dict[Optional[str], int] = {}
+    for chunk in iter_ledger_chunks(cursor, org_id, columns=('date', 'amount', 'category')):
+        dates.append(chunk['date'])
+        amounts.append(chunk['amount'])
+        codes.append(np.fromiter(
+            (category_index.setdefault(c, len(category_index)) for c in chunk['category']),
+            dtype=np.int32, count=chunk['amount'].size,
+        ))
+
+    categories = np.empty(len(category_index), dtype=object)
+    for category, code in category_index.items():
+        categories[code] = category
+
+    return LedgerSnapshot(
+        org_id,
+        watermark,
+        np.concatenate(dates) if dates else np.array([], dtype='datetime64[D]'),
+        np.concatenate(amounts) if amounts else np.array([], dtype=np.float64),
+        np.concatenate(codes) if codes else np.array([], dtype=np.int32),
+        categories,
+    )
+
+
+class LedgerSnapshotCache:
+    """LRU of LedgerSnapshot by org, bounded by total array memory"""
+
+    def __init__(self, max_bytes: int = LEDGER_SNAPSHOT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._snapshots: 'OrderedDict[str, LedgerSnapshot]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, cursor, org_id: str) -> LedgerSnapshot:
+        watermark = fetch_ledger_watermark(cursor, org_id)
+        snapshot = self._current(org_id, watermark)
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = load_ledger_snapshot(cursor, org_id, watermark)
+        logger.info(f"Loaded ledger snapshot for org {org_id}: {len(snapshot)} rows, {snapshot.nbytes / 1e6:.1f} MB")
+        self.put(snapshot)
+        return snapshot
+
+    def peek(self, cursor, org_id: str) -> Optional[LedgerSnapshot]:
+        """The cached snapshot if it is still current, else None (never loads)"""
+        with self._lock:
+            if org_id not in self._snapshots:
+                return None
+        return self._current(org_id, fetch_ledger_watermark(cursor, org_id))
+
+    def _current(self, org_id: str, watermark: Tuple) -> Optional[LedgerSnapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(org_id)
+            if snapshot is not None and snapshot.watermark == watermark:
+                self._snapshots.move_to_end(org_id)
+                return snapshot
+        return None
+
+    def put(self, snapshot: LedgerSnapshot) -> None:
+        with self._lock:
+            previous = self._snapshots.pop(snapshot.org_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            if snapshot.nbytes > self.max_bytes:
+                return  # Larger than the whole budget: serve it uncached
+            self._snapshots[snapshot.org_id] = snapshot
+            self._bytes += snapshot.nbytes
+            while self._bytes > self.max_bytes and self._snapshots:
+                _, evicted = self._snapshots.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def invalidate(self, org_id: str) -> None:
+        with self._lock:
+            snapshot = self._snapshots.pop(org_id, None)
+            if snapshot is not None:
+                self._bytes -= snapshot.nbytes
+
+
+_ledger_cache = LedgerSnapshotCache()
+
+
+def get_ledger_snapshot(cursor, org_id: str) -> LedgerSnapshot:
+    """Current ledger snapshot for an org (shared by all handlers in this process)"""
+    return _ledger_cache.get(cursor, org_id)
+
+
+def peek_ledger_snapshot(cursor, org_id: str) -> Optional[LedgerSnapshot]:
+    """Current cached ledger snapshot for an org, or None when none is cached (no load)"""
+    return _ledger_cache.peek(cursor, org_id)
+
+
+def invalidate_ledger_snapshot(org_id: str) -> None:
+    _ledger_cache.invalidate(org_id)
@@ -0,0 +1,135 @@
+"""
+Period Rollup
+Monthly -> quarterly -> annual aggregation over a fiscal calendar.
+
+Month keys ('YYYY-MM', ascending) are mapped once to period index arrays. Flows
+are summed per period with np.add.reduceat, balances take the period's last
+month and ratios are recomputed from their summed components, so every rollup
+is a single O(months) pass over the line item arrays.
+
+Period labels:
+    fiscal year starting in January:       '2026',   '2026-Q1'
+    fiscal year starting in another month: 'FY2027', 'FY2027-Q1'  (named by the calendar year it ends in)
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+FREQUENCIES = ('month', 'quarter', 'year')
+
+
+class PeriodIndex:
+    """Runs of consecutive months that fall in the same period"""
+
+    def __init__(self, labels: List[str], starts: np.ndarray, stops: np.ndarray, period_of_month: np.ndarray):
+        self.labels = labels                    # one label per period
+        self.starts = starts                    # index of each period's first month
+        self.stops = stops                      # one past each period's last month
+        self.period_of_month = period_of_month  # period number of each month
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Index of each period's last month"""
+        return self.stops - 1
+
+    def segments(self) -> List[Tuple[str, int, int]]:
+        """(label, start, stop) per period"""
+        return list(zip(self.labels, self.starts.tolist(), self.stops.tolist()))
+
+
+class PeriodCalendar:
+    """
+    Fiscal calendar over a sequence of month keys.
+
+    Line item arrays passed to the rollups carry months on their last axis, so
+    batched (paths, months) or (entities, months, ...) data rolls up in one call.
+    """
+
+    def __init__(self, month_keys: Sequence[str], fiscal_year_start_month: int = 1):
+        if not 1 <= int(fiscal_year_start_month) <= 12:
+            raise ValueError("fiscal_year_start_month must be between 1 and 12")
+        self.month_keys = list(month_keys)
+        self.fiscal_year_start_month = int(fiscal_year_start_month)
+
+        years = np.array([int(k[:4]) for k in self.month_keys], dtype=np.int64)
+        months = np.array([int(k[5:7]) for k in self.month_keys], dtype=np.int64)
+        if self.fiscal_year_start_month == 1:
+            self._fiscal_years = years
+        else:
+            self._fiscal_years = years + (months >= self.fiscal_year_start_month)
+        self._fiscal_quarters = (months - self.fiscal_year_start_month) % 12 // 3 + 1
+        self._indexes: Dict[str, PeriodIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self.month_keys)
+
+    def _year_label(self, fiscal_year: int) -> str:
+        return str(fiscal_year) if self.fiscal_year_start_month == 1 else f"FY{fiscal_year}"
+
+    def index(self, frequency: str) -> PeriodIndex:
+        """Period index arrays for 'month', 'quarter' or 'year' (built once per frequency)"""
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"frequency must be one of {FREQUENCIES}")
+        cached = self._indexes.get(frequency)
+        if cached is not None:
+            return cached
+
+        num_months = len(self.month_keys)
+        if frequency == 'month':
+            codes = np.arange(num_months)
+        elif frequency == 'quarter':
+            codes = self._fiscal_years * 4 + self._fiscal_quarters
+        else:
+            codes = self._fiscal_years
+
+        changes = np.ones(num_months, dtype=bool)
+        changes[1:] = codes[1:] != codes[:-1]
+        starts = np.flatnonzero(changes)
+        stops = np.append(starts[1:], num_months).astype(np.int64)
+
+        if frequency == 'month':
+            labels = list(self.month_keys)
+        elif frequency == 'quarter':
+            labels = [f"{self._year_label(int(self._fiscal_years[s]))}-Q{int(self._fiscal_quarters[s])}" for s in starts]
+        else:
+            labels = [self._year_label(int(self._fiscal_years[s])) for s in starts]
+
+        index = PeriodIndex(labels, starts, stops, np.cumsum(changes) - 1)
+        self._indexes[frequency] = index
+        return index
+
+    def labels(self, frequency: str) -> List[str]:
+        return self.index(frequency).labels
+
+    def flow(self, values: np.ndarray, frequency: str) -> np.ndarray:
+        """Period totals of a flow line item (revenue, net income, cash flow, ...)"""
+        values = np.asarray(values, dtype=np.float64)
+        index = self.index(frequency)
+        if not len(index):
+            return np.zeros(values.shape[:-1] + (0,))
+        return np.add.reduceat(values, index.starts, axis=-1)
+
+    def balance(self, values: np.ndarray, frequency: str) -> np.ndarray:
+        """Period-end value of a balance line item (cash, debt, equity, ...)"""
+        return np.asarray(values)[..., self.index(frequency).ends]
+
+    def ratio(self, numerator: np.ndarray, denominator: np.ndarray, frequency: str) -> np.ndarray:
+        """
+        Ratio of two flows recomputed from the period totals (e.g. gross margin =
+        gross profit / revenue); 0 where the denominator total is not positive.
+        """
+        num = self.flow(numerator, frequency)
+        den = self.flow(denominator, frequency)
+        return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+    def to_date(self, values: np.ndarray, frequency: str) -> np.ndarray:
+        """Period-to-date running totals (YTD for 'year', QTD for 'quarter')"""
+        values = np.asarray(values, dtype=np.float64)
+        index = self.index(frequency)
+        result = np.empty(values.shape)
+        for start, stop in zip(index.starts.tolist(), index.stops.tolist()):
+            np.cumsum(values[..., start:stop], axis=-1, out=result[..., start:stop])
+        return result
@@ -0,0 +1,449 @@
+"""
+Model Run Result Store
+Sectioned, columnar storage for model-run results with lazy section loading.
+
+Layout:
+    model-runs/{org_id}/{model_run_id}/result/index.json   -> per run: scalars + section directory
+    model-runs/{org_id}/blobs/{sha256}.npz                 -> one compressed section, content-addressed
+
+Each section is a compressed NumPy archive. Month-keyed numeric tables
+(e.g. monthly statements) are stored column-wise as float64 matrices and long
+numeric lists as arrays; everything else stays in a small JSON skeleton inside
+the same archive. Sections are keyed by the hash of their canonical JSON, so
+runs with unchanged output share blobs. Readers fetch only the sections they
+need and keep a local disk copy keyed by storage path, so repeated reads
+never hit S3.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.s3 import (
+    upload_bytes_to_s3, download_from_s3, head_s3_object, touch_s3_object,
+    list_s3_objects, list_s3_prefixes, delete_s3_objects,
+)
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+RESULT_STORE_VERSION = 1
+RESULT_INDEX_NAME = 'index.json'
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'fin-model-results'))
+RESULT_BLOB_GC_GRACE_HOURS = int(os.getenv('RESULT_BLOB_GC_GRACE_HOURS', '24'))
+
+# Numeric lists shorter than this are cheaper to keep inline in the JSON skeleton
+MIN_ARRAY_LENGTH = 16
+
+_NUMERIC_KINDS = {bool: 'b', int: 'i', float: 'f'}
+
+
+def result_prefix(org_id: str, model_run_id: str) -> str:
+    """Storage prefix for a run's sectioned result"""
+    return f"model-runs/{org_id}/{model_run_id}/result"
+
+
+def blob_prefix(org_id: str) -> str:
+    """Storage prefix for an org's content-addressed result sections"""
+    return f"model-runs/{org_id}/blobs"
+
+
+def is_sectioned_ref(result_ref: Optional[str]) -> bool:
+    """True if a model_runs.result_s3 value points at a sectioned result index"""
+    return bool(result_ref) and result_ref.endswith(f"/{RESULT_INDEX_NAME}")
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+def _is_number(value: Any) -> bool:
+    return value is None or type(value) in _NUMERIC_KINDS
+
+
+def _is_numeric_table(obj: Any) -> bool:
+    """A dict of rows where every row is a flat dict of numbers (e.g. {month: {metric: value}})"""
+    if not isinstance(obj, dict) or len(obj) < 2:
+        return False
+    for row in obj.values():
+        if not isinstance(row, dict) or not row:
+            return False
+        if not all(_is_number(v) for v in row.values()):
+            return False
+    return True
+
+
+def _is_numeric_list(obj: Any) -> bool:
+    return (
+        isinstance(obj, list)
+        and len(obj) >= MIN_ARRAY_LENGTH
+        and all(type(v) in (int, float) for v in obj)
+    )
+
+
+class _SectionEncoder:
+    """Splits one section into a JSON skeleton plus columnar arrays"""
+
+    def __init__(self):
+        self.arrays: Dict[str, np.ndarray] = {}
+        self._count = 0
+
+    def _next_id(self, prefix: str) -> str:
+        ident = f"{prefix}{self._count}"
+        self._count += 1
+        return ident
+
+    def encode(self, obj: Any) -> Any:
+        if _is_numeric_table(obj):
+            return self._encode_table(obj)
+        if _is_numeric_list(obj):
+            ident = self._next_id('a')
+            self.arrays[f"{ident}/values"] = np.asarray(obj, dtype=np.float64)
+            kind = 'i' if all(type(v) is int for v in obj) else 'f'
+            return {'__array__': ident, 'kind': kind}
+        if isinstance(obj, dict):
+            return {k: self.encode(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.encode(v) for v in obj]
+        return obj
+
+    def _encode_table(self, table: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        ident = self._next_id('t')
+        rows = list(table.keys())
+        columns: List[str] = []
+        kinds: Dict[str, str] = {}
+        for row in table.values():
+            for col, value in row.items():
+                if col not in kinds:
+                    columns.append(col)
+                    kinds[col] = 'b'
+                if value is None:
+                    continue
+                kind = _NUMERIC_KINDS[type(value)]
+                # Widen bool -> int -> float as values are seen
+                if kind == 'f' or (kind == 'i' and kinds[col] == 'b'):
+                    kinds[col] = kind
+
+        values = np.full((len(rows), len(columns)), np.nan, dtype=np.float64)
+        missing = np.ones((len(rows), len(columns)), dtype=bool)
+        col_index = {c: j for j, c in enumerate(columns)}
+        for r, row in enumerate(table.values()):
+            for col, value in row.items():
+                j = col_index[col]
+                if value is None:
+                    missing[r, j] = False  # present, explicitly null
+                    continue
+                values[r, j] = float(value)
+                missing[r, j] = False
+
+        self.arrays[f"{ident}/rows"] = np.asarray([str(r) for r in rows])
+        self.arrays[f"{ident}/cols"] = np.asarray(columns)
+        self.arrays[f"{ident}/values"] = values
+        if missing.any():
+            self.arrays[f"{ident}/missing"] = missing
+        return {'__table__': ident, 'kinds': ''.join(kinds[c] for c in columns)}
+
+
+def encode_section(value: Any) -> bytes:
+    """Encode one result section into a compressed .npz payload"""
+    encoder = _SectionEncoder()
+    skeleton = encoder.encode(value)
+    arrays = dict(encoder.arrays)
+    arrays['__skeleton__'] = np.frombuffer(json.dumps(skeleton).encode('utf-8'), dtype=np.uint8)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Decoding
+# ---------------------------------------------------------------------------
+
+def _cast(value: float, kind: str) -> Any:
+    if kind == 'i':
+        return int(value)
+    if kind == 'b':
+        return bool(value)
+    return float(value)
+
+
+def _decode(obj: Any, archive) -> Any:
+    if isinstance(obj, dict):
+        if '__table__' in obj:
+            ident = obj['__table__']
+            rows = archive[f"{ident}/rows"].tolist()
+            cols = archive[f"{ident}/cols"].tolist()
+            values = archive[f"{ident}/values"]
+            missing = archive[f"{ident}/missing"] if f"{ident}/missing" in archive.files else None
+            kinds = obj.get('kinds', 'f' * len(cols))
+            table = {}
+            for r, row_key in enumerate(rows):
+                row = {}
+                for j, col in enumerate(cols):
+                    if missing is not None and missing[r, j]:
+                        continue
+                    v = values[r, j]
+                    row[col] = None if np.isnan(v) else _cast(v, kinds[j])
+                table[row_key] = row
+            return table
+        if '__array__' in obj:
+            values = archive[f"{obj['__array__']}/values"]
+            return [_cast(v, obj.get('kind', 'f')) for v in values.tolist()]
+        return {k: _decode(v, archive) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v, archive) for v in obj]
+    return obj
+
+
+def decode_section(payload: bytes) -> Any:
+    """Decode a compressed .npz section payload back into its JSON form"""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        skeleton = json.loads(archive['__skeleton__'].tobytes().decode('utf-8'))
+        return _decode(skeleton, archive)
+
+
+def load_section_arrays(payload: bytes) -> Dict[str, np.ndarray]:
+    """
+    Columnar view of a section without rebuilding dicts.
+
+    Returns { table_or_array_id: ndarray } plus '<id>/rows' and '<id>/cols' labels,
+    for consumers that can work directly on the float64 matrices.
+    """
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files if name != '__skeleton__'}
+
+
+# ---------------------------------------------------------------------------
+# Write / read
+# ---------------------------------------------------------------------------
+
+def split_result(result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a result into inline scalars (kept in the index) and heavy sections"""
+    scalars, sections = {}, {}
+    for key, value in result.items():
+        if isinstance(value, (dict, list)):
+            sections[key] = value
+        else:
+            scalars[key] = value
+    return scalars, sections
+
+
+def canonical_digest(value: Any) -> str:
+    """SHA-256 of a value's canonical JSON serialization (sorted keys, no whitespace)"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def write_result_sections(org_id: str, model_run_id: str, result: Dict[str, Any]) -> Optional[str]:
+    """
+    Upload a model-run result as a sectioned artifact.
+
+    Sections are content-addressed blobs shared by every run of the org that
+    produced identical content; only sections that are not stored yet are
+    encoded and uploaded. Reused blobs are touched so a concurrent GC sweep
+    sees them as recent.
+
+    Returns the index key to store in model_runs.result_s3, or None if S3 is not configured.
+    """
+    scalars, sections = split_result(result)
+
+    directory = {}
+    reused = 0
+    for name, value in sections.items():
+        digest = canonical_digest(value)
+        key = f"{blob_prefix(org_id)}/{digest}.npz"
+        existing = head_s3_object(key)
+        if existing is not None:
+            touch_s3_object(key)
+            directory[name] = {'key': key, 'sha256': digest, 'bytes': existing['size']}
+            reused += 1
+            continue
+
+        payload = encode_section(value)
+        if upload_bytes_to_s3(key, payload, 'application/octet-stream') is None:
+            return None
+        directory[name] = {'key': key, 'sha256': digest, 'bytes': len(payload)}
+        _write_cache(key, payload)
+
+    index = {
+        'version': RESULT_STORE_VERSION,
+        'modelRunId': model_run_id,
+        'resultHash': canonical_digest({'scalars': scalars, 'sections': {n: d['sha256'] for n, d in directory.items()}}),
+        'scalars': scalars,
+        'sections': directory,
+    }
+    index_key = f"{result_prefix(org_id, model_run_id)}/{RESULT_INDEX_NAME}"
+    index_bytes = json.dumps(index).encode('utf-8')
+    if upload_bytes_to_s3(index_key, index_bytes, 'application/json') is None:
+        return None
+    _write_cache(index_key, index_bytes)
+    logger.info(f"Stored result for run {model_run_id}: {len(directory) - reused} new section(s), {reused} reused")
+    return index_key
+
+
+def list_result_orgs() -> List[str]:
+    """Org ids that have anything stored under the model-run result prefix in S3"""
+    return [p[len('model-runs/'):].rstrip('/') for p in list_s3_prefixes('model-runs/')]
+
+
+def sweep_result_blobs(org_id: str, cursor, grace_hours: int = RESULT_BLOB_GC_GRACE_HOURS) -> Dict[str, int]:
+    """
+    Delete an org's result blobs that no model run references any more.
+
+    Mark-and-sweep: references are collected from every sectioned run index of
+    the org; unreferenced blobs and indexes of deleted runs older than the grace
+    period are deleted (the grace period covers runs still writing their index).
+    Each candidate is re-checked with a HEAD just before deletion, so a blob reused by a run
+    writing concurrently with the sweep is kept.
+    """
+    cursor.execute("""
+        SELECT result_s3 FROM model_runs
+        WHERE org_id = %s
+          AND result_s3 LIKE %s
+    """, (org_id, f"%/{RESULT_INDEX_NAME}"))
+    live_indexes = set()
+    referenced = set()
+    for (result_ref,) in cursor.fetchall():
+        live_indexes.add(result_ref)
+        index = load_result_index(result_ref)
+        if index is None:
+            continue
+        referenced.update(entry['key'] for entry in index.get('sections', {}).values())
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    objects = list_s3_objects(f"model-runs/{org_id}/")
+    blobs = [o for o in objects if o['key'].startswith(f"{blob_prefix(org_id)}/")]
+    # Indexes of deleted runs are garbage too
+    orphan_indexes = [
+        o for o in objects
+        if o['key'].endswith(f"/result/{RESULT_INDEX_NAME}") and o['key'] not in live_indexes
+    ]
+    garbage = [
+        o['key'] for o in blobs + orphan_indexes
+        if o['key'] not in referenced and o['lastModified'] is not None and o['lastModified'] < cutoff
+    ]
+    # A concurrent write_result_sections may have reused (touched) a candidate after the
+    # listing, before its run's result_s3 commits: re-stat each one right before deleting
+    deleted = 0
+    skipped = 0
+    for i in range(0, len(garbage), 1000):
+        batch = []
+        for key in garbage[i:i + 1000]:
+            current = head_s3_object(key)
+            if current is None or current['lastModified'] is None or current['lastModified'] >= cutoff:
+                skipped += 1
+                continue
+            batch.append(key)
+        deleted += delete_s3_objects(batch) if batch else 0
+        for key in batch:
+            try:
+                os.remove(_cache_path(key))
+            except OSError:
+                pass
+    return {'blobs': len(blobs), 'referenced': len(referenced), 'deleted': deleted, 'skipped': skipped}
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, *key.split('/'))
+
+
+def _write_cache(key: str, payload: bytes) -> None:
+    """Best-effort local copy; stored keys are never overwritten with new content so no invalidation is needed"""
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write result cache {path}: {e}")
+
+
+def _fetch(key: str) -> Optional[bytes]:
+    path = _cache_path(key)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    payload = download_from_s3(key)
+    if payload is not None:
+        _write_cache(key, payload)
+    return payload
+
+
+def load_result_index(result_ref: str) -> Optional[Dict[str, Any]]:
+    """Load the section directory + scalars for a sectioned result"""
+    payload = _fetch(result_ref)
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+def load_result_sections(result_ref: str, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Load a sectioned result, fetching only the requested sections.
+
+    Args:
+        result_ref: Index key stored in model_runs.result_s3
+        sections: Section names to load (None = all sections)
+
+    Returns:
+        Dict with all inline scalars plus the requested sections
+    """
+    index = load_result_index(result_ref)
+    if not index:
+        return {}
+
+    result = dict(index.get('scalars', {}))
+    directory = index.get('sections', {})
+    wanted = directory.keys() if sections is None else [s for s in sections if s in directory]
+    for name in wanted:
+        payload = _fetch(directory[name]['key'])
+        if payload is not None:
+            result[name] = decode_section(payload)
+    return result
+
+
+def load_model_run_result(model_run_id: str, cursor, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Load a model run's full result (or a subset of sections) from wherever it was stored.
+
+    Handles sectioned artifacts, legacy single-blob result.json uploads, and
+    results inlined in summary_json.fullResult.
+    """
+    cursor.execute("SELECT result_s3, summary_json FROM model_runs WHERE id = %s", (model_run_id,))
+    row = cursor.fetchone()
+    if not row:
+        return {}
+
+    result_ref, summary_json = row
+    if isinstance(summary_json, str):
+        try:
+            summary_json = json.loads(summary_json)
+        except Exception:
+            summary_json = {}
+    summary_json = summary_json or {}
+
+    if is_sectioned_ref(result_ref):
+        return load_result_sections(result_ref, sections)
+
+    full = None
+    if result_ref:
+        try:
+            payload = _fetch(result_ref)
+            full = json.loads(payload.decode('utf-8')) if payload else None
+        except Exception as e:
+            logger.warning(f"Could not load legacy result {result_ref}: {e}")
+    if full is None:
+        full = summary_json.get('fullResult', summary_json)
+
+    if sections is None or not isinstance(full, dict):
+        return full or {}
+    scalars, _ = split_result(full)
+    return {**scalars, **{s: full[s] for s in sections if s in full}}
@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 import boto3
 from botocore.exceptions import ClientError
-from typing import Optional
+from typing import List, Optional
 
 # Load environment variables from .env file
 load_dotenv()
@@ -84,3 +84,95 @@ def get_signed_url(key: str, expires_in: int = 3600, bucket: Optional[str] = Non
     except ClientError as e:
         raise Exception(f"Failed to generate signed URL: {str(e)}")
 
+
+def head_s3_object(key: str, bucket: Optional[str] = None) -> Optional[dict]:
+    """Size / last-modified of an S3 object (returns None if missing or S3 not configured)"""
+    s3_client = get_s3_client()
+    bucket = bucket or os.getenv('S3_BUCKET_NAME')
+    
+    if not bucket or not s3_client:
+        return None
+    
+    try:
+        response = s3_client.head_object(Bucket=bucket, Key=key)
+        return {'size': response.get('ContentLength', 0), 'lastModified': response.get('LastModified')}
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise Exception(f"Failed to stat S3 object: {str(e)}")
+
+def touch_s3_object(key: str, bucket: Optional[str] = None) -> bool:
+    """Refresh an object's last-modified time with a server-side self-copy (no data transfer)"""
+    s3_client = get_s3_client()
+    bucket = bucket or os.getenv('S3_BUCKET_NAME')
+    
+    if not bucket or not s3_client:
+        return False
+    
+    try:
+        s3_client.copy_object(
+            Bucket=bucket,
+            Key=key,
+            CopySource={'Bucket': bucket, 'Key': key},
+            MetadataDirective='REPLACE',
+        )
+        return True
+    except ClientError as e:
+        raise Exception(f"Failed to touch S3 object: {str(e)}")
+
+def list_s3_objects(prefix: str, bucket: Optional[str] = None) -> List[dict]:
+    """List objects under a prefix as [{key, size, lastModified}] (empty if S3 not configured)"""
+    s3_client = get_s3_client()
+    bucket = bucket or os.getenv('S3_BUCKET_NAME')
+    
+    if not bucket or not s3_client:
+        return []
+    
+    try:
+        objects = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                objects.append({'key': obj['Key'], 'size': obj.get('Size', 0), 'lastModified': obj.get('LastModified')})
+        return objects
+    except ClientError as e:
+        raise Exception(f"Failed to list S3 objects: {str(e)}")
+
+def list_s3_prefixes(prefix: str, delimiter: str = '/', bucket: Optional[str] = None) -> List[str]:
+    """List the common prefixes one level below a prefix (empty if S3 not configured)"""
+    s3_client = get_s3_client()
+    bucket = bucket or os.getenv('S3_BUCKET_NAME')
+
+    if not bucket or not s3_client:
+        return []
+
+    try:
+        prefixes = []
+        paginator = s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter=delimiter):
+            for common in page.get('CommonPrefixes', []):
+                prefixes.append(common['Prefix'])
+        return prefixes
+    except ClientError as e:
+        raise Exception(f"Failed to list S3 prefixes: {str(e)}")
+
+def delete_s3_objects(keys: List[str], bucket: Optional[str] = None) -> int:
+    """Delete objects in batches of 1000 (returns number deleted, 0 if S3 not configured)"""
+    s3_client = get_s3_client()
+    bucket = bucket or os.getenv('S3_BUCKET_NAME')
+    
+    if not bucket or not s3_client:
+        return 0
+    
+    deleted = 0
+    try:
+        for i in range(0, len(keys), 1000):
+            batch = keys[i:i + 1000]
+            s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': k} for k in batch], 'Quiet': True},
+            )
+            deleted += len(batch)
+        return deleted
+    except ClientError as e:
+        raise Exception(f"Failed to delete S3 objects: {str(e)}")
@@ -37,6 +37,7 @@ from jobs.scheduled_connector_sync import handle_scheduled_connector_sync
 from jobs.connector_sync import handle_connector_sync
 from jobs.alert_check import handle_alert_check
 from jobs.aicfo_chat import handle_aicfo_chat
+from jobs.result_blob_gc import handle_result_blob_gc, schedule_result_blob_gc
 from jobs.runner import reserve_job, run_job_with_retry, release_stuck_jobs
 
 logger = setup_logger()
@@ -63,11 +64,13 @@ JOB_HANDLERS = {
     'connector_sync': handle_connector_sync,
     'connector_initial_sync': handle_connector_sync,
     'aicfo_chat': handle_aicfo_chat,
+    'result_blob_gc': handle_result_blob_gc,
 }
 
 POLL_INTERVAL = 0.5  # Reduced from 2s for faster chat response
 WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
 GRACEFUL_SHUTDOWN_TIMEOUT = int(os.getenv('WORKER_GRACEFUL_SHUTDOWN_TIMEOUT', '180'))  # 3 minutes
+SCHEDULE_CHECK_INTERVAL = 600  # Seconds between checks for due periodic jobs
 
 # Global shutdown flag
 shutdown_requested = False
@@ -176,10 +179,19 @@ def poll_and_process_jobs():
     
     # Thread pool for concurrent job processing
     executor = ThreadPoolExecutor(max_workers=WORKER_CONCURRENCY)
+    last_schedule_check = 0.0
     
     try:
         while not shutdown_requested:
             try:
+                # Enqueue periodic maintenance jobs that are due (deduplicated across workers)
+                if time.time() - last_schedule_check >= SCHEDULE_CHECK_INTERVAL:
+                    last_schedule_check = time.time()
+                    try:
+                        schedule_result_blob_gc()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Failed to schedule result blob GC: {str(e)}")
+                
                 # Check if we have capacity
                 if len(active_jobs) >= WORKER_CONCURRENCY:
                     time.sleep(POLL_INTERVAL)